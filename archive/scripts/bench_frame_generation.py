@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Benchmark the vectorized frame builder against the original per-row loop.
+
+Cases:
+  * 1,476 frames x 7 stations (the production event, from
+    data/pivoted_store when present, synthetic otherwise)
+  * 100,000 frames x 200 stations (synthetic)
+
+The legacy loop on the large case would allocate ~20M shape dicts, so it is
+timed on the first --legacy-frames frames and extrapolated linearly; the
+vectorized builder is timed on the same slice and on the full input.
+"""
+
+import argparse
+import os
+import pickle
+import time
+
+import numpy as np
+import pandas as pd
+
+from frame_builder import axis_refs, build_frame_arrays, cursor_shapes, frames_to_cache
+from sample_store import load_pivot, PIVOT_STORE_DIR
+from station_registry import load_registry
+
+
+def legacy_frame_cache(df_pivot_interp, distances):
+    """The original generate_frame_cache loop, kept verbatim for comparison."""
+    all_frames = df_pivot_interp.index
+    frame_data_cache = {}
+    for i in range(len(df_pivot_interp)):
+        x_values = [float(d) for d in distances]
+        wave_values = df_pivot_interp.iloc[i].values.tolist()
+        timestamp = all_frames[i]
+        timeseries_shapes = []
+        for j in range(len(distances)):
+            timeseries_shapes.append({
+                "type": "line",
+                "xref": f"x{j+1}",
+                "yref": f"y{j+1}",
+                "x0": timestamp,
+                "x1": timestamp,
+                "y0": -1,
+                "y1": 1,
+                "line": {"color": "blue", "width": 2, "dash": "dot"},
+                "layer": "above"
+            })
+        frame_data_cache[i] = {
+            'x_values': x_values,
+            'wave_values': wave_values,
+            'timestamp': timestamp,
+            'timeseries_shapes': timeseries_shapes
+        }
+    return frame_data_cache
+
+
+def synthetic_pivot(n_frames, n_stations, seed=0):
+    rng = np.random.default_rng(seed)
+    index = pd.date_range("2025-07-29 23:25", periods=n_frames, freq="min", name="t")
+    values = rng.normal(0, 0.2, size=(n_frames, n_stations))
+    columns = [f"S{j:03d}" for j in range(n_stations)]
+    distances = np.sort(rng.uniform(3000, 6000, n_stations)).tolist()
+    return pd.DataFrame(values, index=index, columns=columns), distances
+
+
+def production_pivot():
+    path = PIVOT_STORE_DIR
+    if not os.path.exists(os.path.join(path, "schema.json")):
+        print(f"ℹ️  {path} not found, using synthetic 1,476 x 7 input")
+        return synthetic_pivot(1476, 7)
+    pivoted = load_pivot(path)
+    df = pivoted['df_pivot']
+    df = df[(df.index >= pd.Timestamp('2025-07-29 23:24:52')) & (df.index <= pd.Timestamp('2025-07-31 00:00:00'))]
+    df = df.interpolate(axis=0).ffill().bfill()
+    df = df[load_registry().display_order(available=df.columns)]
+    return df, [pivoted['station_distance'][s] for s in df.columns]
+
+
+def timed(fn, *args, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def vectorized_frame_cache(df, distances):
+    return frames_to_cache(build_frame_arrays(df, distances))
+
+
+def run_case(label, df, distances, legacy_frames=None):
+    print(f"\n📊 {label}: {len(df):,} frames x {df.shape[1]} stations")
+    subset = df if legacy_frames is None else df.iloc[:legacy_frames]
+    legacy_time, legacy = timed(legacy_frame_cache, subset, distances, repeat=1 if legacy_frames else 3)
+    vector_time, vector = timed(vectorized_frame_cache, subset, distances, repeat=1 if legacy_frames else 3)
+    refs = axis_refs(len(distances))
+    expanded = {i: {**frame, 'timeseries_shapes': cursor_shapes(frame['timestamp'], refs)} for i, frame in vector.items()}
+    assert legacy == expanded, "vectorized frames differ from the legacy loop"
+    scale = len(df) / len(subset)
+    note = f" (timed on {len(subset):,} frames, extrapolated)" if legacy_frames else ""
+    print(f"  🐢 legacy loop:        {legacy_time * scale:8.3f}s{note}")
+    print(f"  ⚡ vectorized frames:  {vector_time * scale:8.3f}s{note}  ({legacy_time / vector_time:.1f}x faster)")
+    arrays_time, _ = timed(build_frame_arrays, df, distances)
+    print(f"  🧮 frame arrays only:  {arrays_time:8.3f}s  ({legacy_time * scale / arrays_time:,.0f}x faster; "
+          f"no per-frame dicts)")
+    legacy_bytes = len(pickle.dumps(legacy, protocol=pickle.HIGHEST_PROTOCOL))
+    vector_bytes = len(pickle.dumps(vector, protocol=pickle.HIGHEST_PROTOCOL))
+    print(f"  💾 pickle size:        {legacy_bytes * scale / 1024:,.0f}KB → {vector_bytes * scale / 1024:,.0f}KB{note}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=100_000)
+    parser.add_argument("--stations", type=int, default=200)
+    parser.add_argument("--legacy-frames", type=int, default=1_000,
+                        help="frames the legacy loop is timed on for the synthetic case")
+    args = parser.parse_args()
+
+    df, distances = production_pivot()
+    run_case("Production event", df, distances)
+    df, distances = synthetic_pivot(args.frames, args.stations)
+    run_case("Synthetic", df, distances, legacy_frames=args.legacy_frames)
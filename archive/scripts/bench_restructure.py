@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark the restructure step: the original serial pd.merge loop against the
+process-pool version with explicit dtypes and a sorted time join.
+
+Synthetic raw data mimics NOAA responses (t/v as strings, a few gaps and
+blank values) for --stations stations x --minutes minutes. Every run must
+produce the same deltas as the legacy loop.
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+import wave_data_collect_and_cache as collect
+from geodesy import station_distances
+from station_registry import StationRegistry
+
+
+def legacy_restructure(raw_data, stations):
+    """The original restructure loop, kept verbatim apart from the stations argument and epicenter lookup."""
+    records = []
+    distances = station_distances(stations, *collect.registry.epicenter)
+    for name, meta in stations.items():
+        try:
+            obs = raw_data.get(name, {}).get("one_minute_water_level", pd.DataFrame())
+            pred = raw_data.get(name, {}).get("predictions", pd.DataFrame())
+            if not obs.empty and not pred.empty:
+                obs['t'] = pd.to_datetime(obs['t'], errors='coerce')
+                obs['v'] = pd.to_numeric(obs['v'], errors='coerce')
+                pred['t'] = pd.to_datetime(pred['t'], errors='coerce')
+                pred['v'] = pd.to_numeric(pred['v'], errors='coerce')
+                merged = pd.merge(obs, pred, on='t', suffixes=('_obs', '_pred'))
+                merged['delta'] = merged['v_obs'] - merged['v_pred']
+                merged['station'] = name
+                merged['distance_km'] = distances[name]
+                records.append(merged[['t', 'station', 'distance_km', 'delta']])
+        except Exception as e:
+            print(f"Error processing station {name}: {e}")
+    return pd.concat(records) if records else None
+
+
+def synthetic_raw(n_stations, minutes, rng):
+    stations = {f"S{i:04d}": {"id": f"9{i:06d}", "name": f"S{i:04d}",
+                              "lat": float(rng.uniform(-60, 60)), "lon": float(rng.uniform(-180, 180))}
+                for i in range(n_stations)}
+    registry = StationRegistry({meta["id"]: {"key": name, "name": name, "lat": meta["lat"], "lng": meta["lon"]}
+                                for name, meta in stations.items()})
+    times = pd.date_range("2025-07-29 00:00", periods=minutes, freq="min").strftime("%Y-%m-%d %H:%M")
+    raw = {}
+    for name in stations:
+        keep = rng.random(minutes) > 0.02  # observation gaps
+        obs_v = np.char.mod("%.3f", rng.normal(0, 0.3, keep.sum())).astype(object)
+        obs_v[rng.random(len(obs_v)) < 0.01] = ""  # blank values, as NOAA sends them
+        raw[name] = {
+            "one_minute_water_level": pd.DataFrame({"t": times[keep], "v": obs_v}),
+            "predictions": pd.DataFrame({"t": times, "v": np.char.mod("%.3f", rng.normal(0, 0.3, minutes))}),
+        }
+    return stations, registry, raw
+
+
+def copy_raw(raw):
+    # the legacy loop parses in place, so every run gets fresh string frames
+    return {name: {product: df.copy() for product, df in products.items()} for name, products in raw.items()}
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stations", type=int, default=400)
+    parser.add_argument("--minutes", type=int, default=4 * 24 * 60)
+    parser.add_argument("--workers", type=int, nargs="*", help="worker counts to try (default: 1, 2, 4, ... up to all cores)")
+    args = parser.parse_args()
+
+    stations, registry, raw = synthetic_raw(args.stations, args.minutes, np.random.default_rng(0))
+    collect.registry, collect.stations = registry, registry.select()
+    print(f"📊 {args.stations:,} stations x {args.minutes:,} minutes")
+
+    legacy_time, expected = timed(legacy_restructure, copy_raw(raw), stations)
+    expected = expected.reset_index(drop=True).astype({"t": "datetime64[ns]"})
+    print(f"  🐢 legacy serial merge:   {legacy_time:8.2f} s")
+
+    cores = os.cpu_count() or 1
+    counts = args.workers or sorted({1, cores} | {2 ** k for k in range(1, 8) if 2 ** k < cores})
+    for workers in counts:
+        # force the pool even for short station lists so the scaling is visible
+        collect.POOL_MIN_STATIONS = 1 if workers > 1 else collect.POOL_MIN_STATIONS
+        elapsed, df = timed(collect.restructure, copy_raw(raw), workers=workers)
+        pd.testing.assert_frame_equal(df, expected, check_dtype=False)
+        print(f"  ⚡ restructure, {workers:3d} worker(s): {elapsed:8.2f} s  ({legacy_time / elapsed:,.1f}x faster)")
@@ -0,0 +1,282 @@
+"""
+Hot-path metrics for the Dash app's server callbacks.
+
+Each instrumented callback records its run time in a fixed-bucket
+histogram. Once Flask has sent the answer, the whole request time and the
+response size are recorded too. Counters cover the rest: bundle frames
+served and revalidated, and frames missing from the cache. Gauges are read
+only when a snapshot is taken, e.g. the frame LRU's cache_info(). Recording
+costs two perf_counter() calls, a bisect and a lock, and writes nothing to
+stdout, so it can stay on in production.
+
+The app serves snapshot() as JSON from /_metrics, to loopback clients only.
+With PROFILE_SAMPLE_MS set, a sampling profiler thread records the stacks of
+threads that are inside an instrumented callback, every that many
+milliseconds. The stacks are kept in the folded format that flamegraph.pl
+and speedscope read, and are served from /_metrics/profile.
+
+Metrics are per process: under gunicorn each worker answers for itself.
+"""
+
+import bisect
+import os
+import sys
+import threading
+import time
+from functools import wraps
+
+from flask import Response, abort, g, jsonify, request
+
+LATENCY_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+LOOPBACK = {"127.0.0.1", "::1"}
+
+
+class Histogram:
+    """Counts per bucket (value <= bound, then one overflow bucket), plus count, sum and max."""
+
+    def __init__(self, bounds):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile (the max if it is in the overflow bucket)."""
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(self.bounds + (self.max,), self.counts):
+            seen += n
+            if seen >= rank and n:
+                return min(bound, self.max)
+        return self.max
+
+    def snapshot(self):
+        labels = [f"le_{b:g}" for b in self.bounds] + ["inf"]
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 3),
+            "mean": round(self.sum / self.count, 3) if self.count else 0.0,
+            "max": round(self.max, 3),
+            "p50": round(self.quantile(0.5), 3),
+            "p95": round(self.quantile(0.95), 3),
+            "p99": round(self.quantile(0.99), 3),
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+
+class CallbackMetrics:
+    """Per-callback latency/size histograms, counters and gauges for one process."""
+
+    def __init__(self, latency_buckets=LATENCY_BUCKETS_MS, size_buckets=SIZE_BUCKETS, profile_interval_ms=0):
+        self.latency_buckets = latency_buckets
+        self.size_buckets = size_buckets
+        self.started = time.time()
+        self.callbacks = {}
+        self.stats = {}
+        self.gauges = {}
+        self.info = {}              # fixed facts reported with every snapshot, e.g. the playback mode
+        self.instrumented = set()
+        self.profile_interval_ms = profile_interval_ms
+        self.sampler = None
+        self._active = {}                  # thread id -> callback running on it (for the sampler)
+        self._current = threading.local()  # callback that ran in this request (for after_request)
+        self._wrapper_code = None
+        self._lock = threading.Lock()
+
+    def _entry(self, name):
+        entry = self.callbacks.get(name)
+        if entry is None:
+            entry = self.callbacks[name] = {
+                "latency_ms": Histogram(self.latency_buckets),
+                "request_ms": Histogram(self.latency_buckets),
+                "response_bytes": Histogram(self.size_buckets),
+                "exceptions": 0,
+            }
+        return entry
+
+    def count(self, stat, n=1):
+        with self._lock:
+            self.stats[stat] = self.stats.get(stat, 0) + n
+
+    def gauge(self, name, read):
+        """Register read(), a cheap function of no arguments, to be reported with every snapshot."""
+        self.gauges[name] = read
+
+    def observe(self, name, elapsed_ms, raised=False):
+        with self._lock:
+            entry = self._entry(name)
+            entry["latency_ms"].observe(elapsed_ms)
+            if raised:
+                entry["exceptions"] += 1
+
+    def observe_request(self, name, elapsed_ms, nbytes):
+        with self._lock:
+            entry = self._entry(name)
+            entry["request_ms"].observe(elapsed_ms)
+            entry["response_bytes"].observe(nbytes)
+
+    def timed(self, name):
+        """Decorator: time every call of a callback (or route) under `name`."""
+        def decorator(func):
+            self.instrumented.add(name)
+
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                thread = threading.get_ident()
+                self._active[thread] = name
+                self._current.name = name
+                start = time.perf_counter()
+                raised = True  # until func returns, so PreventUpdate counts as an exception too
+                try:
+                    result = func(*args, **kwargs)
+                    raised = False
+                    return result
+                finally:
+                    self.observe(name, 1000 * (time.perf_counter() - start), raised)
+                    self._active.pop(thread, None)
+            self._wrapper_code = wrapper.__code__
+            return wrapper
+        return decorator
+
+    def take_callback(self):
+        """Name of the instrumented callback this thread ran since the last call, if any."""
+        name = getattr(self._current, "name", None)
+        self._current.name = None
+        return name
+
+    def reset(self):
+        with self._lock:
+            self.started = time.time()
+            self.callbacks = {}
+            self.stats = {}
+        if self.sampler is not None:
+            self.sampler.reset()
+
+    def snapshot(self):
+        with self._lock:
+            callbacks = {name: {key: value.snapshot() if isinstance(value, Histogram) else value
+                                for key, value in entry.items()}
+                         for name, entry in self.callbacks.items()}
+            counters = dict(self.stats)
+        return {
+            "pid": os.getpid(),
+            "uptime_s": round(time.time() - self.started, 1),
+            **self.info,
+            "instrumented": sorted(self.instrumented),  # callbacks appear below once called
+            "callbacks": callbacks,
+            "counters": counters,
+            "gauges": {name: read() for name, read in self.gauges.items()},
+            "profile": self.sampler.summary() if self.sampler is not None else None,
+        }
+
+    def ensure_sampler(self):
+        """Start the stack sampler in this process if profiling is on and it is not running here."""
+        if not self.profile_interval_ms or (self.sampler is not None and self.sampler.pid == os.getpid()):
+            return
+        with self._lock:
+            # Threads do not survive fork: a gunicorn --preload worker starts its own
+            if self.sampler is None or self.sampler.pid != os.getpid():
+                self.sampler = StackSampler(self, self.profile_interval_ms / 1000)
+                self.sampler.start()
+
+
+class StackSampler(threading.Thread):
+    """Samples the stacks of threads running an instrumented callback, every `interval` seconds."""
+
+    def __init__(self, metrics, interval):
+        super().__init__(name="callback-stack-sampler", daemon=True)
+        self.metrics = metrics
+        self.interval = interval
+        self.stacks = {}
+        self.samples = 0
+        self.pid = os.getpid()
+        self.stopped = threading.Event()
+        self._lock = threading.Lock()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            active = dict(self.metrics._active)
+            if not active:
+                continue
+            frames = sys._current_frames()
+            for thread, name in active.items():
+                frame = frames.get(thread)
+                if frame is not None:
+                    self._record(name, frame)
+
+    def _record(self, name, frame):
+        stack = []
+        while frame is not None and frame.f_code is not self.metrics._wrapper_code:
+            code = frame.f_code
+            stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)})")
+            frame = frame.f_back
+        folded = ";".join([name] + stack[::-1])
+        with self._lock:
+            self.stacks[folded] = self.stacks.get(folded, 0) + 1
+            self.samples += 1
+
+    def reset(self):
+        with self._lock:
+            self.stacks = {}
+            self.samples = 0
+
+    def summary(self):
+        return {"interval_ms": self.interval * 1000, "samples": self.samples, "stacks": len(self.stacks)}
+
+    def folded(self):
+        """One `frame;frame;... count` line per distinct stack, most sampled first."""
+        with self._lock:
+            stacks = sorted(self.stacks.items(), key=lambda item: item[1], reverse=True)
+        return "".join(f"{stack} {n}\n" for stack, n in stacks)
+
+
+def install(server, metrics, path="/_metrics"):
+    """
+    Record request time and response size for instrumented callbacks on a
+    Flask server, and serve the snapshot (and profile) at `path` to loopback
+    clients. `?reset=1` clears everything after answering.
+    """
+    @server.before_request
+    def start_request_timer():
+        g.metrics_start = time.perf_counter()
+        metrics.ensure_sampler()
+
+    @server.after_request
+    def record_request(response):
+        name = metrics.take_callback()
+        if name is not None and "metrics_start" in g:
+            nbytes = 0 if response.direct_passthrough else response.calculate_content_length() or 0
+            metrics.observe_request(name, 1000 * (time.perf_counter() - g.metrics_start), nbytes)
+        return response
+
+    def local_only():
+        # Behind a proxy every request arrives from the proxy; forwarded ones are not local
+        if request.remote_addr not in LOOPBACK or "X-Forwarded-For" in request.headers:
+            abort(404)
+
+    @server.route(path)
+    def metrics_snapshot():
+        local_only()
+        response = jsonify(metrics.snapshot())
+        if request.args.get("reset"):
+            metrics.reset()
+        return response
+
+    @server.route(f"{path}/profile")
+    def metrics_profile():
+        local_only()
+        if metrics.sampler is None:
+            abort(404)
+        response = Response(metrics.sampler.folded(), mimetype="text/plain")
+        if request.args.get("reset"):
+            metrics.sampler.reset()
+        return response
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Check the NOAA fetch path against a local http.server stand-in.
+
+The stand-in answers like the datagetter API but lets each path misbehave
+on purpose, so the check needs no network:
+  * concurrency  /slow       every answer takes DELAY; the pool must overlap
+                             them without ever exceeding the per-host limit
+  * retries      /flaky      429, then 503, then data; /down is always 502;
+                             /missing is a 404, which must not be retried
+  * revalidation /etag       ETag + Last-Modified; a matching If-None-Match
+                             gets an empty 304, served from the cache
+  * errors       /error      NOAA's in-band {"error": ...}, never cached
+
+Exits non-zero on the first failed assertion.
+"""
+
+import argparse
+import json
+import logging
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+import requests
+
+from noaa_fetch import FetchEngine, RetryableStatus
+from response_cache import ResponseCache, fetch_json, request_key
+
+DELAY = 0.2  # seconds per /slow answer
+ETAG = '"v1"'
+LAST_MODIFIED = "Tue, 29 Jul 2025 23:24:52 GMT"
+SAMPLES = {"data": [{"t": "2025-07-29 23:24", "v": "0.122"}]}
+
+
+class StandIn(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), Handler)
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.peak = 0
+        self.hits = {}           # path -> requests seen
+        self.conditional = []    # If-None-Match values seen on /etag
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so the session's pool is exercised
+
+    def do_GET(self):
+        server = self.server
+        path = urlsplit(self.path).path
+        with server.lock:
+            server.hits[path] = server.hits.get(path, 0) + 1
+            seen = server.hits[path]
+            server.in_flight += 1
+            server.peak = max(server.peak, server.in_flight)
+        try:
+            if path.startswith("/slow"):
+                time.sleep(DELAY)
+                self.reply(200, SAMPLES)
+            elif path == "/flaky":
+                self.reply({1: 429, 2: 503}.get(seen, 200), SAMPLES)
+            elif path == "/down":
+                self.reply(502, {})
+            elif path == "/etag":
+                tag = self.headers.get("If-None-Match")
+                server.conditional.append(tag)
+                if tag == ETAG:
+                    self.reply(304, None)
+                else:
+                    self.reply(200, SAMPLES, {"ETag": ETAG, "Last-Modified": LAST_MODIFIED})
+            elif path == "/error":
+                self.reply(200, {"error": {"message": "No data was found."}})
+            else:
+                self.reply(404, {})
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def reply(self, status, payload, headers=None):
+        body = b"" if payload is None else json.dumps(payload).encode()
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if payload is not None:
+            self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def check_concurrency(server, requests_n, per_host_limit):
+    engine = FetchEngine(max_workers=2 * per_host_limit, per_host_limit=per_host_limit, backoff=0.01)
+    start = time.perf_counter()
+    results = engine.map(lambda i: engine.get_json(f"{server.url}/slow/{i}", label=f"slow {i}"), range(requests_n))
+    wall = time.perf_counter() - start
+    serial = requests_n * DELAY
+    assert all(r == SAMPLES for r in results), "a /slow answer came back wrong"
+    assert 1 < server.peak <= per_host_limit, f"{server.peak} requests in flight, limit {per_host_limit}"
+    assert wall < serial / 2, f"{wall:.2f}s wall time for {serial:.2f}s of serial work"
+    print(f"  ✅ concurrency: {requests_n} x {DELAY:.1f}s in {wall:.2f}s "
+          f"(serial {serial:.1f}s), peak {server.peak} in flight (limit {per_host_limit})")
+
+
+def check_retries(server):
+    engine = FetchEngine(retries=3, backoff=0.01)
+    assert engine.get_json(f"{server.url}/flaky", label="flaky") == SAMPLES
+    assert engine.timings[-1]["attempts"] == 3, engine.timings[-1]
+    print("  ✅ retry: 429, 503, then 200 in 3 attempts")
+
+    try:
+        engine.get(f"{server.url}/down", label="down")
+    except RetryableStatus as e:
+        assert e.response.status_code == 502
+    else:
+        raise AssertionError("/down did not raise")
+    assert server.hits["/down"] == engine.retries + 1, server.hits["/down"]
+    print(f"  ✅ retry: persistent 502 gives up after {engine.retries + 1} attempts")
+
+    try:
+        engine.get(f"{server.url}/missing", label="missing")
+    except requests.HTTPError as e:
+        assert not isinstance(e, RetryableStatus) and e.response.status_code == 404
+    else:
+        raise AssertionError("/missing did not raise")
+    assert server.hits["/missing"] == 1, server.hits["/missing"]
+    print("  ✅ retry: 404 is not retried")
+
+
+def check_revalidation(server, cache_dir):
+    engine = FetchEngine(backoff=0.01)
+    cache = ResponseCache(root=cache_dir, ttl=0)  # every entry is stale at once
+    key = request_key("check", "etag")
+    url = f"{server.url}/etag"
+
+    assert fetch_json(engine, cache, url, None, key, label="etag") == SAMPLES
+    assert fetch_json(engine, cache, url, None, key, label="etag") == SAMPLES
+    assert server.conditional == [None, ETAG], server.conditional
+    assert cache.stats["stored"] == 1 and cache.stats["revalidated"] == 1, cache.stats
+    print("  ✅ revalidation: stale entry sent If-None-Match, 304 served the cached body")
+
+    cache.offline = True
+    assert fetch_json(engine, cache, url, None, key, label="etag") == SAMPLES
+    assert len(server.conditional) == 2, "offline replay touched the network"
+    print("  ✅ offline: stale entry replayed with no request")
+
+    cache.offline = False
+    key = request_key("check", "error")
+    for _ in range(2):
+        assert "error" in fetch_json(engine, cache, f"{server.url}/error", None, key, label="error", ttl=None)
+    assert server.hits["/error"] == 2 and cache.stats["stored"] == 1, (server.hits, cache.stats)
+    print("  ✅ errors: in-band NOAA error fetched again, never stored")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check noaa_fetch/response_cache against a local stand-in server")
+    parser.add_argument("--requests", type=int, default=12, help="concurrent /slow requests")
+    parser.add_argument("--per-host", type=int, default=4, help="per-host concurrency limit to check")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR)  # the retry warnings are expected here
+
+    server = StandIn()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"🔌 Stand-in server on {server.url}")
+    try:
+        check_concurrency(server, args.requests, args.per_host)
+        check_retries(server)
+        with tempfile.TemporaryDirectory() as cache_dir:
+            check_revalidation(server, cache_dir)
+    finally:
+        server.shutdown()
+    print("✅ noaa_fetch checks passed")
+
+
+if __name__ == "__main__":
+    main()
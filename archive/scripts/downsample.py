@@ -0,0 +1,96 @@
+"""
+Min/max downsampling levels for the station time series.
+
+Level k groups `bucket` = MIN_BUCKET * 2**k consecutive frames and keeps each
+bucket's minimum and maximum sample, in time order, so wave peaks survive at
+every level. Two points per bucket means a level whose bucket is no wider
+than the frames one screen pixel covers draws the same envelope as the full
+record. Levels stop once a level is down to MIN_LEVEL_POINTS points per
+station.
+
+Each level is (bucket, indices, samples): indices are uint32 frame numbers,
+stations x points, and samples the matching deltas. The client rebuilds
+timestamps from the frame numbers, so no x values are stored.
+"""
+
+import numpy as np
+
+MIN_BUCKET = 4              # 2 points per bucket: smaller buckets save too little
+MIN_LEVEL_POINTS = 256      # coarsest level has at most about this many points per station
+
+
+def minmax_level(values, bucket):
+    """(indices, samples) of one level from a frames x stations array."""
+    frames, n_stations = values.shape
+    n_buckets = -(-frames // bucket)
+    columns = np.ascontiguousarray(values.T, dtype=np.float64)
+    padded = np.full((n_stations, n_buckets * bucket), np.nan)
+    padded[:, :frames] = columns
+    blocks = padded.reshape(n_stations, n_buckets, bucket)
+    nan = np.isnan(blocks)
+    low = np.argmin(np.where(nan, np.inf, blocks), axis=2)
+    high = np.argmax(np.where(nan, -np.inf, blocks), axis=2)
+
+    base = np.arange(n_buckets) * bucket
+    indices = np.empty((n_stations, 2 * n_buckets), dtype=np.uint32)
+    indices[:, 0::2] = base + np.minimum(low, high)
+    indices[:, 1::2] = base + np.maximum(low, high)
+    samples = np.take_along_axis(columns, indices.astype(np.intp), axis=1)
+    return indices, samples
+
+
+def coarsen_level(indices, samples):
+    """
+    Next level (twice the bucket) from the previous one: a merged bucket's
+    extremes are among the two halves' extremes, so only 4 candidates per
+    bucket are compared instead of re-scanning the record.
+    """
+    n_stations, points = indices.shape
+    pad = (-points) % 4
+    if pad:
+        # an odd bucket count leaves a half-empty last bucket; repeat its own extremes
+        indices = np.concatenate([indices, indices[:, -pad:]], axis=1)
+        samples = np.concatenate([samples, samples[:, -pad:]], axis=1)
+    cand_idx = indices.reshape(n_stations, -1, 4)
+    cand = samples.reshape(n_stations, -1, 4)
+    low_pos = np.argmin(cand, axis=2)[..., None]
+    high_pos = np.argmax(cand, axis=2)[..., None]
+    low_idx = np.take_along_axis(cand_idx, low_pos, axis=2)[..., 0]
+    high_idx = np.take_along_axis(cand_idx, high_pos, axis=2)[..., 0]
+    low_val = np.take_along_axis(cand, low_pos, axis=2)[..., 0]
+    high_val = np.take_along_axis(cand, high_pos, axis=2)[..., 0]
+    low_first = low_idx <= high_idx
+
+    merged_idx = np.empty((n_stations, 2 * cand.shape[1]), dtype=np.uint32)
+    merged_val = np.empty((n_stations, 2 * cand.shape[1]), dtype=samples.dtype)
+    merged_idx[:, 0::2] = np.where(low_first, low_idx, high_idx)
+    merged_idx[:, 1::2] = np.where(low_first, high_idx, low_idx)
+    merged_val[:, 0::2] = np.where(low_first, low_val, high_val)
+    merged_val[:, 1::2] = np.where(low_first, high_val, low_val)
+    return merged_idx, merged_val
+
+
+def build_levels(values, min_bucket=MIN_BUCKET, min_points=MIN_LEVEL_POINTS):
+    """All levels for a frames x stations array, finest first; [] for short records."""
+    frames = len(values)
+    if 2 * -(-frames // min_bucket) >= frames:
+        return []
+    indices, samples = minmax_level(values, min_bucket)
+    levels = [(min_bucket, indices, samples)]
+    while indices.shape[1] > min_points:
+        indices, samples = coarsen_level(indices, samples)
+        levels.append((levels[-1][0] * 2, indices, samples))
+    return levels
+
+
+def pick_level(levels, visible_frames, width_px):
+    """
+    Coarsest level whose buckets fit within one pixel column of the plot, or
+    None when the full-resolution record is needed (or no levels exist).
+    """
+    frames_per_px = visible_frames / max(1, width_px)
+    chosen = None
+    for level in levels:
+        if level[0] <= frames_per_px:
+            chosen = level
+    return chosen
@@ -2,14 +2,51 @@
 """
 Export frame data cache to JSON for client-side animation
 This will create a JSON file that can be loaded by the browser for pure client-side animation
+
+--format compact instead writes a small JSON header plus one little-endian
+binary buffer of quantized deltas (see export_compact), which static/app.js
+reads straight into typed arrays. --format chunked splits that buffer into
+time-ordered files (one hour each by default) plus an index (see
+export_chunked), so the client can start on the first chunk. --format
+levels writes min/max downsampled copies of every station's series (see
+export_levels) for long records.
+
+--stream writes the same JSON document frame batch by frame batch straight
+from the interpolated pivot (see stream_export_json), so peak memory no
+longer holds the whole client document twice.
 """
 
+import argparse
+import os
 import pickle
 import json
+import time
 import pandas as pd
 import numpy as np
 from datetime import datetime
 
+from downsample import build_levels
+from frame_builder import axis_refs, cursor_shapes, frame_values
+from frame_store import FrameStore, STORE_DIR
+from generate_frame_cache import load_interpolated_pivot
+from station_registry import load_registry
+from pipeline_state import load_state, save_state
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Compact format: deltas quantized to int16 with the finest power-of-ten scale that
+# still fits the largest |delta| (0.1 mm for anything under 3.27 m), never below 1e-5 m.
+# -32768 is never a quantized value (|raw| <= 32767): it marks a missing (NaN) sample.
+COMPACT_FORMAT_VERSION = 1
+MIN_INT16_SCALE = 1e-5
+INT16_NAN = np.iinfo(np.int16).min
+CHUNK_DIR = "frame_chunks"
+CHUNK_FRAMES = 60  # one hour of 1-minute frames
+LEVELS_DIR = "frame_levels"
+
 def convert_numpy_types(obj):
     """Convert numpy types to Python native types for JSON serialization"""
     if isinstance(obj, np.ndarray):
@@ -28,8 +65,12 @@ def convert_numpy_types(obj):
         return [convert_numpy_types(item) for item in obj]
     return obj
 
-def export_frame_data_to_json():
+def export_frame_data_to_json(incremental=False):
     """Export the frame data cache to JSON format"""
+    baseline_rss = peak_rss_mb()
+    start_time = time.perf_counter()
+    output_file = "data/frame_data_client.json"
+    state = load_state()
     print("🔄 Loading frame data cache...")
     
     # Load the existing frame cache
@@ -38,15 +79,17 @@ def export_frame_data_to_json():
     
     print(f"✅ Loaded {len(frame_data_cache)} frames")
     
-    # Load station metadata
-    with open("data/station_metadata.json", "r") as f:
-        station_metadata = json.load(f)
+    # Station metadata, plus what the browser draws for the displayed stations
+    registry = load_registry()
+    station_metadata = registry.metadata
     
     # Create the client-side data structure
     client_data = {
         "metadata": {
             "total_frames": len(frame_data_cache),
             "stations": station_metadata,
+            "station_info": registry.client_info(registry.display_order()),
+            "epicenter": registry.client_epicenter(),
             "export_timestamp": datetime.now().isoformat(),
             "data_source": "NOAA CO-OPS API",
             "description": "Tsunami wave propagation data following 2025 Kamchatka earthquake"
@@ -54,10 +97,27 @@ def export_frame_data_to_json():
         "frames": {}
     }
     
+    # Incremental: start from the previous export and rewrite only rebuilt frames
+    start_idx = 0
+    if incremental and os.path.exists(output_file):
+        if state["export_dirty_from"] is None:
+            print("✅ No rebuilt frames since the last export; nothing to do.")
+            return
+        start_idx = state["export_dirty_from"]
+        with open(output_file) as f:
+            previous = json.load(f)
+        client_data["frames"] = {k: v for k, v in previous["frames"].items() if int(k) < start_idx}
+        print(f"♻️  Reusing {len(client_data['frames'])} exported frames, rewriting from frame {start_idx}")
+    
     print("🔄 Converting frame data...")
     
-    # Convert each frame, ensuring all numpy types are converted
+    # Convert each frame, ensuring all numpy types are converted. The cache keeps
+    # one timestamp per frame; the client still gets each subplot's cursor shape.
+    refs = axis_refs(len(next(iter(frame_data_cache.values()))['x_values'])) if frame_data_cache else []
     for frame_idx, frame_data in frame_data_cache.items():
+        if frame_idx < start_idx:
+            continue
+        frame_data = {**frame_data, 'timeseries_shapes': cursor_shapes(frame_data['timestamp'], refs)}
         # Convert the frame data to JSON-serializable format
         converted_frame = {}
         for key, value in frame_data.items():
@@ -72,19 +132,286 @@ def export_frame_data_to_json():
     print("🔄 Writing JSON file...")
     
     # Write to JSON file with optimized settings
-    with open("data/frame_data_client.json", "w") as f:
+    with open(output_file, "w") as f:
         json.dump(client_data, f, separators=(',', ':'))  # Compact format
+    state["export_dirty_from"] = None
+    save_state(state)
     
     # Get file size
-    import os
-    file_size = os.path.getsize("data/frame_data_client.json")
+    file_size = os.path.getsize(output_file)
     file_size_mb = file_size / (1024 * 1024)
     
     print(f"✅ Export complete!")
-    print(f"📁 File: data/frame_data_client.json")
+    print(f"📁 File: {output_file}")
     print(f"📊 Size: {file_size_mb:.2f} MB")
     print(f"🎯 Frames: {len(frame_data_cache)}")
     print(f"🏠 Stations: {len(station_metadata)}")
+    peak = peak_rss_mb()
+    if peak is not None:
+        elapsed = time.perf_counter() - start_time
+        print(f"💾 Peak RSS: {peak:.1f} MB ({peak - baseline_rss:+.1f} MB during export, "
+              f"{len(frame_data_cache) / elapsed:,.0f} frames/s)")
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MB (None where unsupported)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if os.uname().sysname == "Darwin" else peak / 1024  # bytes on macOS, KB on Linux
+
+def stream_export_json(output_file="data/frame_data_client.json", batch_size=1000):
+    """
+    Stream the client JSON straight from the interpolated pivot.
+
+    Same document as export_frame_data_to_json (minus the export timestamp),
+    but frames are encoded batch_size at a time: one tolist() and one
+    datetime_as_string() per batch instead of a recursive per-value walk,
+    and the shared x_values / cursor-shape JSON is encoded once and reused.
+    """
+    baseline_rss = peak_rss_mb()
+    start_time = time.perf_counter()
+    print("🔄 Loading interpolated pivot...")
+    df_pivot_interp, station_order, distances = load_interpolated_pivot()
+    values = frame_values(df_pivot_interp)
+    timestamps = df_pivot_interp.index.to_numpy(dtype="datetime64[s]")
+    total = len(values)
+    
+    registry = load_registry()
+    metadata = {
+        "total_frames": total,
+        "stations": registry.metadata,
+        "station_info": registry.client_info(station_order),
+        "epicenter": registry.client_epicenter(),
+        "export_timestamp": datetime.now().isoformat(),
+        "data_source": "NOAA CO-OPS API",
+        "description": "Tsunami wave propagation data following 2025 Kamchatka earthquake"
+    }
+    
+    encode = json.JSONEncoder(separators=(',', ':')).encode
+    x_json = encode([float(d) for d in distances])
+    placeholder = '"@@TIMESTAMP@@"'
+    shapes_template = encode(cursor_shapes("@@TIMESTAMP@@", axis_refs(len(station_order))))
+    
+    print(f"🔄 Streaming {total} frames in batches of {batch_size}...")
+    with open(output_file, "w") as f:
+        f.write('{"metadata":' + encode(metadata) + ',"frames":{')
+        for batch_start in range(0, total, batch_size):
+            rows = values[batch_start:batch_start + batch_size].tolist()
+            stamps = np.datetime_as_string(timestamps[batch_start:batch_start + batch_size], unit="s")
+            parts = []
+            for offset, (row, stamp) in enumerate(zip(rows, stamps)):
+                ts_json = f'"{stamp}"'
+                parts.append(f'"{batch_start + offset}":{{"x_values":{x_json},"wave_values":{encode(row)},'
+                             f'"timestamp":{ts_json},"timeseries_shapes":{shapes_template.replace(placeholder, ts_json)}}}')
+            if batch_start:
+                f.write(",")
+            f.write(",".join(parts))
+            print(f"  Streamed {min(batch_start + batch_size, total)}/{total} frames...")
+        f.write("}}")
+    
+    state = load_state()
+    state["export_dirty_from"] = None
+    save_state(state)
+    
+    elapsed = time.perf_counter() - start_time
+    file_size_mb = os.path.getsize(output_file) / (1024 * 1024)
+    peak = peak_rss_mb()
+    print(f"✅ Streaming export complete!")
+    print(f"📁 File: {output_file}")
+    print(f"📊 Size: {file_size_mb:.2f} MB")
+    print(f"🎯 Frames: {total} ({total / elapsed:,.0f} frames/s, {file_size_mb / elapsed:.1f} MB/s)")
+    if peak is not None:
+        print(f"💾 Peak RSS: {peak:.1f} MB ({peak - baseline_rss:+.1f} MB during export)")
+
+def load_uniform_frames(store_dir=STORE_DIR):
+    """Frame store deltas plus start/step in ms; binary exports need a fixed step."""
+    print("🔄 Loading frame store...")
+    store = FrameStore(store_dir)
+    deltas, stamps = store.frames()
+    steps = np.diff(stamps)
+    if len(stamps) > 1 and not (steps == steps[0]).all():
+        raise ValueError("Binary export needs evenly spaced frames; use the JSON format instead")
+    step_ms = int(steps[0] // 1_000_000) if len(stamps) > 1 else 60_000
+    return store, deltas, int(stamps[0] // 1_000_000), step_ms
+
+def encode_deltas(deltas, encoding):
+    """Little-endian sample buffer and the scale that maps it back to metres."""
+    if encoding == "int16":
+        finite = np.isfinite(deltas)
+        peak = float(np.abs(deltas[finite]).max()) if finite.any() else 0.0
+        scale = max(MIN_INT16_SCALE, 10.0 ** np.ceil(np.log10(max(peak, 1e-12) / np.iinfo(np.int16).max)))
+        raw = np.round(np.where(finite, deltas, 0.0) / scale)
+        return np.where(finite, raw, INT16_NAN).astype("<i2"), scale
+    return deltas.astype("<f4"), 1.0
+
+def binary_header(store, total_frames, start_ms, step_ms, encoding, scale):
+    """Header fields shared by the compact and chunked exports."""
+    registry = load_registry()
+    return {
+        "format": "wave-frames",
+        "version": COMPACT_FORMAT_VERSION,
+        "total_frames": int(total_frames),
+        "stations": store.station_order,
+        "distances_km": store.distances,
+        "station_info": registry.client_info(store.station_order),
+        "epicenter": registry.client_epicenter(),
+        "start_ms": start_ms,
+        "step_ms": step_ms,
+        "encoding": encoding,
+        "scale": scale,
+        "nan": int(INT16_NAN) if encoding == "int16" else None,
+        "byte_order": "little",
+        "layout": "frame-major",
+    }, registry.metadata
+
+def export_compact(output_dir="data", encoding="int16", store_dir=STORE_DIR):
+    """
+    Export the frame store as frame_data_compact.json + frame_data_compact.bin.
+
+    The header carries station order, distances, start timestamp and fixed
+    step; the buffer is frames x stations deltas, frame-major, little-endian
+    int16 (value = raw * scale) or float32.
+    """
+    store, deltas, start_ms, step_ms = load_uniform_frames(store_dir)
+    payload, scale = encode_deltas(deltas, encoding)
+
+    os.makedirs(output_dir, exist_ok=True)
+    bin_name = "frame_data_compact.bin"
+    header, station_metadata = binary_header(store, len(deltas), start_ms, step_ms, encoding, scale)
+    header.update({
+        "data": bin_name,
+        "station_metadata": station_metadata,
+        "export_timestamp": datetime.now().isoformat(),
+        "data_source": "NOAA CO-OPS API",
+        "description": "Tsunami wave propagation data following 2025 Kamchatka earthquake"
+    })
+    header_file = os.path.join(output_dir, "frame_data_compact.json")
+    with open(header_file, "w") as f:
+        json.dump(header, f, separators=(',', ':'))
+    with open(os.path.join(output_dir, bin_name), "wb") as f:
+        f.write(payload.tobytes())
+
+    header_size = os.path.getsize(header_file)
+    print(f"✅ Compact export complete!")
+    print(f"📁 Files: {header_file} ({header_size / 1024:.1f} KB), "
+          f"{os.path.join(output_dir, bin_name)} ({payload.nbytes / 1024:.1f} KB, {encoding})")
+    print(f"🎯 Frames: {len(deltas)} every {step_ms / 1000:.0f}s")
+    print(f"🏠 Stations: {len(store.station_order)}")
+
+def export_chunked(output_dir="data", encoding="int16", chunk_frames=CHUNK_FRAMES, store_dir=STORE_DIR):
+    """
+    Export the frame store as time-ordered binary chunks plus an index, so the
+    client can start on the first chunk instead of waiting for the event.
+
+    <output_dir>/frame_chunks/index.json lists every chunk's file, first frame
+    and frame count next to the compact header fields; each chunk_NNNN.bin is
+    a compact buffer for its frames. All chunks share one scale.
+    """
+    store, deltas, start_ms, step_ms = load_uniform_frames(store_dir)
+    payload, scale = encode_deltas(deltas, encoding)
+
+    chunk_dir = os.path.join(output_dir, CHUNK_DIR)
+    os.makedirs(chunk_dir, exist_ok=True)
+    for name in os.listdir(chunk_dir):  # the chunk count may have shrunk
+        if name.startswith("chunk_") and name.endswith(".bin"):
+            os.remove(os.path.join(chunk_dir, name))
+
+    chunks = []
+    for n, start in enumerate(range(0, len(payload), chunk_frames)):
+        block = payload[start:start + chunk_frames]
+        name = f"chunk_{n:04d}.bin"
+        with open(os.path.join(chunk_dir, name), "wb") as f:
+            f.write(block.tobytes())
+        chunks.append({"file": f"{CHUNK_DIR}/{name}", "start": start, "frames": len(block)})
+
+    index, station_metadata = binary_header(store, len(deltas), start_ms, step_ms, encoding, scale)
+    index.update({
+        "chunk_frames": chunk_frames,
+        "chunks": chunks,
+        "station_metadata": station_metadata,
+        "export_timestamp": datetime.now().isoformat(),
+        "data_source": "NOAA CO-OPS API",
+        "description": "Tsunami wave propagation data following 2025 Kamchatka earthquake"
+    })
+    index_file = os.path.join(chunk_dir, "index.json")
+    with open(index_file, "w") as f:
+        json.dump(index, f, separators=(',', ':'))
+
+    print(f"✅ Chunked export complete!")
+    print(f"📁 Index: {index_file} ({os.path.getsize(index_file) / 1024:.1f} KB)")
+    print(f"🧩 Chunks: {len(chunks)} x {chunk_frames} frames "
+          f"({payload[:chunk_frames].nbytes / 1024:.1f} KB each, {encoding})")
+    print(f"🎯 Frames: {len(deltas)} every {step_ms / 1000:.0f}s")
+
+def export_levels(output_dir="data", encoding="int16", store_dir=STORE_DIR):
+    """
+    Export min/max downsampling levels of the station time series.
+
+    <output_dir>/frame_levels/index.json lists each level's bucket size and
+    points per station. level_NN.bin holds the uint32 frame numbers
+    (stations x points, station-major), then the samples in the compact
+    encoding with the full export's scale. The client picks a level by how
+    many frames one pixel covers and draws full resolution below the finest.
+    """
+    store, deltas, start_ms, step_ms = load_uniform_frames(store_dir)
+    payload, scale = encode_deltas(deltas, encoding)
+    levels = build_levels(np.asarray(deltas))
+
+    levels_dir = os.path.join(output_dir, LEVELS_DIR)
+    os.makedirs(levels_dir, exist_ok=True)
+    for name in os.listdir(levels_dir):  # the level count may have shrunk
+        if name.startswith("level_") and name.endswith(".bin"):
+            os.remove(os.path.join(levels_dir, name))
+
+    entries = []
+    columns = np.ascontiguousarray(payload.T)
+    for n, (bucket, indices, _) in enumerate(levels):
+        name = f"level_{n:02d}.bin"
+        samples = np.take_along_axis(columns, indices.astype(np.intp), axis=1)
+        with open(os.path.join(levels_dir, name), "wb") as f:
+            f.write(indices.astype("<u4").tobytes())
+            f.write(samples.tobytes())
+        entries.append({"file": f"{LEVELS_DIR}/{name}", "bucket": bucket, "points": int(indices.shape[1])})
+
+    index, _ = binary_header(store, len(deltas), start_ms, step_ms, encoding, scale)
+    index.update({"format": "wave-levels", "layout": "station-major", "levels": entries})
+    index_file = os.path.join(levels_dir, "index.json")
+    with open(index_file, "w") as f:
+        json.dump(index, f, separators=(',', ':'))
+
+    print(f"✅ Levels export complete!")
+    print(f"📁 Index: {index_file}")
+    for entry in entries:
+        print(f"📉 {entry['file']}: {entry['bucket']} frames/bucket, {entry['points']} points per station")
+    if not entries:
+        print(f"ℹ️  {len(deltas)} frames is short enough that no level would save points")
 
 if __name__ == "__main__":
-    export_frame_data_to_json()
+    parser = argparse.ArgumentParser(description="Export the frame cache to client-side JSON")
+    parser.add_argument("--incremental", action="store_true",
+                        help="rewrite only frames rebuilt since the last export")
+    parser.add_argument("--format", choices=["json", "compact", "chunked", "levels"], default="json",
+                        help="compact = JSON header + binary delta buffer for static/app.js; "
+                             "chunked = the same buffer split into time-ordered files + index; "
+                             "levels = min/max downsampled time series")
+    parser.add_argument("--encoding", choices=["int16", "float32"], default="int16",
+                        help="sample type of the compact buffer")
+    parser.add_argument("--output-dir", default="data", help="where the compact/chunked files are written")
+    parser.add_argument("--chunk-frames", type=int, default=CHUNK_FRAMES,
+                        help="frames per chunk for --format chunked (60 = one hour)")
+    parser.add_argument("--stream", action="store_true",
+                        help="JSON format: write frames in batches straight from the pivot")
+    parser.add_argument("--batch-size", type=int, default=1000, help="frames per streamed batch")
+    args = parser.parse_args()
+    if args.stream and (args.incremental or args.format != "json"):
+        parser.error("--stream always writes the full JSON document")
+    if args.format == "compact":
+        export_compact(args.output_dir, args.encoding)
+    elif args.format == "chunked":
+        export_chunked(args.output_dir, args.encoding, args.chunk_frames)
+    elif args.format == "levels":
+        export_levels(args.output_dir, args.encoding)
+    elif args.stream:
+        stream_export_json(batch_size=args.batch_size)
+    else:
+        export_frame_data_to_json(incremental=args.incremental)
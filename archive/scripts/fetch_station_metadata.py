@@ -1,25 +1,135 @@
-import requests
+#!/usr/bin/env python3
+"""
+Refresh NOAA's metadata for every station in the registry file.
+
+Requests go through the shared fetch engine (pooled session, bounded
+thread pool, retries) and the on-disk response cache, so a re-run within
+--ttl downloads nothing and a stale entry is revalidated with its ETag.
+NOAA's fields (name, lat, lng, state, type) are merged into the existing
+entries; our own fields (key, region, display) are kept, and the JSON is
+only rewritten when something changed.
+
+Add stations by passing their ids, e.g. `fetch_station_metadata.py 1612200`.
+New stations are hidden from the apps (display false) until edited. With
+--bulk the whole NOAA water-level station list comes down in one request
+instead of one request per station, which is quicker for hundreds of ids.
+"""
+
+import argparse
 import json
+import logging
+import os
+import time
+
+from noaa_fetch import FetchEngine
+from response_cache import CACHE_DIR, ResponseCache, fetch_json, request_key
+from station_registry import METADATA_FILE
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+
+MDAPI_URL = os.environ.get("NOAA_MDAPI_URL", "https://api.tidesandcurrents.noaa.gov/mdapi/prod/webapi")
+METADATA_TTL = 7 * 86400  # station metadata rarely changes; revalidate weekly
+NOAA_FIELDS = ("name", "lat", "lng", "state", "type")
+
+
+def fetch_station(sid, engine, response_cache):
+    """NOAA's record for one station id, or None if the request failed."""
+    try:
+        payload = fetch_json(engine, response_cache, f"{MDAPI_URL}/stations/{sid}.json", None,
+                             request_key(sid, "mdapi-station"), label=f"{sid} metadata")
+    except Exception as e:
+        logging.error(f"Failed to fetch metadata for {sid}: {e}")
+        return None
+    stations = (payload or {}).get("stations") or [None]
+    return stations[0]
+
+
+def fetch_network(engine, response_cache, station_type="waterlevels"):
+    """{id: record} for NOAA's whole station list of one type, in a single request."""
+    payload = fetch_json(engine, response_cache, f"{MDAPI_URL}/stations.json", {"type": station_type},
+                         request_key("*", "mdapi-stations", station_type), label=f"{station_type} station list")
+    return {str(s["id"]): s for s in (payload or {}).get("stations", [])}
+
+
+def new_entry(record, existing_keys):
+    """Registry entry for a station not in the file yet; hidden until someone places it."""
+    key = record.get("name") or str(record["id"])
+    if key in existing_keys:
+        key = f"{key} {record['id']}"
+    return {"key": key, "region": record.get("state") or None, "display": False}
+
+
+def merge(metadata, records):
+    """Merge NOAA records into the metadata in place; returns (added, updated, unchanged) id lists."""
+    added, updated, unchanged = [], [], []
+    keys = {entry.get("key") or entry.get("name") for entry in metadata.values()}
+    for sid, record in records.items():
+        if record is None:
+            continue
+        entry = metadata.get(sid)
+        if entry is None:
+            entry = new_entry(record, keys)
+            keys.add(entry["key"])
+            added.append(sid)
+        merged = {**entry, **{field: record.get(field) for field in NOAA_FIELDS}}
+        if sid not in added:
+            (updated if merged != entry else unchanged).append(sid)
+        metadata[sid] = merged
+    return added, updated, unchanged
+
+
+def save(metadata, path=METADATA_FILE):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(metadata, f, indent=2)
+    os.replace(tmp, path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("ids", nargs="*", help="station ids to add to the registry file")
+    parser.add_argument("--metadata", default=METADATA_FILE, help="registry file to refresh")
+    parser.add_argument("--bulk", action="store_true", help="take every record from NOAA's station list (one request)")
+    parser.add_argument("--offline", action="store_true", help="replay cached responses only, no network I/O")
+    parser.add_argument("--no-cache", action="store_true", help="bypass the on-disk response cache")
+    parser.add_argument("--cache-dir", default=CACHE_DIR, help="response cache directory")
+    parser.add_argument("--ttl", type=float, default=METADATA_TTL, help="seconds before a cached response is revalidated")
+    parser.add_argument("--workers", type=int, default=None, help="concurrent requests (default: the fetch engine's pool size)")
+    args = parser.parse_args()
+    if args.offline and args.no_cache:
+        parser.error("--offline replays the response cache; it cannot be combined with --no-cache")
+
+    with open(args.metadata) as f:
+        metadata = json.load(f)
+    station_ids = list(dict.fromkeys([*metadata, *args.ids]))
+
+    engine = FetchEngine() if args.workers is None else FetchEngine(max_workers=args.workers)
+    response_cache = None
+    if not args.no_cache:
+        response_cache = ResponseCache(args.cache_dir, ttl=args.ttl, offline=args.offline)
+
+    start = time.perf_counter()
+    if args.bulk:
+        network = fetch_network(engine, response_cache)
+        records = {sid: network.get(sid) for sid in station_ids}
+        missing = [sid for sid, record in records.items() if record is None]
+        if missing:
+            logging.warning(f"Not in NOAA's water-level station list: {', '.join(missing)}")
+    else:
+        records = dict(zip(station_ids, engine.map(lambda sid: fetch_station(sid, engine, response_cache), station_ids)))
+    engine.report(wall_time=time.perf_counter() - start)
+    if response_cache is not None:
+        response_cache.report()
+        response_cache.evict()
 
-station_ids = [
-    '1611400','1612340','1612401','1612480','1615680','1617433','1617760',
-    '1619910','1630000','1631428','1770000','1820000','1890000'
-]
-
-results = {}
-for sid in station_ids:
-    url = f'https://api.tidesandcurrents.noaa.gov/mdapi/prod/webapi/stations/{sid}.json'
-    r = requests.get(url)
-    j = r.json()
-    station = j.get('stations', [{}])[0]
-    results[sid] = {
-        'name': station.get('name'),
-        'lat': station.get('lat'),
-        'lng': station.get('lng'),
-        'state': station.get('state'),
-        'type': station.get('type')
-    }
-    print(f"{sid}: {results[sid]}")
-
-with open('station_metadata.json', 'w') as f:
-    json.dump(results, f, indent=2)
+    added, updated, unchanged = merge(metadata, records)
+    failed = [sid for sid, record in records.items() if record is None]
+    if added or updated:
+        save(metadata, args.metadata)
+        logging.info(f"✅ Wrote {args.metadata}")
+    else:
+        logging.info(f"✅ {args.metadata} already up to date")
+    logging.info(f"{len(station_ids)} stations: {len(added)} added, {len(updated)} updated, "
+                 f"{len(unchanged)} unchanged, {len(failed)} failed")
+    for sid in added:
+        logging.info(f"  + {sid} {metadata[sid]['name']} (display false; set key/region/display to show it)")
@@ -0,0 +1,99 @@
+"""
+Vectorized frame builder for the animation cache.
+
+The interpolated pivot is pulled out as one 2-D float array and converted
+to Python rows in a single pass, instead of an `.iloc[i]` lookup per frame.
+Data that is identical for every frame is built once and shared: the
+`x_values` distance list is the same object in every frame, so pickle also
+writes it to disk only once. The time-series cursor shapes differ only in
+their timestamp, so a frame keeps just the timestamp; cursor_shapes() turns
+it back into the per-subplot shapes (one shared style, one set of axis refs)
+where a consumer still wants them, e.g. the client JSON export.
+"""
+
+import gc
+
+import numpy as np
+
+CURSOR_LINE = {"color": "blue", "width": 2, "dash": "dot"}
+# Deltas are stored as float32; widened to float64 as is they print as
+# 0.12200000137090683. Frames are quantised on purpose to the compact int16
+# step (0.1 mm), so every export carries the same values. Measured samples
+# (whole mm) are unchanged; interpolated ones across multi-minute gaps
+# (thirds, sevenths of a mm) move by at most 0.05 mm.
+WAVE_DECIMALS = 4
+
+
+def frame_values(df_pivot_interp):
+    """Frames x stations float64 delta matrix, rounded to WAVE_DECIMALS."""
+    return np.ascontiguousarray(np.round(df_pivot_interp.to_numpy(dtype=np.float64), WAVE_DECIMALS))
+
+
+def build_frame_arrays(df_pivot_interp, distances):
+    """Frames x stations delta matrix, frame timestamps and shared x values."""
+    return {
+        "x_values": [float(d) for d in distances],
+        "values": frame_values(df_pivot_interp),
+        "timestamps": df_pivot_interp.index,
+    }
+
+
+def axis_refs(n_stations):
+    """(xref, yref) of every time-series subplot, top to bottom."""
+    return [(f"x{j+1}", f"y{j+1}") for j in range(n_stations)]
+
+
+def cursor_shapes(timestamp, axis_refs):
+    """Current-time marker for every time-series subplot."""
+    return [{
+        "type": "line",
+        "xref": xref,
+        "yref": yref,
+        "x0": timestamp,
+        "x1": timestamp,
+        "y0": -1,
+        "y1": 1,
+        "line": CURSOR_LINE,
+        "layer": "above"
+    } for xref, yref in axis_refs]
+
+
+def cursor_line(timestamp):
+    """Current-time marker as one line down every subplot (they share the x axis)."""
+    return {
+        "type": "line",
+        "xref": "x",
+        "yref": "paper",
+        "x0": timestamp,
+        "x1": timestamp,
+        "y0": 0,
+        "y1": 1,
+        "line": CURSOR_LINE,
+        "layer": "above"
+    }
+
+
+def frames_to_cache(arrays, start=0):
+    """
+    Expand frame arrays into the {index: frame} dict stored in
+    frame_data_cache.pkl, beginning at frame `start`. Frames carry no cursor
+    shapes; see cursor_shapes().
+    """
+    x_values = arrays["x_values"]
+    rows = arrays["values"][start:].tolist()
+    timestamps = arrays["timestamps"][start:]
+    # Millions of small dicts and nothing cyclic: collector passes are pure overhead
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return {
+            start + i: {
+                'x_values': x_values,
+                'wave_values': row,
+                'timestamp': timestamp
+            }
+            for i, (row, timestamp) in enumerate(zip(rows, timestamps))
+        }
+    finally:
+        if gc_enabled:
+            gc.enable()
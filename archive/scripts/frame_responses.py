@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Per-frame callback responses for wave_propagation_dash_app.py.
+
+A frame update in the Dash app is three Dash Patches: every station
+marker's radius/opacity/tooltip, the oscilloscope y-values and the
+time-series cursor position. The dataset is fixed, so this stage renders
+every frame's patches once, offline, and stores them as compact bytes:
+
+    data/frame_responses/
+        header.json    frame count, station order, time span, the layout
+                       indices the patches address, encoding and ETag
+        offsets.npy    int64 byte offsets into responses.bin, frames + 1
+        responses.bin  one gzip member per frame: the JSON list of the
+                       three patches, as the clientside callback returns it
+
+The app serves frame i from /frames/<i> as a slice of responses.bin with
+that frame's own ETag (the decompressed variant gets another), so a frame
+costs the server no marker maths, formatting or serialization, and
+browsers revalidate or reuse what they already have.
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from dash import Patch
+
+from frame_store import FrameStore, STORE_DIR
+
+RESPONSE_DIR = "data/frame_responses"
+FORMAT_VERSION = 1
+MARKER_OFFSET = 2       # map children: tile layer, epicenter, then stations in station_order
+CURSOR_SHAPE_INDEX = 0  # time-series shapes: the cursor line, then the earthquake markers
+
+
+def marker_style(wave_delta):
+    """Circle radius (4-12 px) and fill opacity (0.3-1.0) for a station's wave Δ."""
+    wave_magnitude = abs(wave_delta)
+    size_factor = min(1.0, wave_magnitude / 0.3)  # More sensitive threshold
+    size = 4 + (8 * np.sqrt(size_factor))
+    opacity_factor = min(1.0, wave_magnitude / 0.2)  # Even more sensitive threshold
+    opacity = 0.3 + (0.7 * opacity_factor)
+    return float(size), float(opacity)
+
+
+def frame_patches(wave_values, timestamp, station_order):
+    """(map children, wave figure, time-series figure) Patches for one frame."""
+    map_patch = Patch()
+    for i, name in enumerate(station_order):
+        size, opacity = marker_style(wave_values[i])
+        marker = map_patch[MARKER_OFFSET + i]['props']
+        marker.update({'radius': round(size, 2), 'fillOpacity': round(opacity, 3)})
+        marker['children'][0]['props']['children'] = f"{name}: {wave_values[i]:+.3f}m wave Δ"
+
+    wave_patch = Patch()
+    wave_patch['data'][0]['y'] = [round(float(y), 4) for y in wave_values]
+
+    timeseries_patch = Patch()
+    cursor = timeseries_patch['layout']['shapes'][CURSOR_SHAPE_INDEX]
+    cursor['x0'] = cursor['x1'] = str(pd.Timestamp(timestamp))
+
+    return map_patch, wave_patch, timeseries_patch
+
+
+def encode_frame(patches):
+    body = json.dumps([p.to_plotly_json() for p in patches], separators=(",", ":"), ensure_ascii=False)
+    return gzip.compress(body.encode(), mtime=0)  # fixed mtime: identical frames, identical bytes
+
+
+def build_bundle(store, path=RESPONSE_DIR):
+    """Render every frame of a FrameStore and write the bundle; returns the header."""
+    station_order = list(store.station_order)
+    chunks = []
+    for i in range(len(store)):
+        frame = store.frame(i)
+        chunks.append(encode_frame(frame_patches(frame.wave_values.tolist(), frame.timestamp, station_order)))
+    offsets = np.zeros(len(chunks) + 1, dtype=np.int64)
+    np.cumsum([len(c) for c in chunks], out=offsets[1:])
+    body = b"".join(chunks)
+    timestamps = store.timestamps
+    header = {
+        "format": "frame-responses",
+        "version": FORMAT_VERSION,
+        "frames": len(chunks),
+        "station_order": station_order,
+        "start": str(pd.Timestamp(timestamps[0])),
+        "end": str(pd.Timestamp(timestamps[-1])),
+        "marker_offset": MARKER_OFFSET,
+        "cursor_shape_index": CURSOR_SHAPE_INDEX,
+        "encoding": "gzip",
+        "etag": hashlib.sha256(body + offsets.tobytes()).hexdigest()[:20],
+    }
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, "responses.bin"), "wb") as f:
+        f.write(body)
+    np.save(os.path.join(path, "offsets.npy"), offsets)
+    with open(os.path.join(path, "header.json"), "w") as f:
+        json.dump(header, f, indent=2)
+    return header
+
+
+class ResponseBundle:
+    """Read side: frame(i) is the stored gzip bytes, ready to send."""
+
+    def __init__(self, path=RESPONSE_DIR):
+        with open(os.path.join(path, "header.json")) as f:
+            self.header = json.load(f)
+        self.offsets = np.load(os.path.join(path, "offsets.npy")).tolist()
+        with open(os.path.join(path, "responses.bin"), "rb") as f:
+            self.body = f.read()
+        # Per frame, so a rebuild that changes some frames keeps the others' ETags
+        self.etags = [hashlib.sha256(self.frame(i)).hexdigest()[:20] for i in range(len(self))]
+
+    def __len__(self):
+        return self.header["frames"]
+
+    def etag(self, i, gzipped=True):
+        """Strong ETag of frame i; the decompressed variant is other bytes, so it gets its own."""
+        return self.etags[i] if gzipped else f"{self.etags[i]}-identity"
+
+    def frame(self, i):
+        return self.body[self.offsets[i]:self.offsets[i + 1]]
+
+    def matches(self, station_order, start, end):
+        """True if the bundle was built by this code for this data."""
+        h = self.header
+        return (h["version"] == FORMAT_VERSION and h["marker_offset"] == MARKER_OFFSET
+                and h["cursor_shape_index"] == CURSOR_SHAPE_INDEX
+                and h["station_order"] == list(station_order)
+                and h["start"] == str(pd.Timestamp(start)) and h["end"] == str(pd.Timestamp(end)))
+
+
+def load_bundle(path=RESPONSE_DIR):
+    if not os.path.exists(os.path.join(path, "header.json")):
+        return None
+    return ResponseBundle(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--store", default=STORE_DIR, help="frame store to render")
+    parser.add_argument("--out-dir", default=RESPONSE_DIR, help="bundle directory")
+    args = parser.parse_args()
+
+    start = time.time()
+    store = FrameStore(args.store)
+    header = build_bundle(store, args.out_dir)
+    size = os.path.getsize(os.path.join(args.out_dir, "responses.bin"))
+    print(f"✅ {header['frames']} frame responses → {args.out_dir} "
+          f"({size / 1024:.0f} KB, {size / header['frames']:.0f} B/frame gzip) in {time.time() - start:.2f}s")
@@ -0,0 +1,96 @@
+"""
+Columnar frame store: the animation frames as three flat pieces instead of
+a dict of per-frame dicts.
+
+    <store>/header.json     station order, distances, frame count, dtypes
+    <store>/deltas.npy      float32 [frames x stations] wave deltas (m)
+    <store>/timestamps.npy  int64 [frames] nanoseconds since the epoch (UTC)
+
+Station distances live once in the header; the cursor shapes that
+frame_data_cache.pkl repeats per frame are derived from the timestamp on
+demand. Memory and load time scale with frames x stations x 4 bytes rather
+than with Python object overhead.
+
+Opened with mmap=True the arrays are mapped read-only instead of read:
+nothing is parsed at startup, and every process mapping the same files
+(e.g. gunicorn workers) shares one copy through the OS page cache.
+"""
+
+import json
+import os
+
+import numpy as np
+
+STORE_DIR = "data/frame_store"
+FORMAT_VERSION = 1
+
+
+def save_frame_store(values, timestamps, station_order, distances, path=STORE_DIR):
+    """Write a store from a frames x stations array and a datetime64 index."""
+    os.makedirs(path, exist_ok=True)
+    deltas = np.ascontiguousarray(values, dtype=np.float32)
+    stamps = np.asarray(timestamps, dtype="datetime64[ns]").view(np.int64)
+    if deltas.shape != (len(stamps), len(station_order)):
+        raise ValueError(f"deltas shape {deltas.shape} does not match "
+                         f"{len(stamps)} timestamps x {len(station_order)} stations")
+    np.save(os.path.join(path, "deltas.npy"), deltas)
+    np.save(os.path.join(path, "timestamps.npy"), stamps)
+    header = {
+        "version": FORMAT_VERSION,
+        "frames": int(deltas.shape[0]),
+        "stations": list(station_order),
+        "distances_km": [float(d) for d in distances],
+        "deltas": {"file": "deltas.npy", "dtype": "float32", "shape": list(deltas.shape)},
+        "timestamps": {"file": "timestamps.npy", "dtype": "int64", "unit": "ns"},
+    }
+    with open(os.path.join(path, "header.json"), "w") as f:
+        json.dump(header, f, indent=2)
+    return header
+
+
+class FrameView:
+    """One frame; `wave_values` is a row view into the store, not a copy."""
+
+    __slots__ = ("index", "wave_values", "timestamp_ns")
+
+    def __init__(self, index, wave_values, timestamp_ns):
+        self.index = index
+        self.wave_values = wave_values
+        self.timestamp_ns = timestamp_ns
+
+    @property
+    def timestamp(self):
+        return np.datetime64(int(self.timestamp_ns), "ns")
+
+
+class FrameStore:
+    """Read side of the store: frame(i) and slicing return views, never copies."""
+
+    def __init__(self, path=STORE_DIR, mmap=False):
+        with open(os.path.join(path, "header.json")) as f:
+            self.header = json.load(f)
+        if self.header.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported frame store version {self.header.get('version')} in {path}")
+        mmap_mode = "r" if mmap else None
+        self.deltas = np.load(os.path.join(path, self.header["deltas"]["file"]), mmap_mode=mmap_mode)
+        self.timestamps_ns = np.load(os.path.join(path, self.header["timestamps"]["file"]), mmap_mode=mmap_mode)
+        self.station_order = self.header["stations"]
+        self.distances = self.header["distances_km"]
+
+    def __len__(self):
+        return self.header["frames"]
+
+    def frame(self, i):
+        return FrameView(i, self.deltas[i], self.timestamps_ns[i])
+
+    def frames(self, start=0, stop=None):
+        """Contiguous block of frames as (deltas view, timestamps view)."""
+        return self.deltas[start:stop], self.timestamps_ns[start:stop]
+
+    def station(self, name):
+        """One station's full series as a strided column view."""
+        return self.deltas[:, self.station_order.index(name)]
+
+    @property
+    def timestamps(self):
+        return self.timestamps_ns.view("datetime64[ns]")
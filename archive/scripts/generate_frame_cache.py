@@ -4,94 +4,98 @@ Generate pre-calculated frame data cache for tsunami visualization.
 Run this once to create the cache file, then the main app loads it instantly.
 """
 
+import argparse
+import os
 import pandas as pd
 import pickle
 import time
 
-def generate_frame_cache():
-    print("🚀 Generating frame data cache...")
-    start_time = time.time()
-    
-    # Load the same data as main app (exact same method)
-    with open("data/pivoted_wave_data.pkl", "rb") as f:
-        pivoted = pickle.load(f)
-    df_pivot = pivoted['df_pivot']  # index: t, columns: station, values: delta
-    station_order_orig = pivoted['station_order']
-    station_distances = pivoted['station_distance']
-    
-    # Apply same filtering as main app
+from frame_builder import build_frame_arrays, frames_to_cache
+from frame_responses import build_bundle, RESPONSE_DIR
+from frame_store import FrameStore, save_frame_store, STORE_DIR
+from pipeline_state import load_state, save_state, mark_dirty
+from sample_store import load_pivot, PIVOT_STORE_DIR
+from station_registry import load_registry
+
+def load_interpolated_pivot(path=PIVOT_STORE_DIR):
+    """Pivoted deltas trimmed to the event window, gap-filled and limited to displayed stations."""
+    # Same event window and displayed stations as the main app, read straight from the pivot store
+    registry = load_registry()
     earthquake_time = pd.Timestamp('2025-07-29 23:24:52')
     end_time = pd.Timestamp('2025-07-31 00:00:00')
-    df_pivot_filtered = df_pivot[(df_pivot.index >= earthquake_time) & 
-                                (df_pivot.index <= end_time)]
+    pivoted = load_pivot(path, stations=[s.key for s in registry.select(displayed=True)],
+                         start=earthquake_time, end=end_time)
+    df_pivot_filtered = pivoted['df_pivot']  # index: t, columns: station, values: delta
     
     # Interpolate and fill missing values (same as main app)
     df_pivot_interp = df_pivot_filtered.interpolate(axis=0).ffill().bfill()
-    all_frames = df_pivot_interp.index
-    
-    # Remove filtered stations (exact same as main app)
-    stations_to_remove = ['Pago Pago', 'Kwajalein', 'Apra Harbor', 'Pago Bay', 'Pearl Harbor', 'Mokuoloe']
-    for station in stations_to_remove:
-        if station in df_pivot_interp.columns:
-            df_pivot_interp = df_pivot_interp.drop(columns=[station])
     
-    # Update station_order to match filtered data
-    station_order = [s for s in station_order_orig if s in df_pivot_interp.columns]
-    distances = [station_distances[station] for station in station_order]
+    # Nearest first, with the registry's precomputed distances
+    station_order = registry.display_order(available=df_pivot_interp.columns)
+    distances = [registry.by_key(station).distance_km for station in station_order]
+    return df_pivot_interp[station_order], station_order, distances
+
+def generate_frame_cache(incremental=False):
+    print("🚀 Generating frame data cache...")
+    start_time = time.time()
+    cache_file = 'data/frame_data_cache.pkl'
     
-    print(f"📊 Processing {len(df_pivot_interp)} frames with {len(station_order)} stations...")
+    df_pivot_interp, station_order, distances = load_interpolated_pivot()
+    all_frames = df_pivot_interp.index
     
-    # Pre-calculate frame data cache
+    # Incremental: keep frames before the first one touched by newly appended data
+    state = load_state()
+    start_idx = 0
     frame_data_cache = {}
+    if incremental and os.path.exists(cache_file):
+        if state["dirty_from"] is None:
+            print("✅ No new data since the last run; frame cache is up to date.")
+            return
+        start_idx = int(all_frames.searchsorted(pd.Timestamp(state["dirty_from"])))
+        with open(cache_file, "rb") as f:
+            previous = pickle.load(f)
+        frame_data_cache = {i: frame for i, frame in previous.items() if i < start_idx}
+        print(f"♻️  Reusing {len(frame_data_cache)} cached frames, rebuilding from frame {start_idx}")
+    
+    print(f"📊 Processing {len(df_pivot_interp) - start_idx} frames with {len(station_order)} stations...")
     
-    for i in range(len(df_pivot_interp)):
-        # Pre-calculate wave data
-        x_values = [float(d) for d in distances]
-        wave_values = df_pivot_interp.iloc[i].values.tolist()
-        timestamp = all_frames[i]
-        
-        # Pre-calculate time series shapes (current time markers only)
-        timeseries_shapes = []
-        # Add current time marker (animated) for all subplots
-        for j in range(len(station_order)):
-            timeseries_shapes.append({
-                "type": "line",
-                "xref": f"x{j+1}",
-                "yref": f"y{j+1}",
-                "x0": timestamp,
-                "x1": timestamp,
-                "y0": -1,
-                "y1": 1,
-                "line": {"color": "blue", "width": 2, "dash": "dot"},
-                "layer": "above"
-            })
-        
-        frame_data_cache[i] = {
-            'x_values': x_values,
-            'wave_values': wave_values,
-            'timestamp': timestamp,
-            'timeseries_shapes': timeseries_shapes
-        }
-        
-        # Progress indicator
-        if i % 200 == 0:
-            print(f"  ⚡ Processed {i}/{len(df_pivot_interp)} frames...")
+    # Pre-calculate frame data cache: all frames from the 2-D array in one pass
+    frame_arrays = build_frame_arrays(df_pivot_interp, distances)
+    frame_data_cache.update(frames_to_cache(frame_arrays, start=start_idx))
     
     # Save cache to disk
-    cache_file = 'data/frame_data_cache.pkl'
     with open(cache_file, 'wb') as f:
         pickle.dump(frame_data_cache, f, protocol=pickle.HIGHEST_PROTOCOL)
     
+    # Columnar copy of the same frames (rewritten whole: it is one array write)
+    save_frame_store(frame_arrays["values"], frame_arrays["timestamps"], station_order, distances)
+    
+    # Prebuilt Dash callback responses for the same frames (served from /frames/<i>)
+    build_bundle(FrameStore(STORE_DIR))
+    
+    # Hand the rebuilt range on to the client export
+    state["dirty_from"] = None
+    if incremental:
+        mark_dirty(state, "export_dirty_from", start_idx)
+    else:
+        state["export_dirty_from"] = 0
+    save_state(state)
+    
     generation_time = time.time() - start_time
-    total_shapes = len(df_pivot_interp) * len(station_order)
+    total_shapes = (len(df_pivot_interp) - start_idx) * len(station_order)
     memory_usage = total_shapes * 8 / 1024  # rough estimate in KB
     
     print(f"✅ Cache generation complete!")
     print(f"⏱️  Generation time: {generation_time:.3f}s")
     print(f"📁 Cache file: {cache_file}")
+    print(f"📁 Frame store: {STORE_DIR}/")
+    print(f"📁 Frame responses: {RESPONSE_DIR}/")
     print(f"🔢 Total shapes: {total_shapes:,}")
     print(f"💾 Estimated size: ~{memory_usage:.1f}KB")
     print(f"\n🚀 Main app startup should now be ~{generation_time*1000:.0f}ms faster!")
 
 if __name__ == "__main__":
-    generate_frame_cache()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Pre-calculate animation frames from the pivoted data store")
+    parser.add_argument("--incremental", action="store_true",
+                        help="rebuild only frames touched since the last collection run")
+    generate_frame_cache(incremental=parser.parse_args().incremental)
\ No newline at end of file
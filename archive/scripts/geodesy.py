@@ -0,0 +1,61 @@
+"""
+Vectorized great-circle distances and bearings.
+
+Every function broadcasts NumPy-style, so one call covers a single pair, one
+epicenter against every station, or a grid of candidate epicenters against
+hundreds of stations:
+
+    distance_matrix(epicenters, stations)   -> km,  shape (n_epicenters, n_stations)
+    bearing_matrix(epicenters, stations)    -> deg, shape (n_epicenters, n_stations)
+
+Coordinates are decimal degrees; `points` arguments are (lat, lon) pairs of
+shape (n, 2). Distances use the haversine formula on a sphere of radius
+EARTH_RADIUS_KM, matching the scalar function the pipeline used before.
+"""
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km; arguments broadcast against each other."""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=np.float64)) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def initial_bearing_deg(lat1, lon1, lat2, lon2):
+    """Initial bearing from point 1 towards point 2, degrees clockwise from north in [0, 360)."""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=np.float64)) for v in (lat1, lon1, lat2, lon2))
+    dlon = lon2 - lon1
+    y = np.sin(dlon) * np.cos(lat2)
+    x = np.cos(lat1) * np.sin(lat2) - np.sin(lat1) * np.cos(lat2) * np.cos(dlon)
+    return np.degrees(np.arctan2(y, x)) % 360
+
+
+def _as_points(points):
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    return points[:, 0], points[:, 1]
+
+
+def distance_matrix(epicenters, stations):
+    """km from each epicenter (rows) to each station (columns)."""
+    elat, elon = _as_points(epicenters)
+    slat, slon = _as_points(stations)
+    return haversine_km(elat[:, None], elon[:, None], slat[None, :], slon[None, :])
+
+
+def bearing_matrix(epicenters, stations):
+    """Initial bearing from each epicenter (rows) towards each station (columns)."""
+    elat, elon = _as_points(epicenters)
+    slat, slon = _as_points(stations)
+    return initial_bearing_deg(elat[:, None], elon[:, None], slat[None, :], slon[None, :])
+
+
+def station_distances(stations, epicenter_lat, epicenter_lon):
+    """{name: km} for a {name: {"lat", "lon"}} station dict, in one vectorized call."""
+    names = list(stations)
+    coords = [(stations[name]["lat"], stations[name]["lon"]) for name in names]
+    km = distance_matrix([(epicenter_lat, epicenter_lon)], coords)[0]
+    return {name: float(d) for name, d in zip(names, km)}
@@ -0,0 +1,133 @@
+"""
+Concurrent fetch engine for the NOAA CO-OPS APIs.
+
+All requests share one pooled requests.Session and run on a bounded thread
+pool, so collection time is set by the slowest station rather than the sum
+of every round trip. Each host gets its own concurrency cap, transient
+failures are retried with exponential backoff, and every request leaves a
+timing record behind for the end-of-run report.
+
+Set NOAA_API_URL (or pass base_url) to point the pipeline at a local
+stand-in server, e.g. `python -m http.server` serving canned JSON.
+"""
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+NOAA_API_URL = os.environ.get("NOAA_API_URL", "https://api.tidesandcurrents.noaa.gov/api/prod/datagetter")
+
+MAX_WORKERS = 8        # threads in the pool
+PER_HOST_LIMIT = 6     # simultaneous requests to any one host
+RETRIES = 3            # extra attempts after the first
+BACKOFF = 0.5          # seconds; doubles after every failed attempt
+TIMEOUT = 15           # seconds per attempt, same as the old requests.get
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class RetryableStatus(requests.HTTPError):
+    """Raised for HTTP statuses worth another attempt (throttling, 5xx)."""
+
+
+def make_session(pool_size=PER_HOST_LIMIT):
+    """Session whose connection pool is sized to the per-host limit."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class FetchEngine:
+    """Pooled session + bounded thread pool + per-host limits + retries."""
+
+    def __init__(self, session=None, max_workers=MAX_WORKERS, per_host_limit=PER_HOST_LIMIT,
+                 retries=RETRIES, backoff=BACKOFF, timeout=TIMEOUT):
+        self.session = session or make_session(per_host_limit)
+        self.max_workers = max_workers
+        self.per_host_limit = per_host_limit
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.timings = []
+        self._host_slots = {}
+        self._lock = threading.Lock()
+
+    def _slot(self, url):
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self._host_slots:
+                self._host_slots[host] = threading.BoundedSemaphore(self.per_host_limit)
+            return self._host_slots[host]
+
+    def get(self, url, params=None, headers=None, label=None):
+        """GET with retry/backoff; returns the final Response or raises the last error."""
+        start = time.perf_counter()
+        attempts = 0
+        response = None
+        error = None
+        while True:
+            attempts += 1
+            try:
+                with self._slot(url):
+                    response = self.session.get(url, params=params, headers=headers, timeout=self.timeout)
+                if response.status_code in RETRY_STATUS:
+                    raise RetryableStatus(f"HTTP {response.status_code}", response=response)
+                response.raise_for_status()
+                error = None
+                break
+            except (requests.ConnectionError, requests.Timeout, RetryableStatus) as e:
+                error = e
+                if attempts > self.retries:
+                    break
+                delay = self.backoff * 2 ** (attempts - 1)
+                logging.warning(f"{label or url}: {e} (attempt {attempts}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+            except requests.RequestException as e:
+                error = e
+                break
+
+        self._record(label or url, response, attempts, time.perf_counter() - start, error)
+        if error is not None:
+            raise error
+        return response
+
+    def get_json(self, url, params=None, label=None):
+        return self.get(url, params=params, label=label).json()
+
+    def map(self, func, items):
+        """Run func over items on the pool; results come back in input order."""
+        items = list(items)
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, max(1, len(items)))) as pool:
+            return list(pool.map(func, items))
+
+    def _record(self, label, response, attempts, elapsed, error):
+        with self._lock:
+            self.timings.append({
+                "label": label,
+                "status": response.status_code if response is not None else None,
+                "attempts": attempts,
+                "elapsed": elapsed,
+                "bytes": len(response.content) if response is not None else 0,
+                "error": str(error) if error is not None else None,
+            })
+
+    def report(self, wall_time=None):
+        """Log per-request timings and how the wall time compares to the serial sum."""
+        if not self.timings:
+            return
+        for t in sorted(self.timings, key=lambda t: t["elapsed"], reverse=True):
+            status = t["status"] if t["error"] is None else f"ERR {t['error']}"
+            logging.info(f"  {t['elapsed']:6.2f}s  {t['bytes'] / 1024:8.1f}KB  x{t['attempts']}  {status}  {t['label']}")
+        serial = sum(t["elapsed"] for t in self.timings)
+        slowest = max(t["elapsed"] for t in self.timings)
+        summary = f"{len(self.timings)} requests, serial sum {serial:.2f}s, slowest {slowest:.2f}s"
+        if wall_time is not None:
+            summary += f", wall time {wall_time:.2f}s"
+        logging.info(summary)
@@ -0,0 +1,54 @@
+"""
+Bookkeeping for incremental pipeline runs (data/pipeline_state.json).
+
+    high_water        {station: last timestamp with a valid delta}
+    dirty_from        earliest timestamp whose interpolated frame may have
+                      changed since frames were last generated
+    export_dirty_from first frame index the client export still has to rewrite
+
+wave_data_collect_and_cache.py --incremental advances the high-water marks
+and sets dirty_from; generate_frame_cache.py --incremental rebuilds frames
+from there and hands the frame index on to export_frame_data_to_json.py.
+"""
+
+import json
+import os
+
+import pandas as pd
+
+STATE_FILE = "data/pipeline_state.json"
+
+
+def load_state(path=STATE_FILE):
+    if not os.path.exists(path):
+        return {"high_water": {}, "dirty_from": None, "export_dirty_from": None}
+    with open(path) as f:
+        state = json.load(f)
+    state.setdefault("high_water", {})
+    state.setdefault("dirty_from", None)
+    state.setdefault("export_dirty_from", None)
+    return state
+
+
+def save_state(state, path=STATE_FILE):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, path)
+
+
+def high_water_marks(df_pivot):
+    """Last valid timestamp per station column of a pivoted frame."""
+    return {station: str(df_pivot[station].last_valid_index())
+            for station in df_pivot.columns if df_pivot[station].last_valid_index() is not None}
+
+
+def mark_dirty(state, key, value):
+    """Lower a dirty marker to `value` unless an earlier one is still pending."""
+    current = state.get(key)
+    if current is None:
+        state[key] = value
+    elif key == "dirty_from":
+        state[key] = str(min(pd.Timestamp(current), pd.Timestamp(value)))
+    else:
+        state[key] = min(current, value)
@@ -0,0 +1,223 @@
+"""
+Persistent, content-addressed cache for NOAA API responses.
+
+Layout under the cache root:
+
+    keys/<request-hash>.json   metadata: body hash, ETag/Last-Modified,
+                               fetched_at, last_used, optional pinned ttl
+    blobs/<body-hash>.json     the response body, stored once per content
+
+A request key is the hash of (station, product, date range, datum,
+interval), so re-running the pipeline for the same data finds the same
+entry. Fresh entries are served without touching the network; stale ones
+are revalidated with If-None-Match / If-Modified-Since, and a 304 only
+bumps the timestamp. Offline mode never does network I/O at all and
+replays whatever is on disk, stale or not.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+CACHE_DIR = os.environ.get("NOAA_CACHE_DIR", "data/http_cache")
+DEFAULT_TTL = 3600                  # seconds until revalidation; None = always fresh
+MAX_AGE = 30 * 86400                # entries unused this long are evicted
+MAX_BYTES = 512 * 1024 * 1024       # total blob size before LRU eviction
+_UNSET = object()                   # ttl not given: the cache-wide ttl applies
+
+
+def request_key(station, product, begin="recent", end=None, datum="MLLW", interval=None):
+    ident = json.dumps([station, product, begin, end, datum, interval])
+    return hashlib.sha256(ident.encode()).hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, root=CACHE_DIR, ttl=DEFAULT_TTL, max_age=MAX_AGE, max_bytes=MAX_BYTES, offline=False):
+        self.root = root
+        self.ttl = ttl
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self.stats = {"hits": 0, "misses": 0, "revalidated": 0, "stale_served": 0,
+                      "stored": 0, "evicted": 0}
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(root, "keys"), exist_ok=True)
+        os.makedirs(os.path.join(root, "blobs"), exist_ok=True)
+
+    def count(self, stat):
+        with self._lock:
+            self.stats[stat] += 1
+
+    def _key_path(self, key):
+        return os.path.join(self.root, "keys", f"{key}.json")
+
+    def _blob_path(self, digest):
+        return os.path.join(self.root, "blobs", f"{digest}.json")
+
+    def _read_meta(self, key):
+        try:
+            with open(self._key_path(key)) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _write_meta(self, key, meta):
+        tmp = self._key_path(key) + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp, self._key_path(key))
+
+    def lookup(self, key):
+        """Return (meta, payload, fresh) for a cached request, or None."""
+        meta = self._read_meta(key)
+        if meta is None:
+            return None
+        try:
+            with open(self._blob_path(meta["body"]), "rb") as f:
+                payload = json.loads(f.read())
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        ttl = meta["ttl"] if "ttl" in meta else self.ttl
+        fresh = ttl is None or time.time() - meta["fetched_at"] < ttl
+        meta["last_used"] = time.time()
+        self._write_meta(key, meta)
+        return meta, payload, fresh
+
+    def store(self, key, body, etag=None, last_modified=None, ttl=_UNSET):
+        """Store raw response bytes; identical bodies share one blob."""
+        digest = hashlib.sha256(body).hexdigest()
+        blob = self._blob_path(digest)
+        if not os.path.exists(blob):
+            tmp = blob + ".tmp"
+            with open(tmp, "wb") as f:
+                f.write(body)
+            os.replace(tmp, blob)
+        now = time.time()
+        meta = {"body": digest, "etag": etag, "last_modified": last_modified,
+                "fetched_at": now, "last_used": now}
+        if ttl is not _UNSET:
+            meta["ttl"] = ttl  # pinned per entry; otherwise the cache-wide ttl applies
+        self._write_meta(key, meta)
+        self.count("stored")
+
+    def refresh(self, key, meta):
+        """Mark an entry fresh again after a 304."""
+        meta["fetched_at"] = time.time()
+        self._write_meta(key, meta)
+
+    def evict(self):
+        """
+        Drop keys unused for max_age, then least-recently-used keys until
+        under max_bytes. Merely stale keys stay: they can still be
+        revalidated with a cheap 304.
+        """
+        now = time.time()
+        metas = {}
+        for name in os.listdir(os.path.join(self.root, "keys")):
+            if not name.endswith(".json"):
+                continue
+            key = name[:-5]
+            meta = self._read_meta(key)
+            if meta is None:
+                continue
+            # Offline replay keeps old entries around; they are all we have.
+            if not self.offline and now - meta["last_used"] > self.max_age:
+                os.remove(self._key_path(key))
+                self.count("evicted")
+            else:
+                metas[key] = meta
+
+        sizes = {}
+        for name in os.listdir(os.path.join(self.root, "blobs")):
+            if name.endswith(".json"):
+                sizes[name[:-5]] = os.path.getsize(self._blob_path(name[:-5]))
+        refs = {}
+        for meta in metas.values():
+            refs[meta["body"]] = refs.get(meta["body"], 0) + 1
+        total = sum(sizes.get(digest, 0) for digest in refs)
+        for key, meta in sorted(metas.items(), key=lambda kv: kv[1]["last_used"]):
+            if total <= self.max_bytes:
+                break
+            os.remove(self._key_path(key))
+            self.count("evicted")
+            refs[meta["body"]] -= 1
+            if refs[meta["body"]] == 0:
+                del refs[meta["body"]]
+                total -= sizes.get(meta["body"], 0)
+        for digest in sizes:
+            if digest not in refs:
+                os.remove(self._blob_path(digest))
+
+    def report(self):
+        s = self.stats
+        lookups = s["hits"] + s["misses"]
+        rate = 100 * s["hits"] / lookups if lookups else 0.0
+        logging.info(f"Response cache: {s['hits']} hits, {s['misses']} misses ({rate:.0f}% hit rate), "
+                     f"{s['revalidated']} revalidated, {s['stale_served']} stale served offline, "
+                     f"{s['stored']} stored, {s['evicted']} evicted")
+
+
+def is_error(payload):
+    """NOAA reports failures in-band: HTTP 200 with {"error": {"message": ...}}."""
+    return isinstance(payload, dict) and "error" in payload
+
+
+def has_samples(payload):
+    return isinstance(payload, dict) and bool(payload.get("data") or payload.get("predictions"))
+
+
+def fetch_json(engine, cache, url, params, key, label=None, ttl=_UNSET):
+    """
+    GET url through the cache. Fresh hits and offline replays never touch
+    the network; stale entries are revalidated conditionally. Returns the
+    decoded JSON payload, or None when offline and nothing is cached.
+
+    In-band error replies are returned but never stored, so a one-off
+    upstream error is retried next run. A ttl given here is pinned to the
+    entry (None: never revalidate), but only for payloads that carry data
+    or predictions; without one the cache-wide ttl applies.
+    """
+    cached = cache.lookup(key) if cache is not None else None
+    if cached is not None and is_error(cached[1]) and not cache.offline:
+        cached = None  # stored before errors were skipped; fetch it again
+    if cached is not None:
+        meta, payload, fresh = cached
+        if fresh or cache.offline:
+            cache.count("hits")
+            if not fresh:
+                cache.count("stale_served")
+            return payload
+    if cache is not None and cache.offline:
+        cache.count("misses")
+        logging.warning(f"Offline: no cached response for {label or key}")
+        return None
+
+    headers = {}
+    if cached is not None:
+        meta = cached[0]
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+    response = engine.get(url, params=params, headers=headers or None, label=label)
+    if response.status_code == 304 and cached is not None:
+        cache.count("hits")
+        cache.count("revalidated")
+        cache.refresh(key, cached[0])
+        return cached[1]
+
+    payload = response.json()
+    if cache is not None:
+        cache.count("misses")
+        if is_error(payload):
+            logging.warning(f"{label or key}: NOAA error {payload['error']}, not cached")
+            return payload
+        if not has_samples(payload):
+            ttl = _UNSET  # an empty answer may fill in later; let it go stale
+        cache.store(key, response.content, etag=response.headers.get("ETag"),
+                    last_modified=response.headers.get("Last-Modified"), ttl=ttl)
+    return payload
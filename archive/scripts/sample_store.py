@@ -0,0 +1,319 @@
+"""
+Typed columnar storage for the pipeline's intermediate data, replacing the
+raw_api_cache / restructured_data / pivoted_wave_data pickles.
+
+A store is a directory of plain NumPy files plus a schema:
+
+    <store>/schema.json     kind, column dtypes, compression, and per series
+                            its row offset, row count and first/last time
+    <store>/<col>.npy       one file per column, every series back to back, or
+    <store>/columns.npz     all columns, deflate-compressed
+    <store>/index.npy       shared time axis (pivoted stores only)
+
+Times are datetime64[ns], values float32. The three stores hold:
+
+    raw           series "<station>/<product>", columns t, v (as NOAA sent them, parsed)
+    restructured  series "<station>", columns t, delta; distance_km in the schema
+    pivoted       series "<station>", column delta on the shared index
+                  (station-major); station_order and station_distance in the schema
+
+Reads take optional `stations` and `start`/`end` (inclusive) filters. Series
+whose first/last times fall outside the range are skipped from the schema
+alone, and the rest are sliced by binary search on their sorted times.
+Uncompressed columns are memory-mapped, so a partial read only touches the
+pages it slices; a compressed store is decompressed whole on first access.
+"""
+
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+# Intermediate stores live with the rest of the pipeline's history; the pivot feeds the apps
+RAW_STORE_DIR = "archive/data_processing/raw_store"
+RESTRUCTURED_STORE_DIR = "archive/data_processing/restructured_store"
+PIVOT_STORE_DIR = "data/pivoted_store"
+FORMAT_VERSION = 1
+COMPRESSION = "deflate"   # np.savez_compressed
+
+TIME_DTYPE = "datetime64[ns]"
+VALUE_DTYPE = np.float32
+# NOAA's "t" is "YYYY-MM-DD HH:MM"; naming the format sends pandas down its fast ISO parser
+NOAA_TIME_FORMAT = "ISO8601"
+
+
+def typed_samples(df):
+    """
+    NOAA t/v strings -> (datetime64[ns] times, float64 values), sorted by time
+    with unparseable times dropped. The time format is explicit, so pandas
+    skips format inference, and values take a plain float cast when they all
+    parse. Already-typed frames (e.g. read back from a store) pass through.
+    """
+    t = pd.to_datetime(df['t'], format=NOAA_TIME_FORMAT, errors='coerce').to_numpy(dtype=TIME_DTYPE)
+    try:
+        v = df['v'].to_numpy().astype(np.float64)
+    except (TypeError, ValueError):
+        # blank or malformed values: the slower coercing parser turns them into NaN
+        v = pd.to_numeric(df['v'], errors='coerce').to_numpy(dtype=np.float64)
+    valid = ~np.isnat(t)
+    t, v = t[valid], v[valid]
+    if len(t) > 1 and not (t[1:] >= t[:-1]).all():
+        order = np.argsort(t, kind='stable')
+        t, v = t[order], v[order]
+    return t, v
+
+
+def _time_bounds(t):
+    return (str(t[0]), str(t[-1])) if len(t) else (None, None)
+
+
+def write_store(path, kind, series, compression=None, index=None, extra=None):
+    """
+    Write {key: {column: array}} as a store, replacing any previous one.
+    `index` is a shared time axis for series without their own "t" column.
+    The store is written next to `path` and swapped in at the end.
+    """
+    if compression not in (None, COMPRESSION):
+        raise ValueError(f"unknown compression {compression!r}; use {COMPRESSION!r} or None")
+    schema = {"format": "wave-samples", "version": FORMAT_VERSION, "kind": kind,
+              "compression": compression, "columns": {}, "series": []}
+    parts = {}
+    offset = 0
+    for key, columns in series.items():
+        rows = None
+        for name, values in columns.items():
+            if name == "t":
+                values = np.asarray(values, dtype=TIME_DTYPE).view(np.int64)
+                schema["columns"][name] = TIME_DTYPE
+            else:
+                values = np.asarray(values, dtype=VALUE_DTYPE)
+                schema["columns"][name] = np.dtype(VALUE_DTYPE).name
+            if rows is not None and len(values) != rows:
+                raise ValueError(f"{key}: column {name} has {len(values)} rows, expected {rows}")
+            rows = len(values)
+            parts.setdefault(name, []).append(values)
+        first, last = _time_bounds(parts["t"][-1].view(TIME_DTYPE)) if "t" in columns else (None, None)
+        schema["series"].append({"key": key, "offset": offset, "rows": rows or 0, "first": first, "last": last})
+        offset += rows or 0
+    arrays = {name: np.concatenate(values) for name, values in parts.items()}
+    if index is not None:
+        arrays["index"] = np.asarray(index, dtype=TIME_DTYPE).view(np.int64)
+        first, last = _time_bounds(arrays["index"].view(TIME_DTYPE))
+        schema["index"] = {"rows": len(arrays["index"]), "first": first, "last": last}
+    schema.update(extra or {})
+
+    tmp = path.rstrip("/\\") + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    if compression:
+        np.savez_compressed(os.path.join(tmp, "columns.npz"), **arrays)
+    else:
+        for name, values in arrays.items():
+            np.save(os.path.join(tmp, f"{name}.npy"), values)
+    with open(os.path.join(tmp, "schema.json"), "w") as f:
+        json.dump(schema, f, indent=2)
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp, path)
+    return schema
+
+
+def store_size(path):
+    """Bytes on disk for a store directory (or a single file)."""
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+class SampleStore:
+    """Read side: series(key, start, end) returns {column: array} sliced to the time range."""
+
+    def __init__(self, path, mmap=True):
+        self.path = path
+        with open(os.path.join(path, "schema.json")) as f:
+            self.schema = json.load(f)
+        if self.schema.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported sample store version {self.schema.get('version')} in {path}")
+        self.mmap_mode = "r" if mmap else None
+        self.entries = {entry["key"]: entry for entry in self.schema["series"]}
+        self._arrays = None
+        self.index = self.array("index").view(TIME_DTYPE) if "index" in self.schema else None
+
+    def array(self, name):
+        """A whole column (all series back to back): memory-mapped, or decompressed once."""
+        if self._arrays is None:
+            self._arrays = {}
+            if self.schema["compression"]:
+                with np.load(os.path.join(self.path, "columns.npz")) as npz:
+                    self._arrays = {key: npz[key] for key in npz.files}
+        if name not in self._arrays:
+            self._arrays[name] = np.load(os.path.join(self.path, f"{name}.npy"), mmap_mode=self.mmap_mode)
+        return self._arrays[name]
+
+    def keys(self):
+        return list(self.entries)
+
+    def overlaps(self, key, start=None, end=None):
+        """False when the schema alone shows the series has no rows in [start, end]."""
+        entry = self.entries[key]
+        if entry["first"] is None:
+            return entry["rows"] > 0
+        return not ((end is not None and pd.Timestamp(entry["first"]) > pd.Timestamp(end)) or
+                    (start is not None and pd.Timestamp(entry["last"]) < pd.Timestamp(start)))
+
+    def series(self, key, start=None, end=None, columns=None):
+        """{column: array} of one series (plus its "t") limited to [start, end]."""
+        entry = self.entries[key]
+        rows = slice(entry["offset"], entry["offset"] + entry["rows"])
+        if "t" in self.schema["columns"]:
+            t = self.array("t")[rows].view(TIME_DTYPE)
+        else:
+            t = self.index
+        lo, hi = time_slice(t, start, end)
+        wanted = [name for name in (columns or self.schema["columns"]) if name != "t"]
+        out = {name: self.array(name)[rows][lo:hi] for name in wanted}
+        out["t"] = t[lo:hi]
+        return out
+
+
+def time_slice(t, start=None, end=None):
+    """[lo, hi) positions of the inclusive start/end range in sorted times."""
+    lo = 0 if start is None else int(np.searchsorted(t, np.datetime64(pd.Timestamp(start)), side="left"))
+    hi = len(t) if end is None else int(np.searchsorted(t, np.datetime64(pd.Timestamp(end)), side="right"))
+    return lo, max(lo, hi)
+
+
+# --- raw API responses ---------------------------------------------------------
+
+def save_raw(raw_data, path=RAW_STORE_DIR, compression=None):
+    """{station: {product: frame}} with NOAA string or parsed t/v columns."""
+    series = {}
+    for name, products in raw_data.items():
+        for product, df in products.items():
+            t, v = typed_samples(df) if not df.empty else (np.array([], dtype=TIME_DTYPE), np.array([]))
+            series[f"{name}/{product}"] = {"t": t, "v": v}
+    return write_store(path, "raw", series, compression)
+
+
+def load_raw(path=RAW_STORE_DIR, stations=None, start=None, end=None):
+    """{station: {product: DataFrame(t, v)}} for the selected stations and time range."""
+    store = SampleStore(path)
+    raw = {}
+    for key in store.keys():
+        name, product = key.split("/", 1)
+        if stations is not None and name not in stations:
+            continue
+        if store.overlaps(key, start, end):
+            columns = store.series(key, start, end)
+            df = pd.DataFrame({"t": np.array(columns["t"]), "v": np.array(columns["v"])})
+        else:
+            df = pd.DataFrame({"t": np.array([], dtype=TIME_DTYPE), "v": np.array([], dtype=VALUE_DTYPE)})
+        raw.setdefault(name, {})[product] = df
+    return raw
+
+
+# --- restructured long-form deltas --------------------------------------------
+
+def save_restructured(df, path=RESTRUCTURED_STORE_DIR, compression=None):
+    """Long-form t/station/distance_km/delta frame, one series per station."""
+    series, distances = {}, {}
+    for name, group in df.groupby("station", sort=False):
+        group = group.sort_values("t", kind="stable")
+        series[name] = {"t": group["t"].to_numpy(), "delta": group["delta"].to_numpy()}
+        distances[name] = float(group["distance_km"].iloc[0])
+    return write_store(path, "restructured", series, compression, extra={"distance_km": distances})
+
+
+def load_restructured(path=RESTRUCTURED_STORE_DIR, stations=None, start=None, end=None):
+    """Long-form DataFrame (t, station, distance_km, delta) for the selection, or None if empty."""
+    store = SampleStore(path)
+    names, times, deltas = [], [], []
+    for name in store.keys():
+        if (stations is not None and name not in stations) or not store.overlaps(name, start, end):
+            continue
+        columns = store.series(name, start, end)
+        names.append(name)
+        times.append(columns["t"])
+        deltas.append(columns["delta"])
+    if not names:
+        return None
+    counts = [len(t) for t in times]
+    distances = store.schema["distance_km"]
+    return pd.DataFrame({
+        "t": np.concatenate(times),
+        "station": np.repeat(np.array(names, dtype=object), counts),
+        "distance_km": np.repeat(np.array([distances[name] for name in names], dtype=np.float64), counts),
+        "delta": np.concatenate(deltas),
+    })
+
+
+# --- pivoted time x station matrix --------------------------------------------
+
+def save_pivot(df_pivot, station_order, station_distance, path=PIVOT_STORE_DIR, compression=None):
+    """Pivoted deltas (index t, one column per station) with the station order and distances."""
+    series = {name: {"delta": df_pivot[name].to_numpy()} for name in df_pivot.columns}
+    extra = {"station_order": list(station_order),
+             "station_distance": {name: float(d) for name, d in station_distance.items()}}
+    return write_store(path, "pivoted", series, compression, index=df_pivot.index.to_numpy(), extra=extra)
+
+
+def load_pivot(path=PIVOT_STORE_DIR, stations=None, start=None, end=None):
+    """
+    The former pivoted_wave_data.pkl payload: {'df_pivot', 'station_order',
+    'station_distance'}, limited to the selected stations and time range.
+    """
+    store = SampleStore(path)
+    order = [name for name in store.schema["station_order"] if stations is None or name in stations]
+    lo, hi = time_slice(store.index, start, end)
+    index = pd.DatetimeIndex(np.array(store.index[lo:hi]), name="t")
+    # station-major: every series is one row of a stations x frames matrix
+    matrix = store.array("delta").reshape(len(store.entries), -1)
+    rows = [store.keys().index(name) for name in order]
+    block = matrix[rows, lo:hi] if rows else np.empty((0, hi - lo), dtype=VALUE_DTYPE)
+    df_pivot = pd.DataFrame(block.T, index=index, columns=pd.Index(order, name="station"))
+    return {"df_pivot": df_pivot, "station_order": order,
+            "station_distance": dict(store.schema["station_distance"])}
+
+
+def convert_pickles(raw_pkl=None, restructured_pkl=None, pivot_pkl=None, out_dir=None, compression=None):
+    """
+    Write stores for existing pickles, to out_dir or else the pipeline's own
+    store directories; returns [(pickle, store, pickle bytes, store bytes)].
+    """
+    import pickle
+
+    converted = []
+    for pkl, save, default in ((raw_pkl, save_raw, RAW_STORE_DIR),
+                               (restructured_pkl, save_restructured, RESTRUCTURED_STORE_DIR),
+                               (pivot_pkl, None, PIVOT_STORE_DIR)):
+        if not pkl or not os.path.exists(pkl):
+            continue
+        with open(pkl, "rb") as f:
+            data = pickle.load(f)
+        target = os.path.join(out_dir, os.path.basename(default)) if out_dir else default
+        if save is None:
+            save_pivot(data["df_pivot"], data["station_order"], data["station_distance"], target, compression)
+        else:
+            save(data, target, compression)
+        converted.append((pkl, target, os.path.getsize(pkl), store_size(target)))
+    return converted
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Convert pipeline pickles to typed sample stores")
+    parser.add_argument("--raw", help="raw_api_cache.pkl to convert")
+    parser.add_argument("--restructured", help="restructured_data.pkl to convert")
+    parser.add_argument("--pivot", help="pivoted_wave_data.pkl to convert")
+    parser.add_argument("--out-dir", help="directory the *_store directories are written to "
+                                          "(default: where the pipeline reads them)")
+    parser.add_argument("--compress", action="store_true", help=f"{COMPRESSION}-compress every series")
+    args = parser.parse_args()
+    results = convert_pickles(args.raw, args.restructured, args.pivot, args.out_dir,
+                              COMPRESSION if args.compress else None)
+    for pkl, target, before, after in results:
+        print(f"✅ {pkl} ({before / 1024:,.1f} KB) -> {target}/ ({after / 1024:,.1f} KB)")
+    if not results:
+        print("Nothing to convert; pass --raw/--restructured/--pivot")
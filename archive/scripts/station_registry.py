@@ -0,0 +1,170 @@
+"""
+Station registry: the one place station data lives.
+
+Backed by data/station_metadata.json, keyed by NOAA station id. Each entry
+holds NOAA's metadata (name, lat, lng, state, type) plus three fields of
+our own:
+
+    key      short name used as the pipeline's column/series name ("Hilo")
+    region   grouping for lookups and filters ("Hawaii", "Guam", ...)
+    display  whether the station is drawn by the apps (False keeps it in
+             the data pipeline but off the map and graphs)
+
+Lookups by id, key or NOAA name and by region are dict lookups. Distances
+from the event epicenter are computed once, vectorized, when the registry
+loads. Adding or removing a station is a JSON edit; every stage (collection,
+frame generation, exports, both apps) reads its station list from here.
+"""
+
+import json
+import os
+from functools import lru_cache
+
+from geodesy import station_distances
+
+METADATA_FILE = "data/station_metadata.json"
+
+# 2025 Kamchatka Peninsula earthquake
+EPICENTER = (52.473, 160.396)
+
+# Plotly's default colour sequence as the apps use it, assigned in display order
+PALETTE = ["#636EFA", "#EF553B", "#00CC96", "#C490FD", "#FFA15A", "#1BD3F3", "#FF6692",
+           "#B6E880", "#FF97FF", "#FECB52"]
+
+
+def map_lon(lon):
+    """Longitude in the maps' Western Pacific view: east longitudes shifted past -180."""
+    return lon - 360 if lon > 0 else lon
+
+
+class Station:
+    __slots__ = ("id", "key", "name", "lat", "lon", "state", "region", "display", "distance_km")
+
+    def __init__(self, station_id, entry, distance_km=None):
+        self.id = station_id
+        self.key = entry.get("key") or entry["name"]
+        self.name = entry["name"]
+        self.lat = float(entry["lat"])
+        self.lon = float(entry["lng"])
+        self.state = entry.get("state")
+        self.region = entry.get("region")
+        self.display = entry.get("display", True)
+        self.distance_km = distance_km
+
+    def __repr__(self):
+        return f"Station({self.id}, {self.key!r}, {self.distance_km:.1f} km)"
+
+
+class StationRegistry:
+    def __init__(self, metadata, epicenter=EPICENTER):
+        """`metadata` is the station_metadata.json mapping {id: entry}."""
+        self.metadata = metadata
+        self.epicenter = epicenter
+        coords = {sid: {"lat": float(entry["lat"]), "lon": float(entry["lng"])} for sid, entry in metadata.items()}
+        km = station_distances(coords, *epicenter) if coords else {}
+        self.stations = [Station(sid, entry, km[sid]) for sid, entry in metadata.items()]
+        self._by_id = {s.id: s for s in self.stations}
+        self._by_key = {s.key: s for s in self.stations}
+        self._by_name = {s.name: s for s in self.stations}
+        self._by_region = {}
+        for s in self.stations:
+            self._by_region.setdefault(s.region, []).append(s)
+        if len(self._by_key) != len(self.stations):
+            raise ValueError("station keys in the metadata are not unique")
+
+    @classmethod
+    def load(cls, path=METADATA_FILE, epicenter=EPICENTER):
+        with open(path) as f:
+            return cls(json.load(f), epicenter)
+
+    def __len__(self):
+        return len(self.stations)
+
+    def __iter__(self):
+        return iter(self.stations)
+
+    def __contains__(self, ident):
+        return self.find(ident) is not None
+
+    def by_id(self, station_id):
+        return self._by_id[str(station_id)]
+
+    def by_key(self, key):
+        return self._by_key[key]
+
+    def by_name(self, name):
+        """Short key or NOAA name."""
+        return self._by_key.get(name) or self._by_name[name]
+
+    def in_region(self, region):
+        return list(self._by_region.get(region, []))
+
+    def regions(self):
+        return list(self._by_region)
+
+    def find(self, ident):
+        """Station for an id, key or NOAA name; None if unknown."""
+        return self._by_id.get(str(ident)) or self._by_key.get(ident) or self._by_name.get(ident)
+
+    def select(self, include=None, exclude=None, regions=None, displayed=None):
+        """
+        Stations in file order, filtered: `include`/`exclude` take ids, keys or
+        NOAA names; `regions` limits to those regions; `displayed` True/False
+        keeps only stations the apps do/don't draw.
+        """
+        chosen = self.stations
+        if include:
+            wanted = {self._resolve(ident).id for ident in include}
+            chosen = [s for s in chosen if s.id in wanted]
+        if exclude:
+            dropped = {self._resolve(ident).id for ident in exclude}
+            chosen = [s for s in chosen if s.id not in dropped]
+        if regions:
+            chosen = [s for s in chosen if s.region in set(regions)]
+        if displayed is not None:
+            chosen = [s for s in chosen if s.display == displayed]
+        return chosen
+
+    def _resolve(self, ident):
+        station = self.find(ident)
+        if station is None:
+            raise KeyError(f"unknown station {ident!r} (not in {METADATA_FILE})")
+        return station
+
+    def distances(self, stations=None):
+        """{key: km from the epicenter}."""
+        return {s.key: s.distance_km for s in (self.stations if stations is None else stations)}
+
+    def by_distance(self, keys):
+        """Keys sorted nearest first; unknown keys go last."""
+        return sorted(keys, key=lambda k: self._by_key[k].distance_km if k in self._by_key else 1e9)
+
+    def display_order(self, available=None):
+        """Keys of the displayed stations, nearest first, optionally limited to `available` keys."""
+        keys = [s.key for s in self.stations if s.display and (available is None or s.key in available)]
+        return self.by_distance(keys)
+
+    def colors(self, keys):
+        return [PALETTE[i % len(PALETTE)] for i in range(len(keys))]
+
+    def client_info(self, keys):
+        """Per-station fields the browser app draws from, in `keys` order."""
+        return [{"id": self._by_key[k].id, "name": k, "distance_km": self._by_key[k].distance_km,
+                 "lat": self._by_key[k].lat, "lon": map_lon(self._by_key[k].lon), "color": color}
+                for k, color in zip(keys, self.colors(keys))]
+
+    def client_epicenter(self):
+        lat, lon = self.epicenter
+        return {"lat": lat, "lon": map_lon(lon)}
+
+    def save(self, path=METADATA_FILE):
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.metadata, f, indent=2)
+        os.replace(tmp, path)
+
+
+@lru_cache(maxsize=None)
+def load_registry(path=METADATA_FILE):
+    """Shared registry per metadata file, loaded once per process."""
+    return StationRegistry.load(path)
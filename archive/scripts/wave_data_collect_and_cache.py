@@ -4,122 +4,325 @@ import numpy as np
 import plotly.express as px
 import requests
 from datetime import datetime, timedelta, timezone
-from math import radians, cos, sin, asin, sqrt
 import os
-import pickle
 import logging
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+from station_registry import load_registry
+from noaa_fetch import FetchEngine, NOAA_API_URL
+from sample_store import (typed_samples, save_raw, load_raw, save_restructured, load_restructured,
+                          save_pivot, load_pivot, RAW_STORE_DIR, RESTRUCTURED_STORE_DIR, PIVOT_STORE_DIR,
+                          COMPRESSION)
+from response_cache import ResponseCache, CACHE_DIR, DEFAULT_TTL, fetch_json, request_key
+from pipeline_state import load_state, save_state, high_water_marks, mark_dirty
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
 
-# Define full station list
-stations = {
-    "Nawiliwili": {"id": "1611400", "name": "Nawiliwili", "lat": 21.9544, "lon": -159.3561},
-    "Honolulu": {"id": "1612340", "name": "Honolulu", "lat": 21.303333, "lon": -157.86453},
-    "Pearl Harbor": {"id": "1612401", "name": "Pearl Harbor", "lat": 21.3675, "lon": -157.9639},
-    "Mokuoloe": {"id": "1612480", "name": "Mokuoloe", "lat": 21.433056, "lon": -157.79},
-    "Kahului": {"id": "1615680", "name": "Kahului, Kahului Harbor", "lat": 20.894945, "lon": -156.469},
-    "Kawaihae": {"id": "1617433", "name": "Kawaihae", "lat": 20.0366, "lon": -155.8294},
-    "Hilo": {"id": "1617760", "name": "Hilo, Hilo Bay, Kuhio Bay", "lat": 19.730278, "lon": -155.05556},
-    "Midway": {"id": "1619910", "name": "Sand Island, Midway Islands", "lat": 28.211666, "lon": -177.36},
-    "Apra Harbor": {"id": "1630000", "name": "Apra Harbor, Guam", "lat": 13.443389, "lon": 144.65636},
-    "Pago Bay": {"id": "1631428", "name": "Pago Bay, Guam", "lat": 13.428333, "lon": 144.79889},
-    "Pago Pago": {"id": "1770000", "name": "Pago Pago, American Samoa", "lat": -14.28, "lon": -170.69},
-    "Kwajalein": {"id": "1820000", "name": "Kwajalein, Marshall Islands", "lat": 8.731667, "lon": 167.73611},
-    "Wake Island": {"id": "1890000", "name": "Wake Island, Pacific Ocean", "lat": 19.290556, "lon": 166.6175}
-}
+# Stations come from the registry (data/station_metadata.json); --stations/--exclude narrow them
+registry = load_registry()
+stations = registry.select()
 
-epicenter_lat, epicenter_lon = 52.473, 160.396
+# Longest span the API serves in one request, per product
+MAX_WINDOW = {
+    "one_minute_water_level": timedelta(days=4),
+    "predictions": timedelta(days=31),
+}
+NOAA_DATE_FORMAT = "%Y%m%d %H:%M"
+# Below this many stations the process pool costs more than it saves
+POOL_MIN_STATIONS = 32
 
-def haversine(lat1, lon1, lat2, lon2):
-    R = 6371
-    lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
-    dlat = lat2 - lat1
-    dlon = lon2 - lon1
-    a = sin(dlat/2)**2 + cos(lat1)*cos(lat2)*sin(dlon/2)**2
-    return 2 * R * asin(sqrt(a))
+def split_range(begin, end, window):
+    """Split [begin, end] into consecutive windows no longer than `window`."""
+    chunks = []
+    start = begin
+    while start <= end:
+        stop = min(start + window, end)
+        chunks.append((start, stop))
+        start = stop + timedelta(minutes=1)
+    return chunks
 
 # Fetch observed and predicted water levels
 fetch_cache = {}
-def fetch_data(station_id, product):
-    cache_key = (station_id, product, 'recent')
+def fetch_data(station_id, product, engine=None, response_cache=None, begin=None, end=None):
+    """
+    Fetch one product for one station: date=recent by default, or the
+    begin..end span (datetimes, GMT) when given. A single call must fit in
+    the product's MAX_WINDOW; use fetch_range for longer spans.
+    """
+    if begin is not None:
+        date_params = {"begin_date": begin.strftime(NOAA_DATE_FORMAT), "end_date": end.strftime(NOAA_DATE_FORMAT)}
+        span = (date_params["begin_date"], date_params["end_date"])
+    else:
+        date_params = {"date": "recent"}
+        span = ("recent", None)
+    cache_key = (station_id, product) + span
     if cache_key in fetch_cache:
         logging.info(f"Cache hit for {cache_key}")
         return fetch_cache[cache_key].copy()
+    engine = engine or FetchEngine()
     try:
-        url = "https://api.tidesandcurrents.noaa.gov/api/prod/datagetter"
         params = {
             "station": station_id,
             "product": product,
-            "date": "recent",
+            **date_params,
             "datum": "MLLW",
             "interval": "1" if product == "predictions" else None,
             "units": "metric",
             "time_zone": "gmt",
             "format": "json"
         }
-        logging.info(f"Fetching {product} for {station_id} from NOAA API with date=recent...")
-        response = requests.get(url, params={k: v for k, v in params.items() if v is not None}, timeout=15)
-        response.raise_for_status()
+        logging.info(f"Fetching {product} for {station_id} from NOAA API ({span[0]}{' - ' + span[1] if span[1] else ''})...")
+        disk_key = request_key(station_id, product, span[0], span[1], params["datum"], params["interval"])
+        # A span that closed over a day ago won't change any more: never revalidate it
+        closed = end is not None and end < datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=1)
+        payload = fetch_json(engine, response_cache, NOAA_API_URL,
+                             {k: v for k, v in params.items() if v is not None},
+                             disk_key, label=f"{station_id} {product} {span[0]}",
+                             **({"ttl": None} if closed else {}))
+        if payload is None:
+            return pd.DataFrame()
         key = "predictions" if product == "predictions" else "data"
-        df = pd.DataFrame(response.json().get(key, []))
+        df = pd.DataFrame(payload.get(key, []))
         fetch_cache[cache_key] = df.copy()
         return df
     except Exception as e:
         logging.error(f"Failed to fetch {product} for {station_id}: {e}")
         return pd.DataFrame()
 
-if __name__ == "__main__":
-    raw_cache_file = "data/raw_api_cache.pkl"
-    restructured_cache_file = "data/restructured_data.pkl"
-    raw_data = {}
-
-    # Always fetch fresh data and overwrite cache
-    logging.info("Fetching fresh data from NOAA API (date=recent)...")
-    for name, meta in stations.items():
-        raw_data[name] = {}
-        for product in ["one_minute_water_level", "predictions"]:
-            raw_data[name][product] = fetch_data(meta["id"], product)
-    with open(raw_cache_file, "wb") as f:
-        pickle.dump(raw_data, f)
-    logging.info(f"Raw API data cached to {raw_cache_file}")
+def stitch_chunks(chunks):
+    """Concatenate per-window frames, dropping samples repeated at window edges."""
+    chunks = [c for c in chunks if not c.empty]
+    if not chunks:
+        return pd.DataFrame()
+    df = pd.concat(chunks, ignore_index=True)
+    return df.drop_duplicates(subset="t", keep="last").sort_values("t").reset_index(drop=True)
 
-    logging.info("Processing and restructuring data...")
-    records = []
-    for name, meta in stations.items():
-        try:
-            obs = raw_data.get(name, {}).get("one_minute_water_level", pd.DataFrame())
-            pred = raw_data.get(name, {}).get("predictions", pd.DataFrame())
-            if not obs.empty and not pred.empty:
-                obs['t'] = pd.to_datetime(obs['t'], errors='coerce')
-                obs['v'] = pd.to_numeric(obs['v'], errors='coerce')
-                pred['t'] = pd.to_datetime(pred['t'], errors='coerce')
-                pred['v'] = pd.to_numeric(pred['v'], errors='coerce')
-                merged = pd.merge(obs, pred, on='t', suffixes=('_obs', '_pred'))
-                merged['delta'] = merged['v_obs'] - merged['v_pred']
-                merged['station'] = name
-                merged['distance_km'] = haversine(epicenter_lat, epicenter_lon, meta['lat'], meta['lon'])
-                records.append(merged[['t', 'station', 'distance_km', 'delta']])
+def fetch_range(station_id, product, begin, end, engine=None, response_cache=None):
+    """Fetch an arbitrarily long begin..end span as parallel MAX_WINDOW chunks."""
+    engine = engine or FetchEngine()
+    windows = split_range(begin, end, MAX_WINDOW[product])
+    chunks = engine.map(lambda w: fetch_data(station_id, product, engine, response_cache, *w), windows)
+    return stitch_chunks(chunks)
+
+def fetch_all(products=("one_minute_water_level", "predictions"), engine=None, response_cache=None,
+              begin=None, end=None):
+    """
+    Fetch every (station, product) pair concurrently; returns {name: {product: df}}.
+    With begin/end, every pair is split into MAX_WINDOW chunks and all chunks
+    share one pool, so a long span costs about as much wall time as a short one.
+    begin may also be a {name: datetime} dict for per-station starts (stations
+    missing from it fall back to date=recent).
+    """
+    engine = engine or FetchEngine()
+    jobs = []
+    for station in stations:
+        station_begin = begin.get(station.key) if isinstance(begin, dict) else begin
+        for product in products:
+            if station_begin is None:
+                windows = [(None, None)]
             else:
-                logging.warning(f"No data for station {name}")
-        except Exception as e:
-            logging.error(f"Error processing station {name}: {e}")
-    if records:
-        df = pd.concat(records)
-        with open(restructured_cache_file, "wb") as f:
-            pickle.dump(df, f)
-        logging.info(f"Restructured data cached to {restructured_cache_file}")
-        # Create and save pivoted DataFrame for Dash app
-        df_pivot = df.pivot(index='t', columns='station', values='delta')
-        # Compute distances and sort stations
-        station_distance = {name: haversine(epicenter_lat, epicenter_lon, meta['lat'], meta['lon']) for name, meta in stations.items()}
-        sorted_stations = sorted(df_pivot.columns, key=lambda s: station_distance.get(s, 1e9))
-        df_pivot = df_pivot[sorted_stations]
-        with open('data/pivoted_wave_data.pkl', 'wb') as f:
-            pickle.dump({'df_pivot': df_pivot, 'station_order': sorted_stations, 'station_distance': station_distance}, f)
-        logging.info(f"Pivoted data cached to data/pivoted_wave_data.pkl")
+                windows = split_range(station_begin, end, MAX_WINDOW[product])
+            jobs.extend((station.key, station.id, product, w) for w in windows)
+    start = time.perf_counter()
+    frames = engine.map(lambda job: fetch_data(job[1], job[2], engine, response_cache, *job[3]), jobs)
+    engine.report(wall_time=time.perf_counter() - start)
+    if response_cache is not None:
+        response_cache.report()
+    chunks = {station.key: {product: [] for product in products} for station in stations}
+    for (name, _, product, _), df in zip(jobs, frames):
+        chunks[name][product].append(df)
+    return {name: {product: stitch_chunks(parts) for product, parts in by_product.items()}
+            for name, by_product in chunks.items()}
+
+def restructure_station(job):
+    """
+    One station's deltas: (name, times, deltas, problem). Observations are
+    joined to predictions on the time index with a binary search over the
+    sorted prediction times, giving the same rows as an inner pd.merge on t.
+    Top-level so the process pool can pickle it.
+    """
+    name, obs, pred = job
+    if obs.empty or pred.empty:
+        return name, None, None, "no data"
+    try:
+        obs_t, obs_v = typed_samples(obs)
+        pred_t, pred_v = typed_samples(pred)
+        pos = np.searchsorted(pred_t, obs_t)
+        pos[pos == len(pred_t)] = 0
+        hit = (pred_t[pos] == obs_t) if len(pred_t) else np.zeros(len(obs_t), dtype=bool)
+        return name, obs_t[hit], obs_v[hit] - pred_v[pos[hit]], None
+    except Exception as e:
+        return name, None, None, str(e)
+
+def restructure(raw_data, workers=None):
+    """
+    Merge observed and predicted levels per station into long-form deltas.
+    Stations are processed in a process pool once there are at least
+    POOL_MIN_STATIONS of them (smaller lists are faster in-process); the
+    per-station arrays are then assembled into one columnar frame.
+    """
+    workers = workers or os.cpu_count() or 1
+    jobs = []
+    for name in (station.key for station in stations):
+        products = raw_data.get(name, {})
+        # Only t/v travel to the workers
+        obs, pred = (products.get(product, pd.DataFrame()) for product in ("one_minute_water_level", "predictions"))
+        jobs.append((name, obs if obs.empty else obs[['t', 'v']], pred if pred.empty else pred[['t', 'v']]))
+    start = time.perf_counter()
+    if workers > 1 and len(jobs) >= POOL_MIN_STATIONS:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(restructure_station, jobs, chunksize=max(1, len(jobs) // (4 * workers))))
+    else:
+        workers = 1
+        results = [restructure_station(job) for job in jobs]
+
+    names, times, deltas = [], [], []
+    for name, t, delta, problem in results:
+        if problem == "no data":
+            logging.warning(f"No data for station {name}")
+        elif problem:
+            logging.error(f"Error processing station {name}: {problem}")
+        else:
+            names.append(name)
+            times.append(t)
+            deltas.append(delta)
+    if not names:
+        return None
+    distances = registry.distances()
+    counts = [len(t) for t in times]
+    df = pd.DataFrame({
+        't': np.concatenate(times),
+        'station': np.repeat(np.array(names, dtype=object), counts),
+        'distance_km': np.repeat(np.array([distances[name] for name in names], dtype=np.float64), counts),
+        'delta': np.concatenate(deltas),
+    })
+    logging.info(f"Restructured {len(names)} stations ({len(df):,} rows) in "
+                 f"{time.perf_counter() - start:.2f}s with {workers} worker(s)")
+    return df
+
+def pivot_stations(df):
+    """Pivot long-form deltas to time x station, columns sorted by distance."""
+    df_pivot = df.pivot(index='t', columns='station', values='delta')
+    sorted_stations = registry.by_distance(df_pivot.columns)
+    return df_pivot[sorted_stations], sorted_stations, registry.distances()
+
+def typed_frame(df):
+    """t/v frame with parsed times and float values (stores hold typed frames, fresh responses strings)."""
+    if df.empty:
+        return df
+    t, v = typed_samples(df)
+    return pd.DataFrame({'t': t, 'v': v})
+
+def merge_raw(old, new):
+    """Fold newly fetched raw responses into the previous raw cache."""
+    merged = {}
+    for name in set(old) | set(new):
+        products = set(old.get(name, {})) | set(new.get(name, {}))
+        merged[name] = {product: stitch_chunks([typed_frame(old.get(name, {}).get(product, pd.DataFrame())),
+                                                typed_frame(new.get(name, {}).get(product, pd.DataFrame()))])
+                        for product in products}
+    return merged
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fetch NOAA water levels and build the pivoted wave dataset")
+    parser.add_argument("--offline", action="store_true", help="replay cached responses only, no network I/O")
+    parser.add_argument("--no-cache", action="store_true", help="bypass the on-disk response cache")
+    parser.add_argument("--cache-dir", default=CACHE_DIR, help="response cache directory")
+    parser.add_argument("--ttl", type=float, default=DEFAULT_TTL, help="seconds before a cached response is revalidated")
+    parser.add_argument("--begin", type=pd.Timestamp, help="start of a historical span (GMT), e.g. '2025-07-29 00:00'")
+    parser.add_argument("--end", type=pd.Timestamp, help="end of the span (GMT) for --begin/--incremental; defaults to now")
+    parser.add_argument("--incremental", action="store_true",
+                        help="fetch only samples newer than each station's high-water mark and append them")
+    parser.add_argument("--workers", type=int, default=None,
+                        help=f"processes for the restructure step (default: all cores; used from {POOL_MIN_STATIONS} stations)")
+    parser.add_argument("--stations", nargs="+", metavar="STATION",
+                        help="only these stations (ids, short names or NOAA names)")
+    parser.add_argument("--exclude", nargs="+", metavar="STATION", help="skip these stations")
+    parser.add_argument("--region", nargs="+", help="only stations in these regions, e.g. Hawaii")
+    parser.add_argument("--compress", action="store_true", help=f"{COMPRESSION}-compress the data stores (no memory mapping)")
+    args = parser.parse_args()
+    if args.offline and args.no_cache:
+        parser.error("--offline replays the response cache; it cannot be combined with --no-cache")
+    if args.end is not None and args.begin is None and not args.incremental:
+        parser.error("--end requires --begin or --incremental")
+    if args.incremental and args.begin is not None:
+        parser.error("--incremental picks its own start per station; drop --begin")
+    try:
+        stations = registry.select(include=args.stations, exclude=args.exclude, regions=args.region)
+    except KeyError as e:
+        parser.error(e.args[0])
+    if not stations:
+        parser.error("the station filters leave no stations to fetch")
+    now = pd.Timestamp.now("UTC").tz_localize(None).floor("min")
+    begin = args.begin.to_pydatetime() if args.begin is not None else None
+    end = (args.end or now).to_pydatetime() if begin else None
+
+    compression = COMPRESSION if args.compress else None
+
+    previous = None
+    state = load_state()
+    if args.incremental:
+        # All three stores are appended to; check them before any network I/O
+        missing = [path for path in (RAW_STORE_DIR, RESTRUCTURED_STORE_DIR, PIVOT_STORE_DIR)
+                   if not os.path.exists(os.path.join(path, "schema.json"))]
+        if missing:
+            parser.error(f"--incremental needs existing {', '.join(missing)}; run a full collection first")
+        previous = load_pivot()
+        high_water = state["high_water"] or high_water_marks(previous['df_pivot'])
+        # Resume one minute past each station's last valid sample
+        begin = {name: (pd.Timestamp(t) + pd.Timedelta(minutes=1)).to_pydatetime() for name, t in high_water.items()}
+        end = (args.end or now).to_pydatetime()
+
+    # Responses come from the on-disk cache when fresh; stale ones are revalidated
+    response_cache = None
+    if not args.no_cache:
+        response_cache = ResponseCache(args.cache_dir, ttl=args.ttl, offline=args.offline)
+    if args.incremental:
+        logging.info(f"Fetching samples newer than the high-water marks (up to {end})...")
     else:
+        logging.info(f"Fetching data from NOAA API ({f'{begin} - {end}' if begin else 'date=recent'})...")
+    raw_data = fetch_all(response_cache=response_cache, begin=begin, end=end)
+    if response_cache is not None:
+        response_cache.evict()
+
+    logging.info("Processing and restructuring data...")
+    df = restructure(raw_data, workers=args.workers)
+    if df is None and not args.incremental:
         logging.error("No valid data to process. Exiting.")
         exit(1)
-    df['t_str'] = df['t'].dt.strftime('%Y-%m-%d %H:%M')
+    if df is None:
+        logging.info("No new samples since the last run; nothing to do.")
+        exit(0)
+
+    if args.incremental:
+        # Append: new samples win over anything already in the pivot
+        new_pivot, _, _ = pivot_stations(df)
+        df_pivot = new_pivot.combine_first(previous['df_pivot'])
+        station_distance = {**previous['station_distance'], **registry.distances()}
+        sorted_stations = registry.by_distance(df_pivot.columns)
+        df_pivot = df_pivot[sorted_stations]
+        # Frames after a station's old high-water mark were forward-filled and must be rebuilt
+        touched = [high_water.get(s) or str(new_pivot[s].first_valid_index())
+                   for s in new_pivot.columns if new_pivot[s].notna().any()]
+        mark_dirty(state, "dirty_from", str(min(pd.Timestamp(t) for t in touched)))
+        logging.info(f"Appended {len(new_pivot)} new minutes; frames dirty from {state['dirty_from']}")
+
+        raw_data = merge_raw(load_raw(), raw_data)
+        df = pd.concat([load_restructured(), df]).drop_duplicates(subset=['t', 'station'], keep='last')
+    else:
+        df_pivot, sorted_stations, station_distance = pivot_stations(df)
+        state["dirty_from"] = str(df_pivot.index.min())
+
+    # Typed columnar stores (see sample_store.py); the pivot feeds the Dash app and frame generation
+    save_raw(raw_data, RAW_STORE_DIR, compression)
+    logging.info(f"Raw API data stored in {RAW_STORE_DIR}")
+    save_restructured(df, RESTRUCTURED_STORE_DIR, compression)
+    logging.info(f"Restructured data stored in {RESTRUCTURED_STORE_DIR}")
+    save_pivot(df_pivot, sorted_stations, station_distance, PIVOT_STORE_DIR, compression)
+    logging.info(f"Pivoted data stored in {PIVOT_STORE_DIR}")
+    state["high_water"] = high_water_marks(df_pivot)
+    save_state(state)
 
-    logging.info("Data collection, restructuring, and caching complete. Raw data: %s, Restructured data: %s, Pivoted data: %s", raw_cache_file, restructured_cache_file, 'data/pivoted_wave_data.pkl')
+    logging.info("Data collection, restructuring, and caching complete. Raw data: %s, Restructured data: %s, Pivoted data: %s", RAW_STORE_DIR, RESTRUCTURED_STORE_DIR, PIVOT_STORE_DIR)
@@ -1,3 +1,6 @@
+import time
+startup_start_time = time.time()  # before the imports: they are most of a worker's boot
+
 import dash
 from dash import dcc, html, Input, Output, State, clientside_callback, ClientsideFunction
 from dash.exceptions import PreventUpdate
@@ -5,29 +8,72 @@ import plotly.graph_objects as go
 import plotly.subplots as sp
 import pandas as pd
 import pickle
+import gzip
+import hashlib
+import json
 import dash_leaflet as dl
+from flask import Response, abort, request
 import os
 import numpy as np
 import plotly
-import time
-print("DEBUG: plotly version:", plotly.__version__)
-print("DEBUG: dash version:", dash.__version__)
-
-# Start timing app startup
-startup_start_time = time.time()
-
-# Load pivoted data for oscilloscope-style animation
+import sys
+from functools import lru_cache
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "scripts"))
+import callback_metrics
+from callback_metrics import CallbackMetrics
+from downsample import build_levels, pick_level
+from frame_builder import build_frame_arrays, cursor_line, frames_to_cache
+from frame_responses import CURSOR_SHAPE_INDEX, MARKER_OFFSET, RESPONSE_DIR, frame_patches, load_bundle, marker_style
+from frame_store import FrameStore, STORE_DIR
+from sample_store import load_pivot, PIVOT_STORE_DIR
+from station_registry import load_registry
+
+# Debug output (versions, sample frames, station banner) is off unless STARTUP_DEBUG=true
+STARTUP_DEBUG = os.environ.get('STARTUP_DEBUG', 'False').lower() == 'true'
+if STARTUP_DEBUG:
+    print("DEBUG: plotly version:", plotly.__version__)
+    print("DEBUG: dash version:", dash.__version__)
+
+# Per-phase startup timings, each measured from the end of the previous phase
+# and printed with the total once the app is built
+startup_phases = []
+
+def startup_phase(name, since):
+    """Record a startup phase that began at `since`; returns the time it ended."""
+    now = time.time()
+    startup_phases.append((name, now - since))
+    return now
+
+phase_start = startup_phase("imports", startup_start_time)
+
+# Station metadata, display flags and precomputed distances (data/station_metadata.json)
+registry = load_registry()
+
+# Load pivoted data for oscilloscope-style animation.
+# Prefer the memory-mapped frame store written by generate_frame_cache.py: it is
+# mapped read-only, so every gunicorn worker shares the same pages through the
+# OS page cache and nothing is unpickled. Fall back to the pivot store without it.
+FRAME_STORE_DIR = os.environ.get("FRAME_STORE_DIR", STORE_DIR)
 data_load_start = time.time()
-with open("data/pivoted_wave_data.pkl", "rb") as f:
-    pivoted = pickle.load(f)
-df_pivot = pivoted['df_pivot']  # index: t, columns: station, values: delta
-station_order = pivoted['station_order']
-station_distances = pivoted['station_distance']
+frame_store = None
+if os.path.exists(os.path.join(FRAME_STORE_DIR, "header.json")):
+    frame_store = FrameStore(FRAME_STORE_DIR, mmap=True)
+    station_order = list(frame_store.station_order)
+    station_distances = dict(zip(station_order, frame_store.distances))
+    # Already filtered, interpolated and trimmed to the displayed stations; wrap without copying
+    df_pivot = pd.DataFrame(frame_store.deltas, index=pd.DatetimeIndex(frame_store.timestamps, name='t'),
+                            columns=station_order, copy=False)
+else:
+    pivoted = load_pivot(PIVOT_STORE_DIR, stations=[s.key for s in registry.select(displayed=True)])
+    df_pivot = pivoted['df_pivot']  # index: t, columns: station, values: delta
+    station_order = pivoted['station_order']
+    station_distances = pivoted['station_distance']
 data_load_time = time.time() - data_load_start
-print(f"⏱️ Data loading: {data_load_time:.3f}s")
+print(f"⏱️ Data loading: {data_load_time:.3f}s ({'memory-mapped frame store' if frame_store is not None else 'pivot store'})")
 
 # Earthquake epicenter coordinates (2025 Kamchatka Peninsula earthquake)
-epicenter_lat, epicenter_lon = 52.473, 160.396
+epicenter_lat, epicenter_lon = registry.epicenter
 
 # Earthquake timing: 30 July 2025, at 11:24:52 PETT (29 July 2025, 23:24:52 UTC)
 earthquake_time = pd.Timestamp('2025-07-29 23:24:52')  # timezone-naive to match data
@@ -54,16 +100,16 @@ def get_percent(t, all_frames):
 
 
 
-# Remove unwanted stations from visualization
-stations_to_remove = ['Pago Pago', 'Kwajalein', 'Apra Harbor', 'Pago Bay', 'Pearl Harbor', 'Mokuoloe']
-for station in stations_to_remove:
-    if station in df_pivot.columns:
-        df_pivot = df_pivot.drop(columns=[station])
+# Remove stations the registry keeps off the visualization (display: false)
+hidden_stations = [s for s in df_pivot.columns if s not in registry or not registry.by_name(s).display]
+if hidden_stations:
+    df_pivot = df_pivot.drop(columns=hidden_stations)
 
 # Filter to times from earthquake occurrence to July 31 00:00 UTC
-import pandas as pd
+# (the frame store is already trimmed, and masking it would copy the mapping)
 end_time = pd.Timestamp('2025-07-31 00:00:00')
-df_pivot = df_pivot[(df_pivot.index >= earthquake_time) & (df_pivot.index <= end_time)]
+if frame_store is None:
+    df_pivot = df_pivot[(df_pivot.index >= earthquake_time) & (df_pivot.index <= end_time)]
 
 # Sort columns and distances
 station_order = [s for s in station_order if s in df_pivot.columns]
@@ -115,21 +161,24 @@ def create_slider_marks(timezone_mode='UTC'):
     # Add hardcoded station arrival markers at specific frame numbers
     marks[245] = "📍M"  # Frame 245 for Midway
     marks[355] = "📍H"  # Frame 355 for Hawaii
-    print(f"DEBUG: Added hardcoded slider marks - Midway at frame 245, Hawaii at frame 355")
+    if STARTUP_DEBUG:
+        print(f"DEBUG: Added hardcoded slider marks - Midway at frame 245, Hawaii at frame 355")
     
     return marks
 
 # Interpolate and fill missing values for continuous line
-# (axis=0: fill down each station column by time)
-df_pivot_interp = df_pivot.interpolate(axis=0).ffill().bfill()
+# (axis=0: fill down each station column by time; the frame store is stored filled)
+df_pivot_interp = df_pivot.interpolate(axis=0).ffill().bfill() if frame_store is None else df_pivot
 
 # Debug: print first frame's distances and y-values
-print('DEBUG: distances:', distances)
+if STARTUP_DEBUG:
+    print('DEBUG: distances:', distances)
 # print('DEBUG: first frame y:', df_pivot_interp.iloc[0].values.tolist())
 
 # Filter out frames where all y are NaN (should be none after fill, but for safety)
 valid_frame_mask = ~np.all(np.isnan(df_pivot_interp.values), axis=1)
-df_pivot_interp = df_pivot_interp[valid_frame_mask]
+if not valid_frame_mask.all():
+    df_pivot_interp = df_pivot_interp[valid_frame_mask]
 all_frames = df_pivot_interp.index.sort_values()
 
 # Recalculate y_range using only non-NaN values from all frames
@@ -137,188 +186,323 @@ all_y = df_pivot_interp.values.flatten()
 y_range = [float(np.nanmin(all_y[np.isfinite(all_y)])) - 0.1, float(np.nanmax(all_y[np.isfinite(all_y)])) + 0.1]
 
 # Debug: print y values for first 3 frames
-for i in range(min(3, len(df_pivot_interp))):
+for i in range(min(3, len(df_pivot_interp)) if STARTUP_DEBUG else 0):
     print(f'DEBUG: frame {i} y:', df_pivot_interp.iloc[i].values.tolist())
 
+class StoreFrameCache:
+    """frame_data_cache look-alike that builds each frame dict from the mapped store on access."""
+
+    def __init__(self, store):
+        self.store = store
+        self.x_values = [float(d) for d in store.distances]
+
+    def __len__(self):
+        return len(self.store)
+
+    def __getitem__(self, i):
+        if not 0 <= i < len(self.store):
+            raise KeyError(i)
+        frame = self.store.frame(i)
+        timestamp = pd.Timestamp(frame.timestamp)
+        return {
+            'x_values': self.x_values,
+            'wave_values': frame.wave_values.tolist(),
+            'timestamp': timestamp
+        }
+
+phase_start = startup_phase("data", phase_start)
+
 # ⚡ OPTIMIZATION #2: Load pre-calculated frame data cache
 print("⚡ Loading pre-calculated frame data cache...")
 cache_load_start = time.time()
 
 try:
-    with open("data/frame_data_cache.pkl", "rb") as f:
-        frame_data_cache = pickle.load(f)
+    if frame_store is not None:
+        frame_data_cache = StoreFrameCache(frame_store)
+    else:
+        with open("data/frame_data_cache.pkl", "rb") as f:
+            frame_data_cache = pickle.load(f)
     
     cache_load_time = time.time() - cache_load_start
-    total_shapes = len(frame_data_cache) * len(station_order)
     print(f"✅ Cache loaded: {cache_load_time:.3f}s ({len(frame_data_cache)} frames)")
-    print(f"⚡ Instant access to {total_shapes:,} pre-calculated shapes")
     
 except FileNotFoundError:
     print("❌ Cache file not found! Run 'python generate_frame_cache.py' first")
     print("⚠️  Falling back to live calculation...")
     
-    # Fallback to live calculation
-    frame_data_cache = {}
-    for i in range(len(df_pivot_interp)):
-        x_values = [float(d) for d in distances]
-        wave_values = df_pivot_interp.iloc[i].values.tolist()
-        timestamp = all_frames[i]
-        
-        timeseries_shapes = []
-        for j in range(len(station_order)):
-            timeseries_shapes.append({
-                "type": "line",
-                "xref": f"x{j+1}",
-                "yref": f"y{j+1}",
-                "x0": timestamp,
-                "x1": timestamp,
-                "y0": -1,
-                "y1": 1,
-                "line": {"color": "blue", "width": 2, "dash": "dot"},
-                "layer": "above"
-            })
-        
-        frame_data_cache[i] = {
-            'x_values': x_values,
-            'wave_values': wave_values,
-            'timestamp': timestamp,
-            'timeseries_shapes': timeseries_shapes
-        }
+    # Fallback to live calculation, with the same builder generate_frame_cache.py uses
+    frame_data_cache = frames_to_cache(build_frame_arrays(df_pivot_interp[station_order], distances))
     
     fallback_time = time.time() - cache_load_start
     print(f"⚡ Fallback calculation: {fallback_time:.3f}s")
 
-# Build go.Figure with animation
-figure_build_start = time.time()
-fig = go.Figure()
-
-# Add horizontal baseline at delta = 0
-fig.add_shape(
-    type="line",
-    x0=min(station_distances.values()),
-    x1=max(station_distances.values()),
-    y0=0,
-    y1=0,
-    line=dict(color="gray", width=1, dash="dot"),
-    layer="below"
-)
-
 # Add initial oscilloscope-style polyline (first frame) - using pre-calculated data
 x0 = frame_data_cache[0]['x_values']
 y0 = frame_data_cache[0]['wave_values']
-print('DEBUG: initial trace x:', x0)
-print('DEBUG: initial trace y:', y0)
-fig.add_trace(go.Scatter(
-    x=x0,
-    y=y0,
-    mode='lines+markers',
-    line=dict(color='firebrick', width=3),
-    marker=dict(size=10, color='firebrick'),
-    name='Wave Δ',
-    showlegend=False
-))
-
-# Add vertical dashed lines for each station
-for i, x in enumerate(distances):
+if STARTUP_DEBUG:
+    print('DEBUG: initial trace x:', x0)
+    print('DEBUG: initial trace y:', y0)
+phase_start = startup_phase("frame cache", phase_start)
+
+# Startup figures: the oscilloscope layout and the station time-series figure.
+# Building them is mostly plotly validation, the largest startup cost after the
+# imports, and they depend only on the data and the code that draws them. So the
+# first boot saves them as JSON under a fingerprint of both (STARTUP_CACHE), and
+# later boots, including every gunicorn worker, load that instead of rebuilding.
+# `python wave_propagation_dash_app.py --prebuild` writes it as a build step.
+STARTUP_CACHE = os.environ.get("STARTUP_CACHE", "data/dash_startup_figures.json")
+TIMESERIES_WIDTH_PX = int(os.environ.get("TIMESERIES_WIDTH_PX", 1200))
+PREBUILD = __name__ == '__main__' and '--prebuild' in sys.argv
+
+def build_wave_layout():
+    """Oscilloscope layout: axes, station guide lines and labels (the trace is patched per frame)."""
+    fig = go.Figure()
+
+    # Add horizontal baseline at delta = 0
     fig.add_shape(
         type="line",
-        x0=x, x1=x,
-        y0=y_range[0], y1=y_range[1],
-        line=dict(color="gray", width=1, dash="dash"),
+        x0=min(station_distances.values()),
+        x1=max(station_distances.values()),
+        y0=0,
+        y1=0,
+        line=dict(color="gray", width=1, dash="dot"),
         layer="below"
     )
 
-# Add station labels as annotations with smart positioning to prevent overlap
-label_positions = []
-for i, x in enumerate(distances):
-    # Calculate positions to avoid overlap
-    base_y = 1.05
-    offset = 0.06
-    
-    # Custom level mapping based on station names
-    station_name = station_order[i]
-    if station_name in ['Midway', 'Wake Island', 'Nawiliwili', 'Kahului', 'Hilo']:
-        level = 0  # Same height as Midway
-    elif station_name in ['Honolulu', 'Kawaihae']:
-        level = 1  # Middle height
-    else:
-        level = 0  # Default to level 0
-    
-    y_pos = base_y + (offset * level)
-    
-    fig.add_annotation(
-        x=x,
-        y=y_pos,
-        yref="paper",
-        text=station_order[i],
-        showarrow=True,
-        arrowhead=2,
-        arrowsize=0.8,
-        arrowwidth=1,
-        arrowcolor="darkgray",
-        ax=0,
-        ay=-15 - (5 * level),  # Variable arrow lengths based on level
-        yanchor="bottom",
-        textangle=0,
-        font=dict(size=9, color="black", family="Arial", weight="bold"),
-        bgcolor="rgba(255,255,255,0.95)",
-        bordercolor="darkgray",
-        borderwidth=1,
-        borderpad=2
-    )
+    # Add initial oscilloscope-style polyline (first frame) - using pre-calculated data
+    fig.add_trace(go.Scatter(
+        x=x0,
+        y=y0,
+        mode='lines+markers',
+        line=dict(color='firebrick', width=3),
+        marker=dict(size=10, color='firebrick'),
+        name='Wave Δ',
+        showlegend=False
+    ))
 
-# Add horizontal baseline at y=0
-fig.add_shape(
-    type="line",
-    x0=min(distances), x1=max(distances),
-    y0=0, y1=0,
-    line=dict(color="black", width=2),
-    layer="below"
-)
+    # Add vertical dashed lines for each station
+    for i, x in enumerate(distances):
+        fig.add_shape(
+            type="line",
+            x0=x, x1=x,
+            y0=y_range[0], y1=y_range[1],
+            line=dict(color="gray", width=1, dash="dash"),
+            layer="below"
+        )
 
-# Animation frames: one continuous polyline per frame - using pre-calculated data
-frames = []
-for i in range(len(all_frames)):
-    frame_data = frame_data_cache[i]
-    x = frame_data['x_values']
-    y = frame_data['wave_values']
-    frames.append(go.Frame(
-        data=[go.Scatter(
+    # Add station labels as annotations with smart positioning to prevent overlap
+    label_positions = []
+    for i, x in enumerate(distances):
+        # Calculate positions to avoid overlap
+        base_y = 1.05
+        offset = 0.06
+    
+        # Custom level mapping based on station names
+        station_name = station_order[i]
+        if station_name in ['Midway', 'Wake Island', 'Nawiliwili', 'Kahului', 'Hilo']:
+            level = 0  # Same height as Midway
+        elif station_name in ['Honolulu', 'Kawaihae']:
+            level = 1  # Middle height
+        else:
+            level = 0  # Default to level 0
+    
+        y_pos = base_y + (offset * level)
+    
+        fig.add_annotation(
             x=x,
-            y=y,
-            mode='lines+markers',
-            line=dict(color='firebrick', width=3),
-            marker=dict(size=10, color='firebrick'),
-            showlegend=False
-        )],
-        name=str(frame_data['timestamp'])
-    ))
-fig.frames = frames
-
-# Layout
-fig.update_layout(
-    title=dict(
-        text="Wave Amplitude vs Distance from Epicenter",
-        font=dict(size=16, color='#2c3e50')
-    ),
-    xaxis_title="Distance from Epicenter (km)",
-    yaxis_title="Δ Wave Height (m)",
-    yaxis=dict(range=y_range, fixedrange=True, zeroline=False, autorange=False),
-    xaxis=dict(range=[min(distances), max(distances)], fixedrange=True),
-    height=400,
-    plot_bgcolor="white",
-    paper_bgcolor="white",
-    margin=dict(t=120, b=40, l=60, r=20),  # More space for 3-level labels
-    showlegend=False  # Remove legend to save space - single trace is self-explanatory
-)
+            y=y_pos,
+            yref="paper",
+            text=station_order[i],
+            showarrow=True,
+            arrowhead=2,
+            arrowsize=0.8,
+            arrowwidth=1,
+            arrowcolor="darkgray",
+            ax=0,
+            ay=-15 - (5 * level),  # Variable arrow lengths based on level
+            yanchor="bottom",
+            textangle=0,
+            font=dict(size=9, color="black", family="Arial", weight="bold"),
+            bgcolor="rgba(255,255,255,0.95)",
+            bordercolor="darkgray",
+            borderwidth=1,
+            borderpad=2
+        )
 
-figure_build_time = time.time() - figure_build_start
-print(f"⏱️ Figure building: {figure_build_time:.3f}s")
+    # Add horizontal baseline at y=0
+    fig.add_shape(
+        type="line",
+        x0=min(distances), x1=max(distances),
+        y0=0, y1=0,
+        line=dict(color="black", width=2),
+        layer="below"
+    )
+
+    # Layout
+    fig.update_layout(
+        title=dict(
+            text="Wave Amplitude vs Distance from Epicenter",
+            font=dict(size=16, color='#2c3e50')
+        ),
+        xaxis_title="Distance from Epicenter (km)",
+        yaxis_title="Δ Wave Height (m)",
+        yaxis=dict(range=y_range, fixedrange=True, zeroline=False, autorange=False),
+        xaxis=dict(range=[min(distances), max(distances)], fixedrange=True),
+        height=400,
+        plot_bgcolor="white",
+        paper_bgcolor="white",
+        margin=dict(t=120, b=40, l=60, r=20),  # More space for 3-level labels
+        showlegend=False  # Remove legend to save space - single trace is self-explanatory
+    )
+
+    return fig.layout
+
+
+def build_timeseries_figure():
+    """One subplot per station with the earthquake markers and the current-time cursor."""
+    # Long records are drawn from a min/max downsampling level sized to the plot
+    # width (TIMESERIES_WIDTH_PX, same levels as frame_levels/ in the static build);
+    # short ones in full.
+    timeseries_level = pick_level(build_levels(df_pivot_interp[station_order].to_numpy()), len(df_pivot_interp), TIMESERIES_WIDTH_PX)
+    if timeseries_level is not None:
+        print(f"📉 Time series: {timeseries_level[0]} frames/bucket, "
+              f"{timeseries_level[1].shape[1]} of {len(df_pivot_interp)} points per station")
+
+    def station_series(i):
+        if timeseries_level is None:
+            return df_pivot_interp.index, df_pivot_interp[station_order[i]]
+        _, indices, samples = timeseries_level
+        return df_pivot_interp.index[indices[i]], samples[i]
+
+    # Create a timeseries figure for each station
+    station_timeseries_fig = sp.make_subplots(
+        rows=len(station_order), cols=1, shared_xaxes=True,
+        subplot_titles=station_order, vertical_spacing=0.01
+    )
+    for i, station in enumerate(station_order):
+        series_x, series_y = station_series(i)
+        station_timeseries_fig.add_trace(
+            go.Scatter(
+                x=series_x,
+                y=series_y,
+                mode='lines',
+                name=station,
+                showlegend=False,
+                line=dict(width=2)
+            ),
+            row=i+1, col=1
+        )
+    # Set all y-axes to the same range
+    yaxis_range = y_range  # use the same as oscilloscope plot
+    for i in range(1, len(station_order)+1):
+        station_timeseries_fig.update_yaxes(range=yaxis_range, row=i, col=1)
+
+    # Colors now use Plotly's standard defaults to match time series
+
+    station_timeseries_fig.update_layout(
+        height=600,
+        title=dict(
+            text="Wave Height Anomalies Over Time",
+            font=dict(size=16, color='#2c3e50')
+        ),
+        margin=dict(t=50, b=60, l=80, r=20),  # More bottom margin for x-axis label, more left for y-axis
+        plot_bgcolor="white",
+        paper_bgcolor="white"
+    )
+
+    # Update x-axis to show label only at bottom
+    station_timeseries_fig.update_xaxes(
+        title_text="Time (UTC)",
+        title_standoff=1,
+        row=len(station_order), col=1  # Only show on bottom subplot
+    )
+
+    # Update y-axis label positioning to center
+    station_timeseries_fig.update_layout(
+        yaxis=dict(
+            title="Δ Wave Height (m)",
+            title_standoff=5
+        )
+    )
+
+
+
+
+    # Add earthquake marker to all time series subplots
+    earthquake_shapes = []
+    for i in range(1, len(station_order)+1):
+        earthquake_shapes.append({
+            "type": "line",
+            "xref": f"x{i}",
+            "yref": f"y{i}",
+            "x0": earthquake_time,
+            "x1": earthquake_time,
+            "y0": yaxis_range[0],
+            "y1": yaxis_range[1],
+            "line": {"color": "red", "width": 1, "dash": "dash"},
+            "layer": "above"
+        })
+
+    # Current-time cursor: a single line down every subplot (the x axes are shared),
+    # ahead of the earthquake markers. Frame updates only move its x0/x1.
+    station_timeseries_fig.update_layout(shapes=[cursor_line(str(all_frames[0]))] + earthquake_shapes)
+
+    return station_timeseries_fig
+
+
+def startup_fingerprint():
+    """Hash of the plotted data and of the code that draws it."""
+    digest = hashlib.sha256()
+    for path in (__file__, sys.modules['downsample'].__file__, sys.modules['frame_builder'].__file__):
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    digest.update(np.ascontiguousarray(df_pivot_interp[station_order].to_numpy()).tobytes())
+    digest.update(df_pivot_interp.index.asi8.tobytes())
+    digest.update(json.dumps([station_order, distances, TIMESERIES_WIDTH_PX, plotly.__version__]).encode())
+    return digest.hexdigest()[:20]
+
+def load_startup_figures(path, fingerprint):
+    """Saved startup figures, or None if there are none for this data and code."""
+    try:
+        with open(path) as f:
+            saved = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return saved if saved.get('fingerprint') == fingerprint else None
+
+def save_startup_figures(figures, path, fingerprint):
+    tmp = f"{path}.{os.getpid()}.tmp"  # workers booting together each write their own
+    with open(tmp, 'w') as f:
+        json.dump({'fingerprint': fingerprint, **figures}, f, cls=plotly.utils.PlotlyJSONEncoder)
+    os.replace(tmp, path)
+
+startup_fingerprint_value = startup_fingerprint() if STARTUP_CACHE else None
+startup_figures = None
+if STARTUP_CACHE and not PREBUILD:
+    startup_figures = load_startup_figures(STARTUP_CACHE, startup_fingerprint_value)
+figures_source = 'prebuilt' if startup_figures is not None else 'built'
+if startup_figures is None:
+    startup_figures = {'wave_layout': build_wave_layout(), 'timeseries': build_timeseries_figure()}
+    if STARTUP_CACHE:
+        try:
+            save_startup_figures(startup_figures, STARTUP_CACHE, startup_fingerprint_value)
+        except OSError as e:
+            print(f"⚠️ Could not save startup figures to {STARTUP_CACHE}: {e}")
+phase_start = startup_phase(f"figures ({figures_source})", phase_start)
 
 
 # Dash app layout
 app = dash.Dash(__name__, title="Wave Watch")
 
+# Server callback metrics (scripts/callback_metrics.py): latency and response size
+# histograms per callback plus cache counters, served as JSON from METRICS_PATH to
+# local clients. PROFILE_SAMPLE_MS > 0 also samples the callbacks' stacks.
+METRICS_PATH = os.environ.get("METRICS_PATH", f"{app.config.routes_pathname_prefix}_metrics")
+metrics = CallbackMetrics(profile_interval_ms=float(os.environ.get("PROFILE_SAMPLE_MS", 0)))
+if METRICS_PATH:
+    callback_metrics.install(app.server, metrics, METRICS_PATH)
+    print(f"📈 Callback metrics: {METRICS_PATH} (local clients)")
+
 # Add custom favicon using wave emoji
 app.index_string = '''
 <!DOCTYPE html>
@@ -349,76 +533,6 @@ preview_rows = 10
 preview_df = df_pivot_interp.tail(preview_rows)
 preview_df_reset = preview_df.reset_index()
 
-# Create a timeseries figure for each station
-station_timeseries_fig = sp.make_subplots(
-    rows=len(station_order), cols=1, shared_xaxes=True,
-    subplot_titles=station_order, vertical_spacing=0.01
-)
-for i, station in enumerate(station_order):
-    station_timeseries_fig.add_trace(
-        go.Scatter(
-            x=df_pivot_interp.index,
-            y=df_pivot_interp[station],
-            mode='lines',
-            name=station,
-            showlegend=False,
-            line=dict(width=2)
-        ),
-        row=i+1, col=1
-    )
-# Set all y-axes to the same range
-yaxis_range = y_range  # use the same as oscilloscope plot
-for i in range(1, len(station_order)+1):
-    station_timeseries_fig.update_yaxes(range=yaxis_range, row=i, col=1)
-
-# Colors now use Plotly's standard defaults to match time series
-
-station_timeseries_fig.update_layout(
-    height=600,
-    title=dict(
-        text="Wave Height Anomalies Over Time",
-        font=dict(size=16, color='#2c3e50')
-    ),
-    margin=dict(t=50, b=60, l=80, r=20),  # More bottom margin for x-axis label, more left for y-axis
-    plot_bgcolor="white",
-    paper_bgcolor="white"
-)
-
-# Update x-axis to show label only at bottom
-station_timeseries_fig.update_xaxes(
-    title_text="Time (UTC)",
-    title_standoff=1,
-    row=len(station_order), col=1  # Only show on bottom subplot
-)
-
-# Update y-axis label positioning to center
-station_timeseries_fig.update_layout(
-    yaxis=dict(
-        title="Δ Wave Height (m)",
-        title_standoff=5
-    )
-)
-
-
-
-
-# Add earthquake marker to all time series subplots
-earthquake_shapes = []
-for i in range(1, len(station_order)+1):
-    earthquake_shapes.append({
-        "type": "line",
-        "xref": f"x{i}",
-        "yref": f"y{i}",
-        "x0": earthquake_time,
-        "x1": earthquake_time,
-        "y0": yaxis_range[0],
-        "y1": yaxis_range[1],
-        "line": {"color": "red", "width": 1, "dash": "dash"},
-        "layer": "above"
-    })
-
-station_timeseries_fig.update_layout(shapes=earthquake_shapes)
-
 # Add earthquake annotation to the first subplot
 # station_timeseries_fig.add_annotation(
 #     x=earthquake_time,
@@ -438,14 +552,15 @@ station_timeseries_fig.update_layout(shapes=earthquake_shapes)
 # )
 
 # --- Animated Overview Map Construction ---
-# Hardcoded station coordinates (pre-transformed to Western Pacific view)
-# These coordinates have already been shifted to avoid IDL rendering issues
-# Station order: ['Midway', 'Wake Island', 'Nawiliwili', 'Honolulu', 'Kahului', 'Kawaihae', 'Hilo']
-station_lats = [28.211666, 19.290556, 21.9544, 21.303333, 20.894945, 20.0366, 19.730278]
-station_lons = [-177.36, -193.3825, -159.3561, -157.86453, -156.469, -155.8294, -155.05556]
+# Station coordinates and colours from the registry, in station_order.
+# Longitudes are shifted to the Western Pacific view to avoid IDL rendering issues
+station_info = registry.client_info(station_order)
+station_lats = [s["lat"] for s in station_info]
+station_lons = [s["lon"] for s in station_info]
 
-# Earthquake coordinates (pre-transformed to Western Pacific view)
-epicenter_lat, epicenter_lon = 52.473, -199.604
+# Earthquake coordinates (same Western Pacific view)
+map_epicenter = registry.client_epicenter()
+epicenter_lat, epicenter_lon = map_epicenter["lat"], map_epicenter["lon"]
 
 # Calculate optimal bounding box for auto-fit
 all_lats = station_lats + [epicenter_lat]
@@ -463,54 +578,37 @@ bounds_max_lat, bounds_max_lon = bounds[1]
 center_lat = (bounds_min_lat + bounds_max_lat) / 2
 center_lon = (bounds_min_lon + bounds_max_lon) / 2
 
-# Use Plotly's exact default color sequence for time series alignment
-station_colors = [
-    '#636EFA',  # cornflower blue
-    '#EF553B',  # bittersweet orange  
-    '#00CC96',  # persian green
-    '#C490FD',  # lavender
-    '#FFA15A',  # light orange
-    '#1BD3F3',  # robbins egg blue
-    '#FF6692'   # light crimson
-]
-
-print(f"🌍 HARDCODED COORDINATES LOADED:")
-print(f"   Coordinate range: Lat {min_lat:.1f}° to {max_lat:.1f}° | Lon {min_lon:.1f}° to {max_lon:.1f}°")
-print(f"   Hardcoded bounds: Lat {bounds_min_lat:.1f}° to {bounds_max_lat:.1f}° | Lon {bounds_min_lon:.1f}° to {bounds_max_lon:.1f}°")
-print(f"   Map center: [{center_lat:.2f}, {center_lon:.2f}]")
-print(f"🎨 Using Plotly default colors: {station_colors}")
-
-# Show improved circle scaling examples
-print()
-print("🎯 IMPROVED CIRCLE SCALING EXAMPLES:")
-print("   Formula: size = 4 + (8 * sqrt(min(1.0, |wave_delta|/0.3)))")
-print("   Opacity: 0.3 + (0.7 * min(1.0, |wave_delta|/0.2))")
-print("   Border: White outline, size/opacity shows magnitude")
-sample_deltas = [0.01, 0.05, 0.1, 0.15, 0.2, 0.3, 0.5, -0.1, -0.2]
-for delta in sample_deltas:
-    wave_magnitude = abs(delta)
-    size_factor = min(1.0, wave_magnitude / 0.3)
-    size = 4 + (8 * np.sqrt(size_factor))
-    opacity_factor = min(1.0, wave_magnitude / 0.2)
-    opacity = 0.3 + (0.7 * opacity_factor)
-    print(f"   Wave Δ {delta:+5.2f}m → Size {size:4.1f}px, Opacity {opacity:.2f}")
+# Plotly's default colour sequence, assigned in display order (time series alignment)
+station_colors = [s["color"] for s in station_info]
+
+if STARTUP_DEBUG:
+    print(f"🌍 STATION COORDINATES LOADED ({len(station_info)} stations from the registry):")
+    print(f"   Coordinate range: Lat {min_lat:.1f}° to {max_lat:.1f}° | Lon {min_lon:.1f}° to {max_lon:.1f}°")
+    print(f"   Hardcoded bounds: Lat {bounds_min_lat:.1f}° to {bounds_max_lat:.1f}° | Lon {bounds_min_lon:.1f}° to {bounds_max_lon:.1f}°")
+    print(f"   Map center: [{center_lat:.2f}, {center_lon:.2f}]")
+    print(f"🎨 Using Plotly default colors: {station_colors}")
+
+    # Show improved circle scaling examples
+    print()
+    print("🎯 IMPROVED CIRCLE SCALING EXAMPLES:")
+    print("   Formula: size = 4 + (8 * sqrt(min(1.0, |wave_delta|/0.3)))")
+    print("   Opacity: 0.3 + (0.7 * min(1.0, |wave_delta|/0.2))")
+    print("   Border: White outline, size/opacity shows magnitude")
+    sample_deltas = [0.01, 0.05, 0.1, 0.15, 0.2, 0.3, 0.5, -0.1, -0.2]
+    for delta in sample_deltas:
+        wave_magnitude = abs(delta)
+        size_factor = min(1.0, wave_magnitude / 0.3)
+        size = 4 + (8 * np.sqrt(size_factor))
+        opacity_factor = min(1.0, wave_magnitude / 0.2)
+        opacity = 0.3 + (0.7 * opacity_factor)
+        print(f"   Wave Δ {delta:+5.2f}m → Size {size:4.1f}px, Opacity {opacity:.2f}")
 
 # Prepare initial map frame with improved station focus - using pre-calculated data
 initial_wave_values = frame_data_cache[0]['wave_values']
-# Use same improved sizing logic as in callback
 initial_marker_data = []
 for i in range(len(initial_wave_values)):
     wave_delta = initial_wave_values[i]  # Keep sign
-    wave_magnitude = abs(wave_delta)
-    
-    # Match callback sizing logic
-    base_size = 4
-    max_additional_size = 8
-    size_factor = min(1.0, wave_magnitude / 0.3)
-    size = base_size + (max_additional_size * np.sqrt(size_factor))
-    
-    opacity_factor = min(1.0, wave_magnitude / 0.2)
-    opacity = 0.3 + (0.7 * opacity_factor)
+    size, opacity = marker_style(wave_delta)
     
     # Keep clean white border like original
     border_color = 'white'
@@ -524,6 +622,27 @@ for i in range(len(initial_wave_values)):
         'wave_delta': wave_delta
     })
 
+# Oscilloscope figure for the first frame; later frames only patch the y-values
+wave_figure = {'data': [{'x': x0, 'y': y0, 'type': 'scatter', 'mode': 'lines+markers',
+                         'line': {'color': 'firebrick', 'width': 3}, 'marker': {'size': 10, 'color': 'firebrick'}}],
+               'layout': startup_figures['wave_layout']}
+
+# Frame matrix for clientside playback: timestamps and Δ per station, shipped
+# once with the layout (see the playback callbacks below)
+PLAYBACK_MODE = os.environ.get("PLAYBACK_MODE", "client")
+if PLAYBACK_MODE not in ("client", "server"):
+    raise ValueError(f"PLAYBACK_MODE must be 'client' or 'server', not {PLAYBACK_MODE!r}")
+metrics.info["playback_mode"] = PLAYBACK_MODE  # client: frames never reach the server callbacks
+frame_matrix = None
+if PLAYBACK_MODE == "client":
+    frame_matrix = {
+        "t": [str(t) for t in all_frames],
+        "y": [[round(float(v), 4) for v in frame_data_cache[i]['wave_values']] for i in range(len(all_frames))],
+        "names": station_order,
+        "marker_offset": MARKER_OFFSET,
+        "cursor": CURSOR_SHAPE_INDEX,
+    }
+
 # OLD PLOTLY MAP CODE REMOVED - NOW USING DASH LEAFLET BATHYMETRY MAP
 
 # --- Dash Layout with Map ---
@@ -633,7 +752,7 @@ app.layout = html.Div([
                     # Earthquake epicenter - large and prominent
                     dl.CircleMarker(
                         center=[epicenter_lat, epicenter_lon],
-                        radius=15,
+                        radius=20,
                         color='darkred',
                         weight=4,
                         fillColor='red',
@@ -659,7 +778,7 @@ app.layout = html.Div([
             html.H3("📊 Wave Propagation", style={'color': '#2c3e50', 'marginBottom': '15px', 'fontSize': '1.2rem'}),
             html.P("Oscilloscope-style visualization showing wave front progression across all stations, with distance from epicenter on X-axis and wave height anomaly on Y-axis.",
                    style={'color': '#7f8c8d', 'fontSize': '0.9rem', 'marginBottom': '15px', 'fontStyle': 'italic'}),
-            dcc.Graph(id="wave-graph", style={'height': '400px'}),
+            dcc.Graph(id="wave-graph", figure=wave_figure, style={'height': '400px'}),
         ], style={'width': '48%', 'display': 'inline-block', 'verticalAlign': 'top', 'paddingLeft': '2%'}),
     ]),
     
@@ -668,7 +787,7 @@ app.layout = html.Div([
         html.H3("📈 Station Time Series", style={'color': '#2c3e50', 'marginTop': '30px', 'marginBottom': '15px', 'fontSize': '1.2rem'}),
         html.P("Individual wave height records for each monitoring station over time, showing how tsunami waves arrive at different locations across the Pacific.",
                style={'color': '#7f8c8d', 'fontSize': '0.9rem', 'marginBottom': '15px', 'fontStyle': 'italic'}),
-        dcc.Graph(id="timeseries-graph", style={'height': '600px'}),
+        dcc.Graph(id="timeseries-graph", figure=startup_figures['timeseries'], style={'height': '600px'}),
     ], style={'width': '100%', 'marginTop': '20px'}),
     
     # Footer Info
@@ -680,18 +799,18 @@ app.layout = html.Div([
         ], style={'margin': '0', 'color': '#95a5a6', 'fontSize': '0.9rem', 'textAlign': 'center'})
     ], style={'marginTop': '30px', 'padding': '15px', 'background': '#ecf0f1', 'borderRadius': '8px'}),
     
-            dcc.Interval(id="interval", interval=10, n_intervals=0, disabled=True)
+            dcc.Interval(id="interval", interval=10, n_intervals=0, disabled=True),
+            dcc.Store(id="frame-matrix", data=frame_matrix)
 ], style={'maxWidth': '1400px', 'margin': '0 auto', 'padding': '20px', 'fontFamily': 'Arial, sans-serif', 'backgroundColor': '#f8f9fa'})
 
-# Calculate and display total startup time
-total_startup_time = time.time() - startup_start_time
-print(f"🚀 TOTAL STARTUP TIME: {total_startup_time:.3f}s")
+phase_start = startup_phase("layout", phase_start)
 
 @app.callback(
     [Output("interval", "disabled"), Output("interval", "interval"), Output("play-pause-btn", "children"), Output("play-pause-btn", "style")],
     [Input("play-pause-btn", "n_clicks"), Input("speed-dropdown", "value")],
     [State("interval", "disabled")]
 )
+@metrics.timed("toggle_play_pause")
 def toggle_play_pause(n_clicks, speed_value, interval_disabled):
     # Use speed_value for interval, default to 100ms (original speed)
     if speed_value is None:
@@ -723,150 +842,218 @@ def toggle_play_pause(n_clicks, speed_value, interval_disabled):
         # Currently playing, so pause
         return True, speed_value, "▶️ Play", play_style
 
-@app.callback(
-    Output("frame-slider", "value"),
-    [Input("interval", "n_intervals")],
-    [State("frame-slider", "value")],
-    prevent_initial_call=True
-)
-def advance_frame(n_intervals, slider_val):
-    if slider_val is None:
-        slider_val = 0
-    
-    # Advance by 1 frame (original behavior - no frame skipping)
-    next_val = slider_val + 1
-    if next_val >= len(all_frames):
-        next_val = 0  # loop back to start
-    
-    return next_val
-
-@app.callback(
-    [Output("timeline-clock", "children"), Output("timezone-toggle", "children")],
-    [Input("frame-slider", "value"), Input("timezone-toggle", "n_clicks")]
-)
-def update_timeline_clock(frame_index, timezone_clicks):
-    """Update the clock display with current timeline time and timezone toggle"""
-    if frame_index is None or frame_index >= len(all_frames):
-        return "Loading...", "🔄 UTC"
-    
-    # Determine timezone mode based on toggle clicks
-    timezone_mode = 'HST' if timezone_clicks and timezone_clicks % 2 == 1 else 'UTC'
-    
-    current_time = all_frames[frame_index]
-    formatted_time = format_time_display(current_time, timezone_mode)
-    
-    # Update toggle button text
-    toggle_text = "Show UTC" if timezone_mode == 'HST' else "Show HST"
-    
-    return formatted_time, toggle_text
-
 @app.callback(
     Output("frame-slider", "marks"),
     [Input("timezone-toggle", "n_clicks")]
 )
+@metrics.timed("update_slider_marks")
 def update_slider_marks(timezone_clicks):
     """Update slider marks when timezone is toggled"""
     timezone_mode = 'HST' if timezone_clicks and timezone_clicks % 2 == 1 else 'UTC'
     return create_slider_marks(timezone_mode)
 
-@app.callback(
-    [Output("bathymetry-map", "children"), Output("wave-graph", "figure"), Output("timeseries-graph", "figure")],
-    [Input("frame-slider", "value")]
-)
-def update_all_figures(frame_idx):
-    callback_start_time = time.time()
-    
-    # Original simple approach: direct DataFrame lookup
-    if frame_idx >= len(all_frames):
-        frame_idx = len(all_frames) - 1
+# Playback (PLAYBACK_MODE). "client", the default, animates in the browser: the
+# frame matrix ships once with the layout (frame-matrix store), and the Interval
+# tick, the frame patches and the clock are clientside callbacks, so a playing
+# viewer sends the server no requests at all. "server" runs every frame through
+# server callbacks, with the frame patches served from the prebuilt bundle or
+# built behind an LRU.
+if PLAYBACK_MODE == "client":
+    app.clientside_callback(
+        """
+        function(n_intervals, sliderVal, matrix) {
+            // Advance by 1 frame (no frame skipping), looping back to the start
+            var next = (sliderVal || 0) + 1;
+            return next >= matrix.t.length ? 0 : next;
+        }
+        """,
+        Output("frame-slider", "value"),
+        [Input("interval", "n_intervals")],
+        [State("frame-slider", "value"), State("frame-matrix", "data")],
+        prevent_initial_call=True
+    )
+
+    app.clientside_callback(
+        """
+        function(frameIdx, timezoneClicks, matrix) {
+            if (frameIdx === null || frameIdx === undefined || frameIdx >= matrix.t.length) {
+                return ["Loading...", "🔄 UTC"];
+            }
+            var hst = Boolean(timezoneClicks && timezoneClicks % 2 === 1);
+            var t = new Date(matrix.t[frameIdx].replace(" ", "T") + "Z");
+            if (hst) { t = new Date(t.getTime() - 10 * 3600 * 1000); }  // HST is UTC-10
+            var text = t.toISOString().slice(0, 16).replace("T", " ") + (hst ? " HST" : " UTC");
+            return [text, hst ? "Show UTC" : "Show HST"];
+        }
+        """,
+        [Output("timeline-clock", "children"), Output("timezone-toggle", "children")],
+        [Input("frame-slider", "value"), Input("timezone-toggle", "n_clicks")],
+        [State("frame-matrix", "data")]
+    )
+
+    # Same patches as frame_responses.frame_patches, computed from the matrix
+    app.clientside_callback(
+        """
+        function(frameIdx, matrix) {
+            var i = Math.min(frameIdx, matrix.t.length - 1);
+            var y = matrix.y[i];
+            var t = matrix.t[i];
+            function patch(operations) {
+                return {__dash_patch_update: "__dash_patch_update", operations: operations};
+            }
+            var markers = [];
+            for (var s = 0; s < y.length; s++) {
+                var magnitude = Math.abs(y[s]);
+                var at = matrix.marker_offset + s;
+                markers.push({operation: "Merge", location: [at, "props"], params: {value: {
+                    radius: 4 + 8 * Math.sqrt(Math.min(1, magnitude / 0.3)),
+                    fillOpacity: 0.3 + 0.7 * Math.min(1, magnitude / 0.2)
+                }}});
+                markers.push({operation: "Assign", location: [at, "props", "children", 0, "props", "children"],
+                              params: {value: matrix.names[s] + ": " + (y[s] >= 0 ? "+" : "") + y[s].toFixed(3) + "m wave Δ"}});
+            }
+            return [
+                patch(markers),
+                patch([{operation: "Assign", location: ["data", 0, "y"], params: {value: y}}]),
+                patch([{operation: "Assign", location: ["layout", "shapes", matrix.cursor, "x0"], params: {value: t}},
+                       {operation: "Assign", location: ["layout", "shapes", matrix.cursor, "x1"], params: {value: t}}])
+            ];
+        }
+        """,
+        [Output("bathymetry-map", "children"), Output("wave-graph", "figure"), Output("timeseries-graph", "figure")],
+        [Input("frame-slider", "value")],
+        [State("frame-matrix", "data")],
+        prevent_initial_call=True  # the layout already shows frame 0
+    )
+    print(f"🎬 Clientside playback: {len(all_frames)} frames in the frame-matrix store")
+else:
+    @app.callback(
+        Output("frame-slider", "value"),
+        [Input("interval", "n_intervals")],
+        [State("frame-slider", "value")],
+        prevent_initial_call=True
+    )
+    @metrics.timed("advance_frame")
+    def advance_frame(n_intervals, slider_val):
+        if slider_val is None:
+            slider_val = 0
     
-    # ⚡ OPTIMIZATION #2: Get pre-calculated frame data
-    try:
-        frame_data = frame_data_cache[frame_idx]
-        frame_x = frame_data['x_values'] 
-        frame_y = frame_data['wave_values']
-        t = frame_data['timestamp']
-        print(f"✅ Frame {frame_idx}: {len(frame_x)} data points, timestamp: {t}")
-    except KeyError as e:
-        print(f"❌ Frame {frame_idx} not found in cache! Error: {e}")
-        return dash.no_update, dash.no_update, dash.no_update
-    
-    # Create updated station markers
-    station_markers = []
-    for i, (lat, lon, name) in enumerate(zip(station_lats, station_lons, station_order)):
-        # 🎯 IMPROVED: More sensitive circle sizing and visual feedback
-        wave_delta = frame_y[i]  # Keep sign for positive/negative indication
-        wave_magnitude = abs(wave_delta)
-        
-        # Base size for neutral/small waves, then scale based on magnitude
-        base_size = 4  # Much smaller base
-        max_additional_size = 8  # Smaller range: 4px to 12px
-        size_factor = min(1.0, wave_magnitude / 0.3)  # More sensitive threshold
-        size = base_size + (max_additional_size * np.sqrt(size_factor))
-        
-        # Enhanced opacity - more dramatic changes for visual impact
-        opacity_factor = min(1.0, wave_magnitude / 0.2)  # Even more sensitive threshold
-        opacity = 0.3 + (0.7 * opacity_factor)  # 0.3 to 1.0 range
-        
-        # Color intensity based on wave magnitude for additional visual cue
-        base_color = station_colors[i]
-        
-        # Keep clean white border like original
-        border_color = 'white'
-        border_weight = 2
-        
-        station_markers.append(
-            dl.CircleMarker(
-                center=[lat, lon],
-                radius=size,
-                color=border_color,
-                weight=border_weight,
-                fillColor=base_color,
-                fillOpacity=opacity,
-                children=[
-                    dl.Tooltip(f"{name}: {wave_delta:+.3f}m wave Δ")
-                ]
-            )
-        )
+        # Advance by 1 frame (original behavior - no frame skipping)
+        next_val = slider_val + 1
+        if next_val >= len(all_frames):
+            next_val = 0  # loop back to start
     
-    # Create epicenter marker (static) - use CircleMarker for consistency
-    epicenter_marker = dl.CircleMarker(
-        center=[epicenter_lat, epicenter_lon],
-        radius=20,
-        color='darkred',
-        weight=4,
-        fillColor='red',
-        fillOpacity=0.9,
-        children=[dl.Tooltip("🌋 EARTHQUAKE EPICENTER\n29 July 2025, 23:24 UTC")]
+        return next_val
+
+    @app.callback(
+        [Output("timeline-clock", "children"), Output("timezone-toggle", "children")],
+        [Input("frame-slider", "value"), Input("timezone-toggle", "n_clicks")]
     )
+    @metrics.timed("update_timeline_clock")
+    def update_timeline_clock(frame_index, timezone_clicks):
+        """Update the clock display with current timeline time and timezone toggle"""
+        if frame_index is None or frame_index >= len(all_frames):
+            return "Loading...", "🔄 UTC"
     
-    # Updated map children with bathymetry tiles
-    map_children = [
-        # MapTiler Ocean bathymetry tile layer
-        dl.TileLayer(
-            url=f"https://api.maptiler.com/maps/ocean/256/{{z}}/{{x}}/{{y}}.png?key={os.environ.get('MAPTILER_API_KEY', '')}",
-            attribution='<a href="https://www.maptiler.com/copyright/" target="_blank">&copy; MapTiler</a> <a href="https://www.openstreetmap.org/copyright" target="_blank">&copy; OpenStreetMap contributors</a>',
-            maxZoom=18
-        ),
-        # Epicenter marker
-        epicenter_marker,
-        # Updated station markers with Plotly colors
-        *station_markers
-    ]
-    # --- Update oscilloscope --- ⚡ Ultra-fast: direct data update
-    fig_c = {'data': [{'x': frame_x, 'y': frame_y, 'type': 'scatter', 'mode': 'lines+markers', 
-                       'line': {'color': 'firebrick', 'width': 3}, 'marker': {'size': 10, 'color': 'firebrick'}}],
-             'layout': fig.layout}
-    
-    # --- Update time series with vertical line --- ⚡ Ultra-fast: direct shapes update
-    fig_ts = station_timeseries_fig.to_dict()
-    fig_ts['layout']['shapes'] = frame_data['timeseries_shapes']
-    
-    callback_time = time.time() - callback_start_time
-    print(f"⏱️ Callback execution: {callback_time:.3f}s (frame {frame_idx})")
-    print(f"🔄 Updating: Map ({len(map_children)} children), Wave graph ({len(fig_c['data'])} traces), Timeseries ({len(fig_ts['layout']['shapes'])} shapes)")
-    
-    return map_children, fig_c, fig_ts
+        # Determine timezone mode based on toggle clicks
+        timezone_mode = 'HST' if timezone_clicks and timezone_clicks % 2 == 1 else 'UTC'
+    
+        current_time = all_frames[frame_index]
+        formatted_time = format_time_display(current_time, timezone_mode)
+    
+        # Update toggle button text
+        toggle_text = "Show UTC" if timezone_mode == 'HST' else "Show HST"
+    
+        return formatted_time, toggle_text
+
+    # Frame updates are Patches (frame_responses.py): only the station markers' radius,
+    # opacity and tooltip, the oscilloscope y-values and the cursor position go over
+    # the wire. The map children and both figures are sent once, with the layout.
+    #
+    # With a prebuilt response bundle (python archive/scripts/frame_responses.py)
+    # the patches are served as stored gzip bytes from /frames/<i>, with a per-frame ETag, and
+    # a clientside callback applies them: a frame costs the server a slice and a header.
+    # Without one, a server callback builds them and keeps them per frame in an LRU
+    # (the default size holds the whole event).
+    FRAME_RESPONSE_DIR = os.environ.get("FRAME_RESPONSE_DIR", RESPONSE_DIR)
+    FRAME_RESPONSE_CACHE = int(os.environ.get("FRAME_RESPONSE_CACHE", 2048))
+
+    response_bundle = load_bundle(FRAME_RESPONSE_DIR)
+    if response_bundle is not None and not response_bundle.matches(station_order, all_frames[0], all_frames[-1]):
+        print(f"⚠️ {FRAME_RESPONSE_DIR} was built for other data; rebuild it with frame_responses.py. Using server callbacks.")
+        response_bundle = None
+
+    if response_bundle is not None:
+        @app.server.route(f"{app.config.routes_pathname_prefix}frames/<int:frame_idx>")
+        @metrics.timed("serve_frame")
+        def serve_frame(frame_idx):
+            if not 0 <= frame_idx < len(response_bundle):
+                abort(404)
+            gzipped = "gzip" in request.headers.get("Accept-Encoding", "")
+            etag = response_bundle.etag(frame_idx, gzipped)
+            headers = {"ETag": f'"{etag}"', "Cache-Control": "public, max-age=3600",
+                       "Vary": "Accept-Encoding"}
+            if request.if_none_match.contains(etag):
+                metrics.count("frames.not_modified")
+                return Response(status=304, headers=headers)
+            metrics.count("frames.served")
+            body = response_bundle.frame(frame_idx)
+            if gzipped:
+                headers["Content-Encoding"] = "gzip"
+            else:
+                body = gzip.decompress(body)
+            return Response(body, mimetype="application/json", headers=headers)
+
+        app.clientside_callback(
+            """
+            function(frameIdx) {
+                var dc = window.dash_clientside;
+                dc.waveFrame = frameIdx;
+                return fetch('%s' + frameIdx)
+                    .then(function (res) {
+                        if (!res.ok) { throw dc.PreventUpdate; }
+                        return res.json();
+                    })
+                    .then(function (patches) {
+                        // A newer frame was requested while this one was in flight
+                        if (dc.waveFrame !== frameIdx) { throw dc.PreventUpdate; }
+                        return patches;
+                    });
+            }
+            """ % app.get_relative_path("/frames/"),
+            [Output("bathymetry-map", "children"), Output("wave-graph", "figure"), Output("timeseries-graph", "figure")],
+            [Input("frame-slider", "value")],
+            prevent_initial_call=True  # the layout already shows frame 0
+        )
+        print(f"📦 Frame responses: {len(response_bundle)} prebuilt frames served from {app.get_relative_path('/frames/')}<i>")
+    else:
+        @lru_cache(maxsize=FRAME_RESPONSE_CACHE)
+        def frame_response(frame_idx):
+            frame_data = frame_data_cache[frame_idx]
+            return frame_patches(frame_data['wave_values'], frame_data['timestamp'], station_order)
+
+        metrics.gauge("frame_response_cache", lambda: frame_response.cache_info()._asdict())
+
+        @app.callback(
+            [Output("bathymetry-map", "children"), Output("wave-graph", "figure"), Output("timeseries-graph", "figure")],
+            [Input("frame-slider", "value")],
+            prevent_initial_call=True  # the layout already shows frame 0
+        )
+        @metrics.timed("update_all_figures")
+        def update_all_figures(frame_idx):
+            # Original simple approach: direct DataFrame lookup
+            if frame_idx >= len(all_frames):
+                frame_idx = len(all_frames) - 1
+        
+            # ⚡ OPTIMIZATION #2: Get pre-calculated frame data
+            try:
+                response = frame_response(frame_idx)
+            except KeyError as e:
+                print(f"❌ Frame {frame_idx} not found in cache! Error: {e}")
+                metrics.count("frames.missing")
+                return dash.no_update, dash.no_update, dash.no_update
+        
+            return response
 
 # Add clientside callback for keyboard controls (simplified - no slider conflicts)
 app.clientside_callback(
@@ -890,12 +1077,24 @@ app.clientside_callback(
 
 
 
-# Expose the Flask server for Gunicorn
+phase_start = startup_phase("callbacks", phase_start)
+
+# Calculate and display total startup time, with the phases that make it up
+total_startup_time = time.time() - startup_start_time
+print(f"🚀 TOTAL STARTUP TIME: {total_startup_time:.3f}s ("
+      + ", ".join(f"{name} {seconds:.3f}s" for name, seconds in startup_phases) + ")")
+
+# Expose the Flask server for Gunicorn. Run it with --preload (see archive/README.md)
+# so the master imports the app once and the workers fork from it.
 server = app.server
 
 if __name__ == '__main__':
     import os
     
+    if PREBUILD:
+        print(f"📦 Startup figures written to {STARTUP_CACHE}")
+        sys.exit(0)
+    
     # Get port from environment variable (for cloud deployment)
     port = int(os.environ.get('PORT', 8050))
     
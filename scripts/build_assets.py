@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Fingerprint and precompress the static site's assets (run from the repo root).
+
+Each asset is copied to static/hashed/<name>.<content-hash>.<ext>, next to
+maximally compressed .gz and .br variants. Because a name changes whenever the
+bytes do, the hashed files can be cached as immutable.
+
+static/asset-manifest.json maps each plain name to its hashed path. The build
+also points the <link>/<script> tags in static/index.html at the hashed CSS/JS.
+It then inlines the manifest as window.ASSET_MANIFEST, so app.js can resolve
+the data files without an extra request. Local previews without a build keep
+the plain names.
+
+Brotli output needs the `brotli` package (pip install brotli); without it only
+.gz variants are written.
+"""
+
+import argparse
+import glob
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+SITE_DIR = "static"
+HASHED_DIR = "hashed"
+MANIFEST_FILE = "asset-manifest.json"
+HASH_LENGTH = 10
+
+# (source path, name the page asks for)
+ASSETS = [
+    ("static/app.js", "app.js"),
+    ("static/frame_worker.js", "frame_worker.js"),
+    ("static/style.css", "style.css"),
+    ("assets/frame_data_compact.json", "frame_data_compact.json"),
+    ("assets/frame_data_compact.bin", "frame_data_compact.bin"),
+    ("assets/frame_data_client.json", "frame_data_client.json"),
+]
+# Chunked export (index.json + one buffer per hour) and downsampling levels,
+# requested by path relative to assets/
+DATA_GLOBS = ["assets/frame_chunks/*", "assets/frame_levels/*"]
+
+
+def asset_sources():
+    files = sorted(path for pattern in DATA_GLOBS for path in glob.glob(pattern))
+    return ASSETS + [(path, os.path.relpath(path, "assets").replace(os.sep, "/")) for path in files]
+
+
+def hashed_name(name, body):
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{hashlib.sha256(body).hexdigest()[:HASH_LENGTH]}{ext}"
+
+
+def write_variants(path, body):
+    """Write body plus its .gz/.br variants; return their sizes."""
+    with open(path, "wb") as f:
+        f.write(body)
+    sizes = {"raw": len(body)}
+    # mtime=0 keeps the .gz byte-identical across builds of the same input
+    gz = gzip.compress(body, compresslevel=9, mtime=0)
+    with open(path + ".gz", "wb") as f:
+        f.write(gz)
+    sizes["gz"] = len(gz)
+    if brotli is not None:
+        br = brotli.compress(body, quality=11)
+        with open(path + ".br", "wb") as f:
+            f.write(br)
+        sizes["br"] = len(br)
+    return sizes
+
+
+def rewrite_index(index_path, manifest):
+    """Point index.html at the hashed CSS/JS and inline the manifest (idempotent)."""
+    with open(index_path) as f:
+        html = f.read()
+    html = re.sub(r'href="(?:hashed/)?style(?:\.[0-9a-f]+)?\.css"', f'href="{manifest["style.css"]}"', html)
+    html = re.sub(r'<script id="asset-manifest">.*?</script>\n?', "", html)
+    inline = f'<script id="asset-manifest">window.ASSET_MANIFEST = {json.dumps(manifest)};</script>\n'
+    html, count = re.subn(r'<script src="(?:hashed/)?app(?:\.[0-9a-f]+)?\.js"></script>',
+                          lambda m: f'{inline}<script src="{manifest["app.js"]}"></script>', html)
+    if count != 1:
+        raise ValueError(f"expected one app.js <script> tag in {index_path}, found {count}")
+    with open(index_path, "w") as f:
+        f.write(html)
+
+
+def build_assets(site_dir=SITE_DIR):
+    out_dir = os.path.join(site_dir, HASHED_DIR)
+    shutil.rmtree(out_dir, ignore_errors=True)
+    os.makedirs(out_dir)
+    if brotli is None:
+        print("WARNING: brotli not installed — writing .gz variants only.")
+
+    manifest = {}
+    for source, name in asset_sources():
+        with open(source, "rb") as f:
+            body = f.read()
+        target = hashed_name(name, body)
+        os.makedirs(os.path.dirname(os.path.join(out_dir, target)), exist_ok=True)
+        sizes = write_variants(os.path.join(out_dir, target), body)
+        manifest[name] = f"{HASHED_DIR}/{target}"
+        variants = ", ".join(f"{kind} {size / 1024:,.1f} KB" for kind, size in sizes.items())
+        print(f"  {name} -> {manifest[name]} ({variants})")
+
+    with open(os.path.join(site_dir, MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f, indent=2)
+    rewrite_index(os.path.join(site_dir, "index.html"), manifest)
+    print(f"Wrote {len(manifest)} hashed assets and {MANIFEST_FILE}; index.html points at them.")
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--site-dir", default=SITE_DIR, help="publish directory holding index.html")
+    args = parser.parse_args()
+    build_assets(args.site_dir)
@@ -1,15 +1,18 @@
 #!/usr/bin/env bash
 # Netlify build for the static site.
-# 1. Copy the frame data into the publish dir (kept single-sourced in assets/).
+# 1. Fingerprint + precompress the frame data (kept single-sourced in assets/)
+#    and app.js/style.css into static/hashed/, write static/asset-manifest.json
+#    and point index.html at the hashed names (scripts/build_assets.py).
 # 2. Generate config.js from the MAPTILER_API_KEY env var so the key is never
 #    committed to the repo. Set it in Netlify -> Site settings -> Environment variables.
 set -euo pipefail
 
-cp assets/frame_data_client.json static/frame_data_client.json
+pip install --quiet brotli || echo "WARNING: brotli unavailable — .gz variants only." >&2
+python3 scripts/build_assets.py
 
 if [ -z "${MAPTILER_API_KEY:-}" ]; then
   echo "WARNING: MAPTILER_API_KEY is not set — basemap tiles will fail." >&2
 fi
 printf 'window.MAPTILER_API_KEY = "%s";\n' "${MAPTILER_API_KEY:-}" > static/config.js
 
-echo "Build complete: frame data copied, config.js generated."
+echo "Build complete: hashed assets written, config.js generated."
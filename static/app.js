@@ -1,26 +1,27 @@
 /*
  * Wave Watch — static port of the Dash clientside app.
- * Reads the same assets/frame_data_client.json and drives a Leaflet map plus
- * two Plotly figures entirely in the browser. No server / no callbacks.
+ * Reads the chunked frame export (frame_chunks/index.json + hourly binary
+ * chunks, animating as soon as the first chunk lands), falling back to the
+ * compact export and then frame_data_client.json, and drives a Leaflet map
+ * plus two Plotly figures entirely in the browser. No server / no callbacks.
  */
 (function () {
     "use strict";
 
     // ---- Constants (ported from wave_propagation_clientside_app.py) ----------
-    const STATION_ORDER = ["Midway", "Wake Island", "Nawiliwili", "Honolulu", "Kahului", "Kawaihae", "Hilo"];
-    const DISTANCES = [3262.37, 3728.95, 4815.29, 4963.23, 5084.13, 5200.53, 5275.16];
-    const STATION_COLORS = ["#636EFA", "#EF553B", "#00CC96", "#C490FD", "#FFA15A", "#1BD3F3", "#FF6692"];
-
-    // Coordinates pre-transformed to the Western Pacific view (lon shifted past -180)
-    const STATION_LATS = [28.211666, 19.290556, 21.9544, 21.303333, 20.894945, 20.0366, 19.730278];
-    const STATION_LONS = [-177.36, -193.3825, -159.3561, -157.86453, -156.469, -155.8294, -155.05556];
-    const EPICENTER = [52.473, -199.604];
     const BOUNDS = [[2.635789, -209.882813], [55.578345, -116.367188]];
-
     const Y_RANGE = [-2, 3];
-    const X_MIN = Math.min.apply(null, DISTANCES);
-    const X_MAX = Math.max.apply(null, DISTANCES);
-    const TOTAL_FRAMES = 1476;
+    const LABEL_GAP_KM = 200;      // closer station labels on the wave graph alternate rows
+
+    // ---- Stations ------------------------------------------------------------
+    // Filled from the export header's station_info (written from the station
+    // registry, data/station_metadata.json): displayed stations nearest first,
+    // coordinates already shifted to the Western Pacific view (lon past -180).
+    let stationNames = [];
+    let distances = [];            // km from the epicenter
+    let stationColors = [];
+    let xMin = 0;
+    let xMax = 0;
 
     const mapKey = window.MAPTILER_API_KEY || "";
     const tileUrl = "https://api.maptiler.com/maps/ocean/256/{z}/{x}/{y}.png?key=" + mapKey;
@@ -29,12 +30,18 @@
         '<a href="https://www.openstreetmap.org/copyright" target="_blank">&copy; OpenStreetMap contributors</a>';
 
     // ---- Runtime state -------------------------------------------------------
-    let frameData = null;          // parsed frames object
+    let frames = null;             // { count, nStations, timestamps: Float64Array (ms), values: Float32Array,
+                                   //   isLoaded(i), ensure(i) -> Promise, prefetch() }
+    let totalFrames = 0;
     let currentFrame = 0;
     let timezoneMode = "UTC";      // "UTC" | "HST"
-    let playTimer = null;          // setInterval handle
+    let playback = null;           // { startTime, startFrame, lastTick } while playing
+    let rafId = null;              // the one pending requestAnimationFrame
+    let requestedFrame = null;     // seek waiting for the next display frame
     let stationMarkers = [];       // Leaflet CircleMarkers, updated in place
     let tsTracesBuilt = false;     // timeseries traces are static — build once
+    let pendingFrame = null;       // frame waiting on its chunk (seek / playback stall)
+    let tsRefreshTimer = null;     // coalesces time-series redraws as chunks arrive
 
     // ---- DOM refs ------------------------------------------------------------
     const els = {
@@ -44,8 +51,198 @@
         tz: document.getElementById("timezone-toggle"),
         slider: document.getElementById("frame-slider"),
         marks: document.getElementById("slider-marks"),
+        tsGraph: document.getElementById("timeseries-graph"),
+        tsCursor: document.getElementById("ts-cursor"),
     };
 
+    // ===========================================================================
+    //  Frame data loading
+    // ===========================================================================
+    // Every payload becomes the same model: frame-major Float32Arrays of deltas,
+    // mm-rounded deltas, marker radius and opacity (count x nStations), the
+    // station-major `columns` the time-series traces plot (nStations x count),
+    // plus a Float64Array of UTC timestamps in ms. frame_worker.js fetches,
+    // decodes and derives them off the UI thread. Single-file payloads are
+    // complete on arrival; the chunked one fills in.
+    const PREFETCH_CONCURRENCY = 2;
+    const DERIVED = ["values", "rounded", "radius", "opacity"];
+
+    // Hashed build names (scripts/build_assets.py inlines the manifest into
+    // index.html); unbuilt local previews fall back to the plain names.
+    function assetUrl(name) {
+        return (window.ASSET_MANIFEST && window.ASSET_MANIFEST[name]) || name;
+    }
+
+    // The worker resolves relative URLs against its own (hashed) location.
+    function absoluteUrl(name) {
+        return new URL(assetUrl(name), document.baseURI).href;
+    }
+
+    function fetchOk(url) {
+        return fetch(url).then(function (res) {
+            if (!res.ok) throw new Error(url + ": HTTP " + res.status);
+            return res;
+        });
+    }
+
+    // decode(msg) -> Promise of the worker's result. Falls back to running the
+    // same kernels on this thread where workers can't start (e.g. file://).
+    const decode = (function () {
+        let worker = null;
+        try {
+            worker = new Worker(assetUrl("frame_worker.js"));
+        } catch (err) {
+            console.warn("Frame worker unavailable (" + err.message + "), decoding on the main thread");
+        }
+        if (!worker) {
+            let kernels = null;
+            return function (msg) {
+                kernels = kernels || new Promise(function (resolve, reject) {
+                    const script = document.createElement("script");
+                    script.src = assetUrl("frame_worker.js");
+                    script.onload = function () { resolve(window.WaveFrameKernels); };
+                    script.onerror = function () { reject(new Error("frame_worker.js failed to load")); };
+                    document.head.appendChild(script);
+                });
+                return kernels.then(function (k) { return k.load(msg); });
+            };
+        }
+        let nextId = 0;
+        const waiting = {};
+        worker.onmessage = function (e) {
+            const job = waiting[e.data.id];
+            delete waiting[e.data.id];
+            if (e.data.error) job.reject(new Error(e.data.error));
+            else job.resolve(e.data.result);
+        };
+        return function (msg) {
+            return new Promise(function (resolve, reject) {
+                msg.id = nextId++;
+                waiting[msg.id] = { resolve: resolve, reject: reject };
+                worker.postMessage(msg);
+            });
+        };
+    })();
+
+    // `header` is whichever export header the frames came from; it names the stations.
+    function completeModel(timestamps, decoded, header) {
+        return {
+            stations: header.station_info,
+            epicenter: header.epicenter,
+            count: decoded.frames,
+            nStations: decoded.nStations,
+            timestamps: timestamps,
+            values: decoded.values,
+            rounded: decoded.rounded,
+            radius: decoded.radius,
+            opacity: decoded.opacity,
+            columns: decoded.columns,
+            isLoaded: function () { return true; },
+            ensure: function () { return Promise.resolve(); },
+            prefetch: function () {},
+        };
+    }
+
+    function uniformTimestamps(header) {
+        const timestamps = new Float64Array(header.total_frames);
+        for (let i = 0; i < header.total_frames; i++) timestamps[i] = header.start_ms + i * header.step_ms;
+        return timestamps;
+    }
+
+    // The index describes the whole event, so timestamps and NaN-filled
+    // buffers exist before any chunk lands; unloaded frames draw as gaps.
+    function chunkedModel(index) {
+        const nStations = index.stations.length;
+        const count = index.total_frames;
+        const ready = new Uint8Array(index.chunks.length);
+        const pending = new Array(index.chunks.length);
+
+        const model = {
+            stations: index.station_info,
+            epicenter: index.epicenter,
+            count: count,
+            nStations: nStations,
+            timestamps: uniformTimestamps(index),
+            columns: new Float32Array(count * nStations).fill(NaN),
+            onChunk: null,
+            chunkOf: function (frame) { return Math.floor(frame / index.chunk_frames); },
+            isLoaded: function (frame) { return ready[model.chunkOf(frame)] === 1; },
+            ensure: function (frame) { return loadChunk(model.chunkOf(frame)); },
+        };
+        DERIVED.forEach(function (key) { model[key] = new Float32Array(count * nStations).fill(NaN); });
+
+        function loadChunk(c) {
+            if (!pending[c]) {
+                const chunk = index.chunks[c];
+                pending[c] = decode({
+                    kind: "binary", url: absoluteUrl(chunk.file),
+                    encoding: index.encoding, scale: index.scale, nStations: nStations,
+                }).then(function (decoded) {
+                    DERIVED.forEach(function (key) { model[key].set(decoded[key], chunk.start * nStations); });
+                    for (let s = 0; s < nStations; s++) {
+                        const column = decoded.columns.subarray(s * decoded.frames, (s + 1) * decoded.frames);
+                        model.columns.set(column, s * count + chunk.start);
+                    }
+                    ready[c] = 1;
+                    if (model.onChunk) model.onChunk(chunk);
+                });
+                pending[c].catch(function () { pending[c] = null; }); // let a later seek retry
+            }
+            return pending[c];
+        }
+
+        // Background fill in time order; chunks already requested by a seek are skipped.
+        model.prefetch = function () {
+            let next = 0;
+            function worker() {
+                while (next < index.chunks.length && pending[next]) next++;
+                if (next >= index.chunks.length) return;
+                loadChunk(next++)
+                    .catch(function (err) { console.warn("Chunk prefetch failed:", err.message); })
+                    .then(worker);
+            }
+            for (let k = 0; k < PREFETCH_CONCURRENCY; k++) worker();
+        };
+        return model;
+    }
+
+    function loadChunkedFrames() {
+        return fetchOk(assetUrl("frame_chunks/index.json"))
+            .then(function (res) { return res.json(); })
+            .then(function (index) {
+                const model = chunkedModel(index);
+                return model.ensure(0).then(function () { return model; });
+            });
+    }
+
+    function loadCompactFrames() {
+        return fetchOk(assetUrl("frame_data_compact.json"))
+            .then(function (res) { return res.json(); })
+            .then(function (header) {
+                return decode({
+                    kind: "binary", url: absoluteUrl(header.data),
+                    encoding: header.encoding, scale: header.scale, nStations: header.stations.length,
+                }).then(function (decoded) { return completeModel(uniformTimestamps(header), decoded, header); });
+            });
+    }
+
+    function loadJsonFrames() {
+        return decode({ kind: "json", url: absoluteUrl("frame_data_client.json") })
+            .then(function (decoded) { return completeModel(decoded.timestamps, decoded, decoded.metadata); });
+    }
+
+    function loadFrames() {
+        return loadChunkedFrames()
+            .catch(function (err) {
+                console.warn("Chunked frame data unavailable (" + err.message + "), loading compact file");
+                return loadCompactFrames();
+            })
+            .catch(function (err) {
+                console.warn("Compact frame data unavailable (" + err.message + "), loading JSON");
+                return loadJsonFrames();
+            });
+    }
+
     // ===========================================================================
     //  Map
     // ===========================================================================
@@ -54,38 +251,52 @@
 
     L.tileLayer(tileUrl, { attribution: tileAttribution, maxZoom: 18 }).addTo(map);
 
-    // Earthquake epicenter
-    L.circleMarker(EPICENTER, {
-        radius: 15, color: "darkred", weight: 4, fillColor: "red", fillOpacity: 0.9,
-    }).bindTooltip("🌋 EARTHQUAKE EPICENTER\n29 July 2025, 23:24 UTC\nEpicenter: 0 km").addTo(map);
 
-    // Station markers (created once, restyled per frame)
-    for (let i = 0; i < STATION_ORDER.length; i++) {
-        const m = L.circleMarker([STATION_LATS[i], STATION_LONS[i]], {
-            radius: 8, color: "white", weight: 2, fillColor: STATION_COLORS[i], fillOpacity: 0.7,
-        }).bindTooltip(STATION_ORDER[i] + ": " + Math.round(DISTANCES[i]) + " km from epicenter, Loading...");
-        m.addTo(map);
-        stationMarkers.push(m);
+    // Tooltip text is built only when a tooltip is showing, not per marker per frame.
+    function tooltipText(i) {
+        const prefix = stationNames[i] + ": " + Math.round(distances[i]) + " km from epicenter, ";
+        if (!frames || !frames.isLoaded(currentFrame)) return prefix + "Loading...";
+        const waveDelta = frames.rounded[currentFrame * frames.nStations + i];
+        return prefix + (waveDelta >= 0 ? "+" : "") + waveDelta.toFixed(3) + " m wave Δ";
     }
 
-    function updateMap(waveValues) {
-        for (let i = 0; i < waveValues.length; i++) {
-            const waveDelta = Math.round(waveValues[i] * 1000) / 1000;
-            const mag = Math.abs(waveDelta);
-
-            const sizeFactor = Math.min(1.0, mag / 0.3);
-            const radius = 4 + 8 * Math.sqrt(sizeFactor);
-
-            const opacityFactor = Math.min(1.0, mag / 0.2);
-            const opacity = 0.3 + 0.7 * opacityFactor;
+    // Station markers (created once the header names the stations, restyled per frame)
+    const markerStyle = [];        // last applied [radius, opacity] per marker
+    function setStations(info, epicenter) {
+        stationNames = info.map(function (s) { return s.name; });
+        distances = info.map(function (s) { return s.distance_km; });
+        stationColors = info.map(function (s) { return s.color; });
+        xMin = Math.min.apply(null, distances);
+        xMax = Math.max.apply(null, distances);
+
+        // Earthquake epicenter
+        L.circleMarker([epicenter.lat, epicenter.lon], {
+            radius: 15, color: "darkred", weight: 4, fillColor: "red", fillOpacity: 0.9,
+        }).bindTooltip("🌋 EARTHQUAKE EPICENTER\n29 July 2025, 23:24 UTC\nEpicenter: 0 km").addTo(map);
+
+        info.forEach(function (s, i) {
+            const m = L.circleMarker([s.lat, s.lon], {
+                radius: 8, color: "white", weight: 2, fillColor: s.color, fillOpacity: 0.7,
+            }).bindTooltip(function () { return tooltipText(i); });
+            m.addTo(map);
+            stationMarkers.push(m);
+            markerStyle.push([8, 0.7]);
+        });
+    }
 
+    // Radius/opacity come precomputed from the worker; unchanged markers are skipped.
+    function updateMap(index) {
+        const base = index * frames.nStations;
+        for (let i = 0; i < stationMarkers.length; i++) {
+            const radius = frames.radius[base + i];
+            const opacity = frames.opacity[base + i];
             const m = stationMarkers[i];
-            m.setRadius(radius);
-            m.setStyle({ fillOpacity: opacity });
-            m.setTooltipContent(
-                STATION_ORDER[i] + ": " + Math.round(DISTANCES[i]) + " km from epicenter, " +
-                (waveDelta >= 0 ? "+" : "") + waveDelta.toFixed(3) + " m wave Δ"
-            );
+            if (radius !== markerStyle[i][0] || opacity !== markerStyle[i][1]) {
+                m.setStyle({ radius: radius, fillOpacity: opacity });
+                markerStyle[i][0] = radius;
+                markerStyle[i][1] = opacity;
+            }
+            if (m.isTooltipOpen()) m.getTooltip().update();
         }
     }
 
@@ -94,20 +305,24 @@
     // ===========================================================================
     function waveLayout() {
         const shapes = [{
-            type: "line", x0: X_MIN, x1: X_MAX, y0: 0, y1: 0,
+            type: "line", x0: xMin, x1: xMax, y0: 0, y1: 0,
             line: { color: "gray", width: 1, dash: "dot" }, layer: "below",
         }];
-        DISTANCES.forEach(function (d) {
+        distances.forEach(function (d) {
             shapes.push({
                 type: "line", x0: d, x1: d, y0: Y_RANGE[0], y1: Y_RANGE[1],
                 line: { color: "gray", width: 1, dash: "dash" }, layer: "below",
             });
         });
 
-        const annotations = STATION_ORDER.map(function (station, i) {
-            const level = ["Honolulu", "Kawaihae"].includes(station) ? 1 : 0;
+        // Alternate label rows where stations crowd together (< LABEL_GAP_KM apart)
+        const levelsUsed = [];
+        const annotations = stationNames.map(function (station, i) {
+            const crowded = i > 0 && distances[i] - distances[i - 1] < LABEL_GAP_KM && levelsUsed[i - 1] === 0;
+            const level = crowded ? 1 : 0;
+            levelsUsed.push(level);
             return {
-                x: DISTANCES[i], y: 1.05 + 0.06 * level, yref: "paper",
+                x: distances[i], y: 1.05 + 0.06 * level, yref: "paper",
                 text: station, showarrow: true, arrowhead: 2, arrowsize: 0.8,
                 arrowwidth: 1, arrowcolor: "darkgray", ax: 0, ay: -15 - 5 * level,
                 yanchor: "bottom", textangle: 0,
@@ -119,7 +334,7 @@
 
         return {
             title: { text: "Wave Amplitude vs Distance from Epicenter", font: { size: 16, color: "#2c3e50" } },
-            xaxis: { title: { text: "Distance from Epicenter (km)" }, range: [X_MIN, X_MAX], fixedrange: true },
+            xaxis: { title: { text: "Distance from Epicenter (km)" }, range: [xMin, xMax], fixedrange: true },
             yaxis: { title: { text: "Δ Wave Height (m)" }, range: Y_RANGE, fixedrange: true, zeroline: false, autorange: false },
             height: 400, plot_bgcolor: "white", paper_bgcolor: "white",
             margin: { t: 120, b: 40, l: 60, r: 20 }, showlegend: false,
@@ -129,18 +344,19 @@
 
     function initWaveGraph() {
         const trace = {
-            x: DISTANCES, y: DISTANCES.map(function () { return 0; }),
+            x: distances, y: distances.map(function () { return 0; }),
             type: "scatter", mode: "lines+markers",
             line: { color: "firebrick", width: 3 }, marker: { size: 10, color: "firebrick" },
             showlegend: false,
             hovertemplate: "<b>%{text}</b><br>Distance: %{x:.0f} km<br>Wave Δ: %{y:+.3f} m<extra></extra>",
-            text: STATION_ORDER,
+            text: stationNames,
         };
         Plotly.newPlot("wave-graph", [trace], waveLayout(), { displayModeBar: false, responsive: true });
     }
 
-    function updateWaveGraph(waveValues) {
-        const rounded = waveValues.map(function (v) { return Math.round(v * 1000) / 1000; });
+    function updateWaveGraph(index) {
+        const start = index * frames.nStations;
+        const rounded = Array.from(frames.rounded.subarray(start, start + frames.nStations));
         Plotly.restyle("wave-graph", { y: [rounded] }, [0]);
     }
 
@@ -148,7 +364,7 @@
     //  Time series graph (7 stacked subplots, traces static)
     // ===========================================================================
     function timeseriesLayout() {
-        const n = STATION_ORDER.length;
+        const n = stationNames.length;
         const spacing = 0.02;
         const h = (1 - spacing * (n - 1)) / n;
 
@@ -173,15 +389,17 @@
                 title: i === Math.ceil(n / 2) - 1 ? "Δ Wave Height (m)" : "",
             };
             layout[xa] = {
-                domain: [0, 1], anchor: "y" + (i + 1),
+                type: "date", domain: [0, 1], anchor: "y" + (i + 1),
                 showgrid: true, gridcolor: "#f0f0f0",
                 showticklabels: i === n - 1,
                 title: i === n - 1 ? "Time (UTC)" : "",
             };
+            // One shared time range: zoom/pan in any subplot moves them all (and the cursor)
+            if (i > 0) layout[xa].matches = "x";
 
             // Subplot title
             layout.annotations.push({
-                text: STATION_ORDER[i], showarrow: false,
+                text: stationNames[i], showarrow: false,
                 x: 0.5, y: top, xref: "paper", yref: "paper",
                 xanchor: "center", yanchor: "bottom",
                 font: { size: 12, color: "#2c3e50" },
@@ -190,59 +408,217 @@
         return layout;
     }
 
+    // ---- Downsampling levels ----------------------------------------------
+    // frame_levels/ holds min/max levels (bucket = frames per min/max pair).
+    // Each redraw plots the coarsest level whose buckets fit in one pixel of
+    // the visible range, sliced to that range plus a view either side for
+    // panning, so trace size tracks the plot width, not the record length.
+    let levels = [];               // [{ bucket, points, file, indices, samples, loading }]
+    let levelIndex = null;
+    let tsViewKey = null;          // level/slice currently plotted
+
+    function loadLevels() {
+        return fetchOk(assetUrl("frame_levels/index.json"))
+            .then(function (res) { return res.json(); })
+            .then(function (index) {
+                levelIndex = index;
+                levels = index.levels.map(function (l) {
+                    return { bucket: l.bucket, points: l.points, file: l.file, indices: null, samples: null, loading: null };
+                });
+            })
+            .catch(function () { levels = []; }); // short records ship no levels
+    }
+
+    function ensureLevel(level) {
+        if (!level.loading) {
+            level.loading = decode({
+                kind: "level", url: absoluteUrl(level.file), points: level.points,
+                nStations: levelIndex.stations.length, encoding: levelIndex.encoding, scale: levelIndex.scale,
+            }).then(function (decoded) {
+                level.indices = decoded.indices;
+                level.samples = decoded.samples;
+            });
+            level.loading.catch(function () { level.loading = null; });
+        }
+        return level.loading;
+    }
+
+    function plotWidth() {
+        const full = els.tsGraph._fullLayout;
+        if (full && full._size) return full._size.w;
+        return Math.max(100, (els.tsGraph.clientWidth || 1000) - 100); // before the first draw: minus margins
+    }
+
+    function pickLevel(span, width) {
+        let level = null;
+        levels.forEach(function (l) { if (l.bucket <= span / width) level = l; });
+        return level;
+    }
+
+    // Long records: fetch the level the first draw will use rather than plot every sample once.
+    function preloadInitialLevel() {
+        const level = pickLevel(frames.count, plotWidth());
+        return level ? ensureLevel(level).catch(function () {}) : Promise.resolve();
+    }
+
+    // Visible frame range, padded for panning, and the level to draw it at
+    function timeseriesView() {
+        const full = els.tsGraph._fullLayout;
+        let lo = 0;
+        let hi = frames.count - 1;
+        if (full && full.xaxis && full.xaxis.autorange === false) {
+            const step = frames.count > 1 ? frames.timestamps[1] - frames.timestamps[0] : 60000;
+            lo = Math.max(0, Math.floor((axisMs(full.xaxis.range[0]) - frames.timestamps[0]) / step));
+            hi = Math.min(frames.count - 1, Math.ceil((axisMs(full.xaxis.range[1]) - frames.timestamps[0]) / step));
+        }
+        const span = Math.max(1, hi - lo + 1);
+        let level = pickLevel(span, plotWidth());
+        if (level && !level.indices) {
+            ensureLevel(level).then(function () { refreshTimeseries(false); });
+            level = null; // full resolution until it arrives
+        }
+        const zoomed = lo > 0 || hi < frames.count - 1;
+        return {
+            level: level,
+            lo: zoomed ? Math.max(0, lo - span) : 0,
+            hi: zoomed ? Math.min(frames.count - 1, hi + span) : frames.count - 1,
+        };
+    }
+
+    function firstAtLeast(sorted, start, end, value) {
+        while (start < end) {
+            const mid = (start + end) >>> 1;
+            if (sorted[mid] < value) start = mid + 1; else end = mid;
+        }
+        return start;
+    }
+
+    // x (ms) and y for station i over the view; full resolution is a zero-copy column slice.
+    function stationSeries(i, view) {
+        if (!view.level) {
+            const base = i * frames.count;
+            return {
+                x: Array.from(frames.timestamps.subarray(view.lo, view.hi + 1)),
+                y: frames.columns.subarray(base + view.lo, base + view.hi + 1),
+            };
+        }
+        const points = view.level.points;
+        const indices = view.level.indices.subarray(i * points, (i + 1) * points);
+        const start = firstAtLeast(indices, 0, points, view.lo);
+        const end = firstAtLeast(indices, start, points, view.hi + 1);
+        const x = new Array(end - start);
+        for (let j = start; j < end; j++) x[j - start] = frames.timestamps[indices[j]];
+        return { x: x, y: view.level.samples.subarray(i * points + start, i * points + end) };
+    }
+
+    function viewKey(view) {
+        return (view.level ? view.level.bucket : 1) + ":" + view.lo + ":" + view.hi;
+    }
+
+    // Re-pick the level/slice after zoom, resize, level or chunk arrival; dataChanged forces a redraw.
+    function refreshTimeseries(dataChanged) {
+        if (!tsTracesBuilt) return;
+        const view = timeseriesView();
+        const key = viewKey(view);
+        if (!dataChanged && key === tsViewKey) return;
+        tsViewKey = key;
+        const series = stationNames.map(function (_, i) { return stationSeries(i, view); });
+        Plotly.restyle("timeseries-graph", {
+            x: series.map(function (s) { return s.x; }),
+            y: series.map(function (s) { return s.y; }),
+        }, series.map(function (_, i) { return i; }));
+    }
+
     function buildTimeseriesTraces() {
-        const n = STATION_ORDER.length;
-        const frameKeys = Object.keys(frameData);
+        const n = stationNames.length;
+        const view = timeseriesView();
+        tsViewKey = viewKey(view);
         const traces = [];
         for (let i = 0; i < n; i++) {
-            const x = [];
-            const y = [];
-            frameKeys.forEach(function (k) {
-                const f = frameData[k];
-                if (f.timestamp && f.wave_values && f.wave_values[i] !== undefined) {
-                    x.push(f.timestamp);
-                    y.push(f.wave_values[i]);
-                }
-            });
+            const series = stationSeries(i, view);
             traces.push({
-                x: x, y: y, type: "scatter", mode: "lines",
-                name: STATION_ORDER[i], showlegend: false,
-                line: { width: 2, color: STATION_COLORS[i] },
+                x: series.x, y: series.y, type: "scatter", mode: "lines",
+                name: stationNames[i], showlegend: false,
+                line: { width: 2, color: stationColors[i] },
                 xaxis: "x" + (i + 1), yaxis: "y" + (i + 1),
             });
         }
         return traces;
     }
 
-    function indicatorShapes(timestamp) {
-        const shapes = [];
-        for (let i = 0; i < STATION_ORDER.length; i++) {
-            shapes.push({
-                type: "line", xref: "x" + (i + 1), yref: "y" + (i + 1),
-                x0: timestamp, x1: timestamp, y0: -1, y1: 1,
-                line: { color: "blue", width: 2, dash: "dot" }, layer: "above",
-            });
-        }
-        return shapes;
+    // ---- Cursor overlay ----------------------------------------------------
+    // One absolutely positioned line over all subplots replaces a shape per
+    // subplot: frame -> pixel offsets are precomputed whenever Plotly redraws
+    // (resize, chunk arrival), so moving the cursor is a single transform.
+    let cursorX = null;            // Float32Array: frame index -> px from the graph's left edge
+    let cursorLimits = [0, 0];     // plot area, px
+
+    // Date axis ranges come back as "YYYY-MM-DD HH:MM:SS(.fff)" strings in UTC.
+    function axisMs(value) {
+        return typeof value === "number" ? value : Date.parse(String(value).replace(" ", "T") + "Z");
+    }
+
+    function buildCursorMap() {
+        const full = els.tsGraph._fullLayout;
+        if (!full || !full._size || !full.xaxis) return;
+        const size = full._size;
+        const xa = full.xaxis;
+        const r0 = axisMs(xa.range[0]);
+        const span = axisMs(xa.range[1]) - r0;
+        const domain = xa.domain || [0, 1];
+        const left = size.l + size.w * domain[0];
+        const width = size.w * (domain[1] - domain[0]);
+        cursorLimits = [left, left + width];
+        cursorX = new Float32Array(frames.count);
+        for (let i = 0; i < frames.count; i++) cursorX[i] = left + width * (frames.timestamps[i] - r0) / span;
+
+        // Span from the top of the first subplot to the bottom of the last
+        const n = stationNames.length;
+        const top = full.yaxis && full.yaxis.domain ? full.yaxis.domain[1] : 1;
+        const lastY = full["yaxis" + n];
+        const bottom = lastY && lastY.domain ? lastY.domain[0] : 0;
+        els.tsCursor.style.top = (size.t + size.h * (1 - top)) + "px";
+        els.tsCursor.style.height = (size.h * (top - bottom)) + "px";
+        moveCursor(currentFrame);
+    }
+
+    function moveCursor(index) {
+        if (!cursorX) return;
+        const x = cursorX[index];
+        const inside = x >= cursorLimits[0] && x <= cursorLimits[1]; // zoomed away from the current frame
+        els.tsCursor.style.display = inside ? "block" : "none";
+        if (inside) els.tsCursor.style.transform = "translateX(" + x + "px)";
     }
 
     function initTimeseriesGraph() {
-        const layout = timeseriesLayout();
-        layout.shapes = indicatorShapes(frameData["0"].timestamp);
-        Plotly.newPlot("timeseries-graph", buildTimeseriesTraces(), layout, { displayModeBar: false, responsive: true });
+        Plotly.newPlot("timeseries-graph", buildTimeseriesTraces(), timeseriesLayout(), { displayModeBar: false, responsive: true })
+            .then(function (gd) {
+                gd.on("plotly_afterplot", buildCursorMap);
+                gd.on("plotly_relayout", function () { refreshTimeseries(false); });
+                buildCursorMap();
+            });
         tsTracesBuilt = true;
     }
 
-    function updateTimeseriesGraph(timestamp) {
-        // Only the indicator lines move — relayout shapes, leave the static traces alone.
-        Plotly.relayout("timeseries-graph", { shapes: indicatorShapes(timestamp) });
+    // Chunks arriving in a burst share one redraw of the (otherwise static) traces.
+    function scheduleTimeseriesRefresh() {
+        if (!tsTracesBuilt || tsRefreshTimer !== null) return;
+        tsRefreshTimer = setTimeout(function () {
+            tsRefreshTimer = null;
+            refreshTimeseries(true);
+        }, 250);
+    }
+
+    function updateTimeseriesGraph(index) {
+        // Only the cursor moves — no Plotly call, the traces stay as drawn.
+        moveCursor(index);
     }
 
     // ===========================================================================
     //  Clock + slider marks
     // ===========================================================================
     function formatClock(timestamp) {
-        const t = new Date(timestamp + "Z"); // ensure UTC interpretation
+        const t = new Date(timestamp); // ms since epoch, UTC
         if (timezoneMode === "HST") {
             const hst = new Date(t.getTime() - 10 * 3600 * 1000);
             return hst.toISOString().slice(0, 16).replace("T", " ") + " HST";
@@ -252,7 +628,7 @@
 
     function buildSliderMarks() {
         const marks = {};
-        for (let i = 0; i < TOTAL_FRAMES; i += 180) {
+        for (let i = 0; i < totalFrames; i += 180) {
             marks[i] = (i / 60).toFixed(0) + "h";
         }
         marks[0] = "🌋EQ";
@@ -263,7 +639,7 @@
         Object.keys(marks).forEach(function (k) {
             const span = document.createElement("span");
             span.textContent = marks[k];
-            span.style.left = (100 * k / (TOTAL_FRAMES - 1)) + "%";
+            span.style.left = (100 * k / (totalFrames - 1)) + "%";
             els.marks.appendChild(span);
         });
     }
@@ -272,37 +648,117 @@
     //  Frame update (the single per-frame entry point)
     // ===========================================================================
     function showFrame(index) {
+        if (!frames || index < 0 || index >= totalFrames) return false;
+        if (!frames.isLoaded(index)) {
+            // Not arrived yet: fetch its chunk ahead of the prefetch queue, show it on arrival.
+            if (pendingFrame === null) stats.stalls++;  // once per wait, not per tick spent in it
+            pendingFrame = index;
+            if (els.slider.value !== String(index)) els.slider.value = index;
+            frames.ensure(index)
+                .then(function () { if (pendingFrame === index) requestFrame(index); })
+                .catch(function (err) { console.error("❌ Error loading frame " + index + ":", err); });
+            return false;
+        }
+        pendingFrame = null;
         currentFrame = index;
-        const f = frameData[index.toString()];
-        if (!f) return;
+        const timestamp = frames.timestamps[index];
 
-        updateMap(f.wave_values);
-        updateWaveGraph(f.wave_values);
-        updateTimeseriesGraph(f.timestamp);
-        els.clock.textContent = formatClock(f.timestamp);
+        updateMap(index);
+        updateWaveGraph(index);
+        updateTimeseriesGraph(index);
+        els.clock.textContent = formatClock(timestamp);
 
         if (els.slider.value !== String(index)) els.slider.value = index;
+        return true;
     }
 
     // ===========================================================================
     //  Playback
     // ===========================================================================
-    function isPlaying() { return playTimer !== null; }
+    // Playback maps wall-clock time to a frame index (speed = ms per frame), so a
+    // slow render skips ahead instead of queueing ticks. All updates, including
+    // seeks, are applied at most once per display frame from one rAF callback.
+    const STALL_MS = 1000;         // longer gaps (hidden tab, debugger) resume in place
+    const stats = { fps: 0, rendered: 0, dropped: 0, stalls: 0 };
+    window.waveWatchStats = stats;
+    let fpsWindow = { start: 0, rendered: 0 };
+
+    function isPlaying() { return playback !== null; }
+
+    function frameInterval() { return parseInt(els.speed.value, 10) || 65; }
+
+    function rebase(now, frame) {
+        playback.startTime = now;
+        playback.startFrame = frame;
+    }
+
+    function scheduleRender() {
+        if (rafId === null) rafId = requestAnimationFrame(renderTick);
+    }
+
+    function render(index) {
+        if (showFrame(index)) {
+            stats.rendered++;
+            fpsWindow.rendered++;
+        }
+    }
+
+    function renderTick(now) {
+        rafId = null;
+        if (requestedFrame !== null) {
+            const index = requestedFrame;
+            requestedFrame = null;
+            if (playback) rebase(now, index);
+            render(index);
+        } else if (playback) {
+            if (pendingFrame !== null || now - playback.lastTick > STALL_MS) {
+                // Waiting on a chunk or resuming after a gap: restart the clock from here
+                rebase(now, pendingFrame !== null ? pendingFrame : currentFrame);
+            } else {
+                const target = (playback.startFrame + Math.floor((now - playback.startTime) / frameInterval())) % totalFrames;
+                const advanced = (target - currentFrame + totalFrames) % totalFrames;
+                if (advanced > 0) {
+                    stats.dropped += advanced - 1;
+                    render(target);
+                }
+            }
+        }
+        if (fpsWindow.start === 0) fpsWindow.start = now;
+        if (now - fpsWindow.start >= 1000) {
+            stats.fps = Math.round(1000 * fpsWindow.rendered / (now - fpsWindow.start));
+            fpsWindow = { start: now, rendered: 0 };
+        }
+        if (playback) {
+            playback.lastTick = now;
+            scheduleRender();
+        }
+    }
+
+    // Seeks from the slider/keys coalesce: only the latest one per display frame renders.
+    function requestFrame(index) {
+        requestedFrame = index;
+        scheduleRender();
+    }
+
+    // Steps build on a seek still waiting for its display frame.
+    function latestFrame() {
+        return requestedFrame !== null ? requestedFrame : currentFrame;
+    }
 
     function play() {
         if (isPlaying()) return;
-        const interval = parseInt(els.speed.value, 10) || 65;
-        playTimer = setInterval(function () {
-            showFrame((currentFrame + 1) % TOTAL_FRAMES);
-        }, interval);
+        const now = performance.now();
+        playback = { startTime: now, startFrame: currentFrame, lastTick: now };
+        fpsWindow = { start: 0, rendered: 0 };
+        scheduleRender();
         els.play.textContent = "⏸️ Pause";
         els.play.classList.add("playing");
     }
 
     function pause() {
         if (!isPlaying()) return;
-        clearInterval(playTimer);
-        playTimer = null;
+        playback = null;
+        stats.fps = 0;
         els.play.textContent = "▶️ Play";
         els.play.classList.remove("playing");
     }
@@ -315,17 +771,17 @@
     els.play.addEventListener("click", togglePlay);
 
     els.speed.addEventListener("change", function () {
-        if (isPlaying()) { pause(); play(); } // restart timer at new rate
+        if (isPlaying()) rebase(performance.now(), currentFrame); // continue from here at the new rate
     });
 
     els.slider.addEventListener("input", function () {
-        showFrame(parseInt(els.slider.value, 10) || 0);
+        requestFrame(parseInt(els.slider.value, 10) || 0);
     });
 
     els.tz.addEventListener("click", function () {
         timezoneMode = timezoneMode === "HST" ? "UTC" : "HST";
         els.tz.textContent = timezoneMode === "HST" ? "Show UTC" : "Show HST";
-        if (frameData) els.clock.textContent = formatClock(frameData[currentFrame.toString()].timestamp);
+        if (frames) els.clock.textContent = formatClock(frames.timestamps[currentFrame]);
     });
 
     document.addEventListener("keydown", function (e) {
@@ -335,11 +791,11 @@
         } else if (e.key === "ArrowRight") {
             e.preventDefault();
             pause();
-            showFrame((currentFrame + 1) % TOTAL_FRAMES);
+            requestFrame((latestFrame() + 1) % totalFrames);
         } else if (e.key === "ArrowLeft") {
             e.preventDefault();
             pause();
-            showFrame((currentFrame - 1 + TOTAL_FRAMES) % TOTAL_FRAMES);
+            requestFrame((latestFrame() - 1 + totalFrames) % totalFrames);
         } else if (e.key === "ArrowUp" || e.key === "ArrowDown") {
             e.preventDefault();
             const opts = Array.from(els.speed.options);
@@ -357,20 +813,21 @@
         console.warn("MapTiler key not set — basemap tiles will fail. Edit config.js.");
     }
 
-    initWaveGraph();
-
-    fetch("frame_data_client.json")
-        .then(function (res) {
-            if (!res.ok) throw new Error("HTTP " + res.status);
-            return res.json();
-        })
-        .then(function (data) {
-            frameData = data.frames;
-            console.log("✅ Loaded " + Object.keys(frameData).length + " frames");
-            initTimeseriesGraph();
+    Promise.all([loadFrames(), loadLevels()])
+        .then(function (results) {
+            const loaded = results[0];
+            frames = loaded;
+            setStations(loaded.stations, loaded.epicenter);
+            initWaveGraph();
+            totalFrames = loaded.count;
+            els.slider.max = totalFrames - 1;
+            console.log("✅ Loaded " + totalFrames + " frames");
+            preloadInitialLevel().then(initTimeseriesGraph);
             buildSliderMarks();
             showFrame(0);
             play(); // autostart
+            frames.onChunk = scheduleTimeseriesRefresh;
+            frames.prefetch();
         })
         .catch(function (err) {
             console.error("❌ Error loading frame data:", err);
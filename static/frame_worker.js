@@ -0,0 +1,137 @@
+/*
+ * Wave Watch frame worker — fetches and decodes frame payloads off the UI
+ * thread and precomputes everything showFrame would otherwise derive per tick:
+ *   rounded   wave deltas rounded to the mm (wave graph, tooltips)
+ *   radius    marker radius per frame/station
+ *   opacity   marker fill opacity per frame/station
+ *   columns   station-major copy of the deltas (the time-series trace y arrays)
+ * All come back as transferable buffers, so the UI thread only copies them in.
+ * Downsampling level files (frame_levels/) are decoded here too.
+ *
+ * Loaded with `new Worker(...)`; where workers are unavailable app.js loads it
+ * as a plain script and calls the same kernels through window.WaveFrameKernels.
+ */
+(function (scope) {
+    "use strict";
+
+    const LITTLE_ENDIAN = new Uint8Array(new Uint16Array([1]).buffer)[0] === 1;
+    const INT16_NAN = -32768;  // int16 sample reserved for a missing value
+
+    function fetchOk(url) {
+        return fetch(url).then(function (res) {
+            if (!res.ok) throw new Error(url + ": HTTP " + res.status);
+            return res;
+        });
+    }
+
+    function decodeSamples(buffer, encoding, scale) {
+        const bytesPer = encoding === "int16" ? 2 : 4;
+        const count = buffer.byteLength / bytesPer;
+        const out = new Float32Array(count);
+        const missing = encoding === "int16" ? INT16_NAN : NaN;  // float32 carries NaN as is
+        if (LITTLE_ENDIAN) {
+            const raw = encoding === "int16" ? new Int16Array(buffer) : new Float32Array(buffer);
+            for (let i = 0; i < count; i++) out[i] = raw[i] === missing ? NaN : raw[i] * scale;
+        } else {
+            const view = new DataView(buffer);
+            for (let i = 0; i < count; i++) {
+                const raw = encoding === "int16" ? view.getInt16(2 * i, true) : view.getFloat32(4 * i, true);
+                out[i] = raw === missing ? NaN : raw * scale;
+            }
+        }
+        return out;
+    }
+
+    // Marker styling, ported from updateMap: size saturates at 0.3 m, opacity at 0.2 m.
+    function deriveFrames(values, nStations) {
+        const n = values.length;
+        const frames = n / nStations;
+        const rounded = new Float32Array(n);
+        const radius = new Float32Array(n);
+        const opacity = new Float32Array(n);
+        const columns = new Float32Array(n);
+        for (let f = 0; f < frames; f++) {
+            for (let s = 0; s < nStations; s++) {
+                const k = f * nStations + s;
+                const waveDelta = Math.round(values[k] * 1000) / 1000;
+                const mag = Math.abs(waveDelta) || 0;  // a missing sample draws as calm
+                rounded[k] = waveDelta;
+                radius[k] = 4 + 8 * Math.sqrt(Math.min(1.0, mag / 0.3));
+                opacity[k] = 0.3 + 0.7 * Math.min(1.0, mag / 0.2);
+                columns[s * frames + f] = values[k];
+            }
+        }
+        return { frames: frames, nStations: nStations, values: values,
+                 rounded: rounded, radius: radius, opacity: opacity, columns: columns };
+    }
+
+    function loadBinary(msg) {
+        return fetchOk(msg.url)
+            .then(function (res) { return res.arrayBuffer(); })
+            .then(function (buffer) {
+                return deriveFrames(decodeSamples(buffer, msg.encoding, msg.scale), msg.nStations);
+            });
+    }
+
+    function loadJson(msg) {
+        return fetchOk(msg.url)
+            .then(function (res) { return res.json(); })
+            .then(function (data) {
+                const keys = Object.keys(data.frames);
+                const nStations = data.frames[keys[0]].wave_values.length;
+                const timestamps = new Float64Array(keys.length);
+                const values = new Float32Array(keys.length * nStations);
+                keys.forEach(function (k) {
+                    const f = data.frames[k];
+                    const i = parseInt(k, 10);
+                    timestamps[i] = Date.parse(f.timestamp + "Z"); // ensure UTC interpretation
+                    values.set(f.wave_values, i * nStations);
+                });
+                const result = deriveFrames(values, nStations);
+                result.timestamps = timestamps;
+                result.metadata = { station_info: data.metadata.station_info, epicenter: data.metadata.epicenter };
+                return result;
+            });
+    }
+
+    // uint32 frame numbers (stations x points) followed by the encoded samples
+    function loadLevel(msg) {
+        return fetchOk(msg.url)
+            .then(function (res) { return res.arrayBuffer(); })
+            .then(function (buffer) {
+                const count = msg.nStations * msg.points;
+                let indices;
+                if (LITTLE_ENDIAN) {
+                    indices = new Uint32Array(buffer.slice(0, 4 * count));
+                } else {
+                    const view = new DataView(buffer);
+                    indices = new Uint32Array(count);
+                    for (let i = 0; i < count; i++) indices[i] = view.getUint32(4 * i, true);
+                }
+                return { indices: indices, samples: decodeSamples(buffer.slice(4 * count), msg.encoding, msg.scale) };
+            });
+    }
+
+    function load(msg) {
+        if (msg.kind === "level") return loadLevel(msg);
+        return msg.kind === "json" ? loadJson(msg) : loadBinary(msg);
+    }
+
+    function transferables(result) {
+        return ["values", "rounded", "radius", "opacity", "columns", "timestamps", "indices", "samples"]
+            .filter(function (key) { return result[key]; })
+            .map(function (key) { return result[key].buffer; });
+    }
+
+    if (typeof WorkerGlobalScope !== "undefined" && scope instanceof WorkerGlobalScope) {
+        scope.onmessage = function (e) {
+            const id = e.data.id;
+            load(e.data).then(
+                function (result) { scope.postMessage({ id: id, result: result }, transferables(result)); },
+                function (err) { scope.postMessage({ id: id, error: err.message }); }
+            );
+        };
+    } else {
+        scope.WaveFrameKernels = { load: load, decodeSamples: decodeSamples, deriveFrames: deriveFrames };
+    }
+})(self);